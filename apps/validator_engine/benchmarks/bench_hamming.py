@@ -0,0 +1,85 @@
+"""
+Micro-benchmark: pHash Hamming-distance search.
+
+Compares the old per-hash loop (imagehash.hex_to_hash + ImageHash subtraction)
+with the packed uint64 XOR + popcount kernel in utils.hamming.
+
+Run from apps/validator_engine:
+    python -m benchmarks.bench_hamming
+    python -m benchmarks.bench_hamming --sizes 10000 100000 1000000 --loop-max 100000
+"""
+
+import argparse
+import random
+import time
+
+import imagehash
+import numpy as np
+
+from utils.hamming import hamming_topk, pack_hex_hashes
+
+
+def _random_corpus(size: int, seed: int = 42):
+    rng = random.Random(seed)
+    return [f"{rng.getrandbits(64):016x}" for _ in range(size)]
+
+
+def _loop_search(query_hex: str, corpus_hex, max_distance: int):
+    query = imagehash.hex_to_hash(query_hex)
+    matches = []
+    for h in corpus_hex:
+        diff = query - imagehash.hex_to_hash(h)
+        if diff <= max_distance:
+            matches.append(h)
+    return matches
+
+
+def _time(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--max-distance", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--loop-max", type=int, default=1_000_000,
+                        help="skip the slow loop for corpora larger than this")
+    args = parser.parse_args()
+
+    popcount = "np.bitwise_count" if hasattr(np, "bitwise_count") else "byte lookup table"
+    print(f"NumPy {np.__version__}, popcount via {popcount}, max_distance={args.max_distance}")
+    print(f"{'hashes':>10} | {'pack (ms)':>10} | {'kernel (ms)':>11} | {'loop (ms)':>10} | {'speedup':>8}")
+    print("-" * 62)
+
+    for size in args.sizes:
+        corpus_hex = _random_corpus(size)
+        # Plant a near-duplicate so both paths have something to find
+        query_hex = f"{int(corpus_hex[size // 2], 16) ^ 0b101:016x}"
+
+        pack_s = _time(lambda: pack_hex_hashes(corpus_hex), args.repeat)
+        corpus = pack_hex_hashes(corpus_hex)
+        kernel_s = _time(lambda: hamming_topk(int(query_hex, 16), corpus, args.max_distance), args.repeat)
+
+        kernel_hits = {corpus_hex[i] for i, _ in hamming_topk(int(query_hex, 16), corpus, args.max_distance)}
+
+        if size <= args.loop_max:
+            loop_s = _time(lambda: _loop_search(query_hex, corpus_hex, args.max_distance), 1)
+            loop_hits = set(_loop_search(query_hex, corpus_hex, args.max_distance))
+            assert loop_hits == kernel_hits, "kernel and loop disagree"
+            loop_ms = f"{loop_s * 1000:10.1f}"
+            speedup = f"{loop_s / kernel_s:7.0f}x"
+        else:
+            loop_ms = f"{'skipped':>10}"
+            speedup = f"{'-':>8}"
+
+        print(f"{size:>10} | {pack_s * 1000:10.1f} | {kernel_s * 1000:11.2f} | {loop_ms} | {speedup}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Benchmark: invoice amount/date extraction from OCR lines.
+
+Runs the labelled corpus in benchmarks/invoice_ocr_corpus.json through the
+old heuristics (last 3-7 digit number, first date-looking string, regexes
+rebuilt per call) and services.invoice_extractor, and reports accuracy and
+throughput. An amount is correct within --tolerance rupees.
+
+Run from apps/validator_engine:
+    python -m benchmarks.bench_invoice_extractor
+    python -m benchmarks.bench_invoice_extractor --corpus my_corpus.json --repeat 2000 --verbose
+"""
+
+import argparse
+import json
+import os
+import re
+import time
+from datetime import date
+
+from services.invoice_extractor import extract_invoice_fields
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), "invoice_ocr_corpus.json")
+
+
+def _load(path: str):
+    with open(path, "r", encoding="utf-8") as f:
+        cases = json.load(f)
+    for case in cases:
+        case["lines"] = [tuple(line) if isinstance(line, list) else (line, 0.9) for line in case["lines"]]
+        case["date"] = date.fromisoformat(case["date"]) if case.get("date") else None
+    return cases
+
+
+def _legacy(lines):
+    text = " ".join(t for t, _ in lines)
+    amount = None
+    amounts = re.findall(r"\b\d{3,7}\b", text)
+    if amounts:
+        amount = float(amounts[-1])
+
+    date_patterns = [
+        r"\b\d{1,2}[/-]\d{1,2}[/-]\d{2,4}\b",
+        r"\b\d{4}[/-]\d{1,2}[/-]\d{1,2}\b",
+        r"\b\d{1,2}\s+(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\s+\d{2,4}\b",
+    ]
+    found = None
+    for pattern in date_patterns:
+        match = re.search(pattern, text, re.IGNORECASE)
+        if match:
+            found = _legacy_date(match.group(0))
+            break
+    return {"amount": amount, "date": found}
+
+
+def _legacy_date(text: str):
+    # The old code kept the raw string; read it day-first to score it
+    for fmt in ("%d/%m/%Y", "%d-%m-%Y", "%d/%m/%y", "%d-%m-%y", "%Y-%m-%d", "%Y/%m/%d", "%d %b %Y", "%d %B %Y"):
+        try:
+            return date(*time.strptime(text, fmt)[:3])
+        except ValueError:
+            continue
+    return None
+
+
+def _score(extract, cases, tolerance: float):
+    amount_ok = date_ok = 0
+    misses = []
+    for case in cases:
+        result = extract(case["lines"])
+        a_ok = (result["amount"] is None) if case["amount"] is None else (
+            result["amount"] is not None and abs(result["amount"] - case["amount"]) <= tolerance)
+        d_ok = result["date"] == case["date"]
+        amount_ok += a_ok
+        date_ok += d_ok
+        if not (a_ok and d_ok):
+            misses.append((case["name"], result["amount"], result["date"]))
+    return amount_ok, date_ok, misses
+
+
+def _throughput(extract, cases, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for case in cases:
+            extract(case["lines"])
+    elapsed = time.perf_counter() - start
+    return repeat * len(cases) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--repeat", type=int, default=500, help="passes over the corpus for throughput")
+    parser.add_argument("--tolerance", type=float, default=1.0)
+    parser.add_argument("--verbose", action="store_true", help="list the cases each extractor gets wrong")
+    args = parser.parse_args()
+
+    cases = _load(args.corpus)
+    extractors = [
+        ("legacy", _legacy),
+        ("invoice_extractor", lambda lines: extract_invoice_fields(lines, 0.5)),
+    ]
+
+    print(f"{len(cases)} invoices, amount tolerance {args.tolerance}")
+    print(f"{'extractor':>18} | {'amount':>8} | {'date':>8} | {'docs/s':>10}")
+    print("-" * 54)
+    for name, extract in extractors:
+        amount_ok, date_ok, misses = _score(extract, cases, args.tolerance)
+        rate = _throughput(extract, cases, args.repeat)
+        print(f"{name:>18} | {amount_ok:>3}/{len(cases):<4} | {date_ok:>3}/{len(cases):<4} | {rate:>10.0f}")
+        if args.verbose:
+            for case_name, amount, found in misses:
+                print(f"{'':>18}   miss {case_name}: amount={amount} date={found}")
+
+
+if __name__ == "__main__":
+    main()
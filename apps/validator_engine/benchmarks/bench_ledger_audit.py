@@ -0,0 +1,96 @@
+"""
+Benchmark: ledger verification.
+
+Fills a throwaway SQLite ledger with --entries entries spread over
+--submissions sub-chains, then reports:
+  - entry hashing throughput for hash version 1 (sorted-key JSON of the
+    entry) and version 2 (length-prefixed fields over the stored text)
+  - a full audit on one process and on --workers processes
+  - an incremental verify after appending --append more entries, against
+    the checkpoint the audit left behind
+
+Run from apps/validator_engine:
+    python -m benchmarks.bench_ledger_audit
+    python -m benchmarks.bench_ledger_audit --entries 500000 --workers 8
+"""
+
+import argparse
+import contextlib
+import os
+import tempfile
+import time
+
+from services import ledger_service
+from services.ledger_service import LedgerService
+
+
+def _fill(ledger: LedgerService, count: int, submissions: int, offset: int = 0):
+    # The ledger prints a line per entry; keep the report readable
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for i in range(offset, offset + count):
+            ledger.add_entry(
+                event_type="VALIDATION_STEP",
+                event_data={"step": i % 12, "flags": ["GPS_OUTSIDE_RADIUS"] if i % 5 == 0 else [],
+                            "score": round((i % 100) / 100, 2), "details": {"distance_m": i % 900, "n": i}},
+                submission_id=f"SUB-{i % submissions:06d}",
+                performed_by="validation_engine"
+            )
+        ledger.flush()
+
+
+def _hash_rate(version: int, rows) -> float:
+    start = time.perf_counter()
+    for row in rows:
+        ledger_service.compute_entry_hash(version, *row)
+    return len(rows) / (time.perf_counter() - start)
+
+
+def _quiet(fn, *args):
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        return fn(*args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=100000)
+    parser.add_argument("--submissions", type=int, default=2000)
+    parser.add_argument("--append", type=int, default=1000, help="entries added before the incremental verify")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ledger = LedgerService(os.path.join(tmp, "ledger.sqlite3"))
+
+        start = time.perf_counter()
+        _fill(ledger, args.entries, args.submissions)
+        print(f"{args.entries} entries, {args.submissions} submissions, written in "
+              f"{time.perf_counter() - start:.2f}s")
+
+        sample = [
+            (e["timestamp"], e["event_type"], e["submission_id"], e["performed_by"],
+             ledger_service.canonical_event_json(e["event_data"]), e["previous_hash"])
+            for e in ledger.get_entries(limit=20000)
+        ]
+        print(f"{'hash version':>22} | {'entries/s':>10}")
+        print("-" * 36)
+        for version in sorted(ledger_service._HASHERS):
+            print(f"{version:>22} | {_hash_rate(version, sample):>10.0f}")
+        print()
+
+        print(f"{'verification':>22} | {'entries':>8} | {'seconds':>8} | {'valid':>5}")
+        print("-" * 54)
+        for workers in sorted({1, args.workers}):
+            result = _quiet(ledger.audit, workers)
+            print(f"{f'full audit x{workers}':>22} | {result['checked']:>8} | "
+                  f"{result['seconds']:>8.3f} | {str(result['valid']):>5}")
+
+        _fill(ledger, args.append, args.submissions, offset=args.entries)
+        start = time.perf_counter()
+        result = _quiet(ledger.verify_incremental)
+        print(f"{'incremental':>22} | {result['checked']:>8} | "
+              f"{time.perf_counter() - start:>8.3f} | {str(result['valid']):>5}")
+        _quiet(ledger.close)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Calibrate blur variance measured on the downscaled analysis level.
+
+For each sample image this measures the Laplacian variance at full resolution
+and at --max-side, fits the exponent p in var_full = var_scaled * scale ** p,
+and reports how often LOW_QUALITY decisions agree with the full-resolution
+path for a given max_blur_variance. Use the printed value as
+BLUR_CALIBRATION_EXPONENT.
+
+Run from apps/validator_engine with a folder of representative photos:
+    python -m benchmarks.calibrate_blur ./samples --max-side 1024 --threshold 120
+"""
+
+import argparse
+import math
+import os
+import time
+
+import cv2
+
+from services.forensics_service import calibrate_blur_variance
+from utils.decoded_image import DecodedImage
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".bmp"}
+
+
+def _variance(gray) -> float:
+    return float(cv2.Laplacian(gray, cv2.CV_64F).var())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("folder")
+    parser.add_argument("--max-side", type=int, default=1024)
+    parser.add_argument("--threshold", type=float, default=120.0, help="max_blur_variance to check agreement for")
+    args = parser.parse_args()
+
+    paths = sorted(
+        os.path.join(args.folder, name) for name in os.listdir(args.folder)
+        if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS
+    )
+    if not paths:
+        raise SystemExit(f"No images found in {args.folder}")
+
+    samples = []
+    full_s = reduced_s = 0.0
+    for path in paths:
+        with open(path, "rb") as f:
+            data = f.read()
+
+        start = time.perf_counter()
+        full = _variance(DecodedImage(data).analysis(0).gray)
+        full_s += time.perf_counter() - start
+
+        start = time.perf_counter()
+        view = DecodedImage(data).analysis(args.max_side)
+        scaled = _variance(view.gray)
+        reduced_s += time.perf_counter() - start
+
+        if view.scale >= 1.0 or full <= 0 or scaled <= 0:
+            continue
+        samples.append((os.path.basename(path), full, scaled, view.scale))
+
+    if not samples:
+        raise SystemExit("No image was larger than --max-side; nothing to calibrate")
+
+    # Least squares through the origin on log(var_full / var_scaled) = p * log(scale)
+    num = sum(math.log(full / scaled) * math.log(scale) for _, full, scaled, scale in samples)
+    den = sum(math.log(scale) ** 2 for _, _, _, scale in samples)
+    exponent = num / den
+
+    agree = 0
+    print(f"{'image':<32} {'scale':>6} {'full var':>10} {'scaled var':>11} {'calibrated':>11}")
+    for name, full, scaled, scale in samples:
+        calibrated = calibrate_blur_variance(scaled, scale, exponent)
+        agree += (full < args.threshold) == (calibrated < args.threshold)
+        print(f"{name[:32]:<32} {scale:6.3f} {full:10.1f} {scaled:11.1f} {calibrated:11.1f}")
+
+    print()
+    print(f"Images calibrated: {len(samples)} of {len(paths)}")
+    print(f"Decode + blur time: full {full_s:.2f}s, max_side={args.max_side} {reduced_s:.2f}s")
+    print(f"LOW_QUALITY agreement at max_blur_variance={args.threshold}: {agree}/{len(samples)}")
+    print(f"BLUR_CALIBRATION_EXPONENT={exponent:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Calibrate the ELA tampering score on real photos.
+
+Every sample image is scored as is (a camera original), re-saved at
+--save-quality, and with a patch cut from the next sample pasted in and the
+composite saved at --save-quality. The report shows each group's score range
+and how many images land on the right side of --threshold. Use it to pick
+ela_score_threshold for a tenant's photo mix.
+
+Run from apps/validator_engine with a folder of unedited camera JPEGs:
+    python -m benchmarks.calibrate_ela ./samples --threshold 6.0
+"""
+
+import argparse
+import io
+import os
+
+from PIL import Image
+
+from services.ela_service import _compute_ela
+from utils.decoded_image import DecodedImage
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg"}
+
+
+def _resave(img: Image.Image, quality: int) -> Image.Image:
+    buffer = io.BytesIO()
+    img.save(buffer, "JPEG", quality=quality)
+    buffer.seek(0)
+    return Image.open(buffer).convert("RGB")
+
+
+def _splice(img: Image.Image, donor: Image.Image) -> Image.Image:
+    # A quarter-area patch from the donor's centre, pasted off-grid
+    w, h = img.size
+    pw, ph = min(w // 2, donor.width), min(h // 2, donor.height)
+    left, top = (donor.width - pw) // 2, (donor.height - ph) // 2
+    out = img.copy()
+    out.paste(donor.crop((left, top, left + pw, top + ph)), (w // 4 + 3, h // 4 + 5))
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("folder")
+    parser.add_argument("--threshold", type=float, default=6.0, help="ela_score_threshold to check")
+    parser.add_argument("--jpeg-quality", type=int, default=90, help="ela_jpeg_quality")
+    parser.add_argument("--save-quality", type=int, default=90, help="quality the edited copies are exported at")
+    parser.add_argument("--max-side", type=int, default=0, help="analysis_max_side")
+    args = parser.parse_args()
+
+    paths = sorted(
+        os.path.join(args.folder, name) for name in os.listdir(args.folder)
+        if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS
+    )
+    if len(paths) < 2:
+        raise SystemExit(f"Need at least two JPEGs in {args.folder}")
+
+    images = []
+    for path in paths:
+        with open(path, "rb") as f:
+            images.append(DecodedImage(f.read()).analysis(args.max_side).rgb)
+
+    groups = {"original": [], "resaved": [], "spliced": []}
+    print(f"{'image':<32} {'original':>9} {'resaved':>9} {'spliced':>9}")
+    for i, (path, img) in enumerate(zip(paths, images)):
+        donor = images[(i + 1) % len(images)]
+        row = {
+            "original": img,
+            "resaved": _resave(img, args.save_quality),
+            "spliced": _resave(_splice(img, donor), args.save_quality),
+        }
+        scores = {name: _compute_ela(variant, args.jpeg_quality)["score"] for name, variant in row.items()}
+        for name, score in scores.items():
+            groups[name].append(score)
+        name = os.path.basename(path)
+        print(f"{name[:32]:<32} {scores['original']:9.2f} {scores['resaved']:9.2f} {scores['spliced']:9.2f}")
+
+    print()
+    for name, scores in groups.items():
+        # Originals should stay below the threshold, edited copies above it
+        correct = sum((s > args.threshold) == (name != "original") for s in scores)
+        print(f"{name:<9} score {min(scores):6.2f} - {max(scores):6.2f}   "
+              f"correct at {args.threshold}: {correct}/{len(scores)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,79 @@
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from routers.validate_router import router as validate_router
+from routers.ledger_router import router as ledger_router
+from services.job_service import JobWorkerPool
+from services.duplicate_service import PhashCompactor
+from services.classifier_backends import warm_classifier_backend
+from services.ocr_pool import ocr_pool
+from services.ledger_service import close_ledger
+from utils.temp_utils import sweep_orphaned_files
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
+# Hold /health/ready at 503 until OCR workers are warm. Only worth it where
+# rulesets enable require_invoice; elsewhere OCR state is reported, not gated on
+OCR_REQUIRED_FOR_READY = os.getenv("OCR_REQUIRED_FOR_READY", "false").lower() == "true"
+
+job_workers = JobWorkerPool()
+phash_compactor = PhashCompactor()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Spill files left by a previous crashed or killed process
+    removed = sweep_orphaned_files()
+    if removed:
+        print(f"[STARTUP] Removed {removed} orphaned media spill files")
+    # Load the classifier model / client before the first request
+    warm_classifier_backend()
+    # Spawn OCR workers; they load EasyOCR in the background (see /health/ready)
+    ocr_pool.start()
+    # Drain the Redis job queue used by POST /validate?mode=job
+    job_workers.start()
+    # Enforce the pHash retention window
+    phash_compactor.start()
+    yield
+    phash_compactor.stop()
+    job_workers.stop()
+    ocr_pool.shutdown()
+    # Write out ledger entries still buffered and anchor them
+    close_ledger()
+
+
 app = FastAPI(
     title="AI Validation Engine",
     version="1.0.0",
-    description="AI-powered fraud detection and risk scoring for loan utilization verification."
+    description="AI-powered fraud detection and risk scoring for loan utilization verification.",
+    lifespan=lifespan
 )
 
 app.include_router(validate_router, prefix="/validate", tags=["Validation"])
+app.include_router(ledger_router, prefix="/ledger", tags=["Ledger"])
 
 
 @app.get("/")
 def root():
     return {"message": "Validation Engine Running"}
+
+
+@app.get("/health/ready")
+def ready():
+    """
+    Readiness probe. Reports OCR worker state, "degraded" if EasyOCR failed
+    to load. Answers 503 until OCR is ready only with OCR_REQUIRED_FOR_READY,
+    so load balancers send invoice traffic to warm instances only.
+    """
+    ocr = ocr_pool.status()
+    if ocr["ready"]:
+        status = "ready"
+    elif ocr["error"]:
+        status = "degraded"
+    else:
+        status = "warming"
+    status_code = 503 if OCR_REQUIRED_FOR_READY and not ocr["ready"] else 200
+    return JSONResponse(status_code=status_code, content={"status": status, "ocr": ocr})
@@ -51,3 +51,10 @@ class SubmissionPayload(BaseModel):
 
     # media array from Submission.media[]
     media: List[MediaItem]
+
+
+class BatchSubmissionPayload(BaseModel):
+    submissions: List[SubmissionPayload]
+
+    # Optional cap on submissions validated at once for this batch
+    concurrency: Optional[int] = None
@@ -0,0 +1,17 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from services.ledger_service import get_submission_proof
+
+router = APIRouter()
+
+
+@router.get("/{submission_id}")
+async def get_submission_ledger(submission_id: str):
+    """
+    Ledger entries of one submission, the verification of its sub-chain,
+    and a Merkle inclusion proof of its head in the latest anchor.
+    """
+    proof = await run_in_threadpool(get_submission_proof, submission_id)
+    if not proof["entries"]:
+        raise HTTPException(status_code=404, detail=f"No ledger entries for submission {submission_id}")
+    return proof
@@ -1,43 +1,218 @@
+import asyncio
+import json
+import os
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Optional
 from fastapi import APIRouter, HTTPException
-from models.request_models import SubmissionPayload
-from validation_engine import validate_submission_engine
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from models.request_models import BatchSubmissionPayload, SubmissionPayload
+from validation_engine import needs_pixel_data, validate_submission_engine
+from services.job_service import enqueue_job, get_job
+from utils.admission import AdmissionController, AdmissionRejected
+from utils.media_cache import MediaCache
 import traceback
 
+VALIDATION_MAX_CONCURRENCY = int(os.getenv("VALIDATION_MAX_CONCURRENCY", "4"))
+VALIDATION_MAX_QUEUE = int(os.getenv("VALIDATION_MAX_QUEUE", "16"))
+VALIDATION_QUEUE_TIMEOUT = float(os.getenv("VALIDATION_QUEUE_TIMEOUT", "30"))
+VALIDATION_BATCH_MAX_SIZE = int(os.getenv("VALIDATION_BATCH_MAX_SIZE", "500"))
+VALIDATION_BATCH_CONCURRENCY = int(os.getenv("VALIDATION_BATCH_CONCURRENCY", str(VALIDATION_MAX_CONCURRENCY)))
+
 router = APIRouter()
 
+# The engine is synchronous (S3, OpenCV, Rekognition, OCR, callback), so it
+# runs on its own executor and never blocks the event loop
+_engine_executor = ThreadPoolExecutor(
+    max_workers=VALIDATION_MAX_CONCURRENCY,
+    thread_name_prefix="validation"
+)
+_admission = AdmissionController(
+    max_concurrency=VALIDATION_MAX_CONCURRENCY,
+    max_queue=VALIDATION_MAX_QUEUE,
+    queue_timeout=VALIDATION_QUEUE_TIMEOUT
+)
+
 
 @router.post("/")
-async def validate_submission(payload: SubmissionPayload):
+async def validate_submission(payload: SubmissionPayload, mode: Optional[str] = None):
+    """
+    Validate a submission. With ?mode=job the payload is queued instead and
+    202 is returned immediately; the result is delivered via the backend
+    callback and can be polled at GET /validate/jobs/{jobId}.
+    """
     try:
         print(f"[VALIDATION] Received submission: {payload.submissionId}")
-        
-        # Validate that rullset has rules
-        if not payload.rullset:
-            raise HTTPException(status_code=400, detail="rullset is required")
-        
-        if "rules" not in payload.rullset:
-            raise HTTPException(
-                status_code=400, 
-                detail="rullset must contain 'rules' property. Received keys: " + str(list(payload.rullset.keys()))
-            )
-        
+
+        _check_rullset(payload)
+
         print(f"[VALIDATION] Rules found in rullset: {list(payload.rullset.get('rules', {}).keys())}")
         print(f"[VALIDATION] Media count: {len(payload.media)}")
         print(f"[VALIDATION] Asset type: {payload.loanDetails.assetType}")
-        
-        # Run validation
-        result = validate_submission_engine(payload)
-        
+
+        if mode == "job":
+            job_id = await run_in_threadpool(enqueue_job, payload)
+            return JSONResponse(status_code=202, content={
+                "submissionId": payload.submissionId,
+                "jobId": job_id,
+                "status": "QUEUED",
+                "statusUrl": f"/validate/jobs/{job_id}"
+            })
+        if mode not in (None, "sync"):
+            raise HTTPException(status_code=400, detail=f"Unknown mode '{mode}'. Use 'sync' or 'job'")
+
+        # Run validation off the event loop, within the concurrency limit
+        async with _admission.admit():
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(_engine_executor, validate_submission_engine, payload)
+
         print(f"[VALIDATION] Completed for {payload.submissionId}: {result.get('decision')}")
-        
+
         return {
             "submissionId": payload.submissionId,
             "aiSummary": result
         }
-    
+
     except HTTPException:
         raise
+    except AdmissionRejected as e:
+        print(f"[VALIDATION] Rejected {payload.submissionId}: {e.detail}")
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=e.detail,
+            headers={"Retry-After": str(e.retry_after)}
+        )
     except Exception as e:
         print(f"[ERROR] Validation failed: {str(e)}")
         print(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Validation failed: {str(e)}")
+
+
+@router.post("/batch")
+async def validate_batch(batch: BatchSubmissionPayload):
+    """
+    Validate many submissions in one call. Results are streamed back as
+    NDJSON, one line per submission in completion order:
+
+        {"index": 0, "submissionId": "...", "status": "OK", "aiSummary": {...}}
+        {"index": 1, "submissionId": "...", "status": "ERROR", "statusCode": 400, "error": "..."}
+
+    Submissions share one media cache (each fileKey is downloaded once and
+    released after the last submission using it finishes), run at most
+    `concurrency` at a time and still count against the global limit.
+
+    If the client disconnects, queued submissions are dropped but ones
+    already running on the engine finish (ledger and callback included);
+    the cache is closed by whichever finishes last.
+    """
+    submissions = batch.submissions
+    if not submissions:
+        raise HTTPException(status_code=400, detail="submissions must not be empty")
+    if len(submissions) > VALIDATION_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch of {len(submissions)} exceeds VALIDATION_BATCH_MAX_SIZE={VALIDATION_BATCH_MAX_SIZE}"
+        )
+
+    concurrency = max(1, min(batch.concurrency or VALIDATION_BATCH_CONCURRENCY, VALIDATION_BATCH_CONCURRENCY))
+    print(f"[VALIDATION] Received batch of {len(submissions)} submissions (concurrency {concurrency})")
+
+    media_cache = MediaCache(probe=not any(
+        needs_pixel_data((p.rullset or {}).get("rules", {})) for p in submissions
+    ))
+    pending_keys = Counter(key for p in submissions for key in {m.fileKey for m in p.media})
+    fan_out = asyncio.Semaphore(concurrency)
+    # Engine runs outlive a disconnected stream; state below is shared with their threads
+    state_lock = threading.Lock()
+    running = set()
+    stream_closed = False
+
+    def release(payload: SubmissionPayload, future=None):
+        """
+        Evict media no other submission still needs; close the cache once the
+        stream is gone and no engine run is left. Called on the engine thread
+        for submissions that ran.
+        """
+        with state_lock:
+            running.discard(future)
+            unused = []
+            for file_key in {m.fileKey for m in payload.media}:
+                pending_keys[file_key] -= 1
+                if pending_keys[file_key] <= 0:
+                    unused.append(file_key)
+            idle = stream_closed and not running
+        for file_key in unused:
+            media_cache.evict(file_key)
+        if idle:
+            media_cache.close()
+
+    async def run_one(index: int, payload: SubmissionPayload) -> dict:
+        line = {"index": index, "submissionId": payload.submissionId}
+        future = None
+        async with fan_out:
+            try:
+                _check_rullset(payload)
+                async with _admission.admit():
+                    future = _engine_executor.submit(validate_submission_engine, payload, media_cache=media_cache)
+                    with state_lock:
+                        running.add(future)
+                    future.add_done_callback(partial(release, payload))
+                    result = await asyncio.wrap_future(future)
+                line.update({"status": "OK", "aiSummary": result})
+            except (HTTPException, AdmissionRejected) as e:
+                line.update({"status": "ERROR", "statusCode": e.status_code, "error": e.detail})
+            except Exception as e:
+                print(f"[ERROR] Batch validation failed for {payload.submissionId}: {str(e)}")
+                line.update({"status": "ERROR", "statusCode": 500, "error": f"Validation failed: {str(e)}"})
+            finally:
+                # Submissions that reached the engine release on completion instead
+                if future is None:
+                    release(payload)
+        return line
+
+    async def stream():
+        nonlocal stream_closed
+        tasks = [asyncio.create_task(run_one(i, p)) for i, p in enumerate(submissions)]
+        completed = 0
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                line = await next_done
+                completed += 1
+                yield json.dumps(line, default=str) + "\n"
+        finally:
+            # Cancels only queued submissions; engine threads cannot be interrupted
+            for task in tasks:
+                task.cancel()
+            with state_lock:
+                stream_closed = True
+                still_running = len(running)
+            if still_running:
+                print(f"[VALIDATION] Batch stream closed; {still_running} running submission(s) will finish first")
+            else:
+                media_cache.close()
+            print(f"[VALIDATION] Batch finished: {completed}/{len(submissions)} results streamed")
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+@router.get("/jobs/{job_id}")
+async def get_validation_job(job_id: str):
+    job = await run_in_threadpool(get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+
+def _check_rullset(payload: SubmissionPayload):
+    # Validate that rullset has rules
+    if not payload.rullset:
+        raise HTTPException(status_code=400, detail="rullset is required")
+
+    if "rules" not in payload.rullset:
+        raise HTTPException(
+            status_code=400,
+            detail="rullset must contain 'rules' property. Received keys: " + str(list(payload.rullset.keys()))
+        )
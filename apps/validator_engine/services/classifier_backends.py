@@ -0,0 +1,292 @@
+# services/classifier_backends.py
+
+import io
+import json
+import os
+import threading
+from typing import Dict, List, Optional, Union
+
+import boto3
+import numpy as np
+from botocore.config import Config
+from PIL import Image
+
+from utils.decoded_image import DecodedImage
+from utils.worker_pool import map_media
+
+AWS_REGION = os.getenv("AWS_REGION", "ap-south-1")
+
+# "rekognition" (default), "onnx" (local CPU model) or "mock" (no AWS, for tests)
+CLASSIFIER_BACKEND = os.getenv("CLASSIFIER_BACKEND", "rekognition").lower()
+# Concurrent remote calls per submission
+CLASSIFIER_CONCURRENCY = int(os.getenv("CLASSIFIER_CONCURRENCY", "3"))
+
+# Longest side sent to Rekognition; larger images are downscaled first
+REKOGNITION_MAX_SIDE = int(os.getenv("REKOGNITION_MAX_SIDE", "1600"))
+REKOGNITION_MAX_BYTES = 5 * 1024 * 1024  # detect_labels limit for inline bytes
+
+CLASSIFIER_ONNX_MODEL = os.getenv("CLASSIFIER_ONNX_MODEL", "")
+# Text file, one class name per model output index
+CLASSIFIER_ONNX_LABELS = os.getenv("CLASSIFIER_ONNX_LABELS", "")
+# Optional JSON {"tractor": "TRACTOR", ...} mapping model classes to allowed_asset_types
+CLASSIFIER_ONNX_ASSET_MAP = os.getenv("CLASSIFIER_ONNX_ASSET_MAP", "")
+CLASSIFIER_ONNX_INPUT_SIZE = int(os.getenv("CLASSIFIER_ONNX_INPUT_SIZE", "224"))
+CLASSIFIER_ONNX_BATCH_SIZE = int(os.getenv("CLASSIFIER_ONNX_BATCH_SIZE", "8"))
+CLASSIFIER_ONNX_THREADS = int(os.getenv("CLASSIFIER_ONNX_THREADS", "2"))
+
+# "Tractor:95,Vehicle:90" -> labels returned for every image by the mock backend
+CLASSIFIER_MOCK_LABELS = os.getenv("CLASSIFIER_MOCK_LABELS", "Tractor:95,Vehicle:90,Machine:85")
+
+MAX_LABELS = 15
+MIN_CONFIDENCE = 40  # 40% minimum; we apply stricter threshold via RuleSet
+
+# Labels use the Rekognition shape: [{"Name": str, "Confidence": 0-100}, ...]
+Labels = List[Dict]
+
+
+class ClassifierBackend:
+    """
+    Image -> labels. Backends return Rekognition-style label dicts so
+    aggregation and asset matching in classifier_service stay the same.
+    """
+
+    name = "base"
+
+    def cache_config(self) -> Dict:
+        """
+        Everything that changes this backend's output, for result-cache keys.
+        """
+        return {"backend": self.name, "max_labels": MAX_LABELS, "min_confidence": MIN_CONFIDENCE}
+
+    def warm_up(self):
+        """
+        Load models / open sessions ahead of the first request.
+        """
+
+    def classify_one(self, image: DecodedImage) -> Labels:
+        raise NotImplementedError
+
+    def classify_batch(self, images: List[DecodedImage]) -> List[Union[Labels, Exception]]:
+        """
+        Labels per image, or the exception that image raised. The default
+        calls classify_one with CLASSIFIER_CONCURRENCY in flight.
+        """
+        return map_media(lambda image: _capture(self.classify_one, image), images,
+                         max_workers=CLASSIFIER_CONCURRENCY)
+
+
+def _capture(fn, image):
+    try:
+        return fn(image)
+    except Exception as e:
+        return e
+
+
+class RekognitionBackend(ClassifierBackend):
+    """
+    AWS Rekognition detect_labels, one remote call per image. Adaptive retry
+    mode backs off client-side when Rekognition throttles.
+    """
+
+    name = "rekognition"
+
+    def __init__(self):
+        self.client = boto3.client(
+            "rekognition",
+            region_name=AWS_REGION,
+            config=Config(retries={"max_attempts": 8, "mode": "adaptive"})
+        )
+
+    def cache_config(self) -> Dict:
+        return {**super().cache_config(), "max_side": REKOGNITION_MAX_SIDE}
+
+    def classify_one(self, image: DecodedImage) -> Labels:
+        resp = self.client.detect_labels(
+            Image={"Bytes": _upload_bytes(image)},
+            MaxLabels=MAX_LABELS,
+            MinConfidence=MIN_CONFIDENCE
+        )
+        return resp.get("Labels", [])
+
+
+def _upload_bytes(image: DecodedImage) -> bytes:
+    """
+    Original bytes when they are small enough, otherwise an oriented JPEG
+    re-encode at REKOGNITION_MAX_SIDE (stays well under the 5 MB limit).
+    """
+    if image.nbytes <= REKOGNITION_MAX_BYTES and max(image.size) <= REKOGNITION_MAX_SIDE:
+        return bytes(image.data)
+
+    view = image.analysis(REKOGNITION_MAX_SIDE)
+    buffer = io.BytesIO()
+    Image.fromarray(view.bgr[:, :, ::-1]).save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+
+class OnnxBackend(ClassifierBackend):
+    """
+    Local CPU classifier on ONNX Runtime. Expects an image-classification
+    model taking NCHW float32 RGB at CLASSIFIER_ONNX_INPUT_SIZE with
+    ImageNet normalisation and returning per-class logits. Images are
+    classified in batches of CLASSIFIER_ONNX_BATCH_SIZE on one warm session.
+    """
+
+    name = "onnx"
+
+    _MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
+    _STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+
+    def __init__(self, model_path: str = CLASSIFIER_ONNX_MODEL, labels_path: str = CLASSIFIER_ONNX_LABELS,
+                 asset_map_path: str = CLASSIFIER_ONNX_ASSET_MAP):
+        if not model_path or not labels_path:
+            raise RuntimeError("CLASSIFIER_ONNX_MODEL and CLASSIFIER_ONNX_LABELS must be set for the onnx backend")
+        self.model_path = model_path
+        with open(labels_path, "r", encoding="utf-8") as f:
+            self.class_names = [line.strip() for line in f if line.strip()]
+        self.asset_map: Dict[str, str] = {}
+        if asset_map_path:
+            with open(asset_map_path, "r", encoding="utf-8") as f:
+                self.asset_map = {k.lower(): v for k, v in json.load(f).items()}
+        self._session = None
+        self._lock = threading.Lock()
+
+    def cache_config(self) -> Dict:
+        return {
+            **super().cache_config(),
+            "model": os.path.basename(self.model_path),
+            "model_mtime": int(os.path.getmtime(self.model_path)),
+            "input_size": CLASSIFIER_ONNX_INPUT_SIZE,
+            "asset_map": self.asset_map
+        }
+
+    def _get_session(self):
+        with self._lock:
+            if self._session is None:
+                try:
+                    import onnxruntime as ort
+                except ImportError:
+                    raise RuntimeError("onnxruntime is required for CLASSIFIER_BACKEND=onnx")
+                options = ort.SessionOptions()
+                options.intra_op_num_threads = CLASSIFIER_ONNX_THREADS
+                self._session = ort.InferenceSession(
+                    self.model_path, sess_options=options, providers=["CPUExecutionProvider"]
+                )
+                print(f"[CLASSIFIER] Loaded ONNX model {self.model_path}")
+            return self._session
+
+    def warm_up(self):
+        session = self._get_session()
+        size = CLASSIFIER_ONNX_INPUT_SIZE
+        session.run(None, {session.get_inputs()[0].name: np.zeros((1, 3, size, size), dtype=np.float32)})
+
+    def _preprocess(self, image: DecodedImage) -> np.ndarray:
+        size = CLASSIFIER_ONNX_INPUT_SIZE
+        # Decode at a reduced DCT scale, then squash to the model input
+        view = image.analysis(size * 2)
+        rgb = Image.fromarray(view.bgr[:, :, ::-1]).resize((size, size), Image.BILINEAR)
+        array = (np.asarray(rgb, dtype=np.float32) / 255.0 - self._MEAN) / self._STD
+        return array.transpose(2, 0, 1)
+
+    def _to_labels(self, logits: np.ndarray) -> Labels:
+        exp = np.exp(logits - logits.max())
+        probs = exp / exp.sum()
+        labels = []
+        for index in np.argsort(-probs)[:MAX_LABELS]:
+            confidence = float(probs[index]) * 100.0
+            if confidence < MIN_CONFIDENCE:
+                break
+            name = self.class_names[index] if index < len(self.class_names) else str(index)
+            labels.append({"Name": name, "Confidence": round(confidence, 4)})
+            asset = self.asset_map.get(name.lower())
+            if asset:
+                labels.append({"Name": asset, "Confidence": round(confidence, 4)})
+        return labels
+
+    def classify_one(self, image: DecodedImage) -> Labels:
+        result = self.classify_batch([image])[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def classify_batch(self, images: List[DecodedImage]) -> List[Union[Labels, Exception]]:
+        session = self._get_session()
+        input_name = session.get_inputs()[0].name
+
+        results: List[Union[Labels, Exception]] = [None] * len(images)
+        tensors = map_media(lambda image: _capture(self._preprocess, image), images)
+        ready = [i for i, t in enumerate(tensors) if not isinstance(t, Exception)]
+        for i, t in enumerate(tensors):
+            if isinstance(t, Exception):
+                results[i] = t
+
+        for start in range(0, len(ready), CLASSIFIER_ONNX_BATCH_SIZE):
+            chunk = ready[start:start + CLASSIFIER_ONNX_BATCH_SIZE]
+            batch = np.stack([tensors[i] for i in chunk])
+            try:
+                logits = session.run(None, {input_name: batch})[0]
+                for i, row in zip(chunk, logits):
+                    results[i] = self._to_labels(row)
+            except Exception as e:
+                for i in chunk:
+                    results[i] = e
+        return results
+
+
+class MockBackend(ClassifierBackend):
+    """
+    Fixed labels for every image (CLASSIFIER_MOCK_LABELS); no AWS or model.
+    """
+
+    name = "mock"
+
+    def __init__(self, spec: str = CLASSIFIER_MOCK_LABELS):
+        self.labels = []
+        for part in spec.split(","):
+            if not part.strip():
+                continue
+            name, _, confidence = part.partition(":")
+            self.labels.append({"Name": name.strip(), "Confidence": float(confidence or 99)})
+
+    def cache_config(self) -> Dict:
+        return {**super().cache_config(), "labels": self.labels}
+
+    def classify_one(self, image: DecodedImage) -> Labels:
+        return [dict(lbl) for lbl in self.labels]
+
+
+_BACKENDS = {
+    "rekognition": RekognitionBackend,
+    "onnx": OnnxBackend,
+    "mock": MockBackend,
+}
+
+_backend: Optional[ClassifierBackend] = None
+_backend_lock = threading.Lock()
+
+
+def get_classifier_backend() -> ClassifierBackend:
+    """
+    Process-wide backend selected by CLASSIFIER_BACKEND.
+    """
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            backend_cls = _BACKENDS.get(CLASSIFIER_BACKEND)
+            if backend_cls is None:
+                raise ValueError(
+                    f"Unknown CLASSIFIER_BACKEND '{CLASSIFIER_BACKEND}'. Use one of {sorted(_BACKENDS)}"
+                )
+            _backend = backend_cls()
+        return _backend
+
+
+def warm_classifier_backend():
+    """
+    Called at startup so the first request does not pay for model loading.
+    """
+    try:
+        backend = get_classifier_backend()
+        backend.warm_up()
+        print(f"[CLASSIFIER] Backend ready: {backend.name}")
+    except Exception as e:
+        print(f"[CLASSIFIER ERROR] Backend warm-up failed: {str(e)}")
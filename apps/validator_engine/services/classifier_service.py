@@ -1,24 +1,33 @@
 # services/classifier_service.py
 
 import os
-from typing import List
+from typing import Dict, List, Optional
 
-import boto3
+import cv2
 
 from models.request_models import MediaItem
-from utils.s3_utils import download_from_s3_to_temp
-from utils.temp_utils import safe_remove
+from services.classifier_backends import get_classifier_backend
+from utils.media_cache import MediaCache, use_media_cache
+from utils.result_cache import result_cache, stage_key
+from utils.worker_pool import map_media
 
-AWS_REGION = os.getenv("AWS_REGION", "ap-south-1")
+# Images classified per submission (the sharpest ones); 0 = all
+CLASSIFIER_MAX_IMAGES = int(os.getenv("CLASSIFIER_MAX_IMAGES", "3"))
 
-rekognition = boto3.client("rekognition", region_name=AWS_REGION)
+_SHARPNESS_SIDE = 512
 
 
-def run_classifier(media: List[MediaItem], allowed_assets: List[str], confidence_threshold: float):
+def run_classifier(media: List[MediaItem], allowed_assets: List[str], confidence_threshold: float,
+                   media_cache: Optional[MediaCache] = None, max_images: Optional[int] = None):
     """
-    Classifier backend: AWS Rekognition (detect_labels).
-    - Takes first IMAGE from media
-    - Calls Rekognition.detect_labels
+    Asset classifier on the configured backend (CLASSIFIER_BACKEND:
+    Rekognition detect_labels, a local ONNX model, or a mock).
+    - Picks the sharpest max_images IMAGEs (CLASSIFIER_MAX_IMAGES by default)
+    - Classifies them in one backend batch (labels are cached per image
+      content and backend config, so retries and rule changes do not pay
+      for the call again)
+    - Aggregates label confidences across images: a label scores its best
+      confidence on any photo
     - Maps labels to allowed_assets
     - Emits UNKNOWN_ASSET / LOW_CONFIDENCE based on RuleSet.
     """
@@ -29,65 +38,167 @@ def run_classifier(media: List[MediaItem], allowed_assets: List[str], confidence
     # Normalize allowed asset labels (e.g., ["TRACTOR", "DAIRY_UNIT"])
     allowed_upper = [a.upper() for a in allowed_assets]
 
-    # 1) Pick first image
-    first_image = next((m for m in media if m.type == "IMAGE"), None)
-    if not first_image:
+    images = [m for m in media if m.type == "IMAGE"]
+    if not images:
         flags.append("NO_IMAGE")
         return {"flags": flags, "features": features}
 
-    local_path = None
-    try:
-        # 2) Download from S3 URL or key to temp file
-        local_path = download_from_s3_to_temp(first_image.fileKey)
-        with open(local_path, "rb") as f:
-            image_bytes = f.read()
-
-        # 3) Call Rekognition
-        resp = rekognition.detect_labels(
-            Image={"Bytes": image_bytes},
-            MaxLabels=15,
-            MinConfidence=40  # 40% minimum; we apply stricter threshold via RuleSet
-        )
-
-        # Extract labels
-        labels = [lbl["Name"] for lbl in resp.get("Labels", [])]
-        labels_upper = [name.upper() for name in labels]
-        features["rekognition_labels"] = labels
-
-        if not resp.get("Labels"):
-            flags.append("CLASSIFIER_ERROR")
-            return {"flags": flags, "features": features}
-
-        # 4) Best label (highest confidence)
-        best = max(resp["Labels"], key=lambda x: x["Confidence"])
-        best_name = best["Name"].upper()
-        best_conf = best["Confidence"] / 100.0  # → 0.0–1.0
-
-        features["classifier_predicted"] = best_name
-        features["classifier_confidence"] = round(best_conf, 4)
-
-        # 5) Does any allowed asset match Rekognition labels?
-        # Strategy: if allowed asset name is contained in any Rekognition label (case-insensitive)
-        matches = []
-        for asset in allowed_upper:
-            for lbl in labels_upper:
-                if asset in lbl:
-                    matches.append(asset)
-
-        if not matches:
-            flags.append("UNKNOWN_ASSET")
-        else:
-            features["asset_matches"] = matches
+    max_images = CLASSIFIER_MAX_IMAGES if max_images is None else max_images
 
-        # 6) Confidence check vs threshold
-        if best_conf < confidence_threshold:
-            flags.append("LOW_CONFIDENCE")
+    try:
+        with use_media_cache(media_cache) as cache:
+            # 1) Pick the sharpest images
+            selected = _select_images(images, cache, max_images)
 
+            # 2) + 3) Classify, reusing cached labels
+            per_image = _classify_images(selected, cache)
     except Exception as e:
         flags.append("CLASSIFIER_ERROR")
         features["classifier_error"] = str(e)
-    finally:
-        if local_path:
-            safe_remove(local_path)
+        return {"flags": flags, "features": features}
+
+    errors = [r for r in per_image if "error" in r]
+    classified = [r for r in per_image if "error" not in r]
+    features["classifier_images"] = [
+        r if "error" in r else {"fileKey": r["fileKey"], "labels": [lbl["Name"] for lbl in r["labels"]]}
+        for r in per_image
+    ]
+
+    if not classified:
+        flags.append("CLASSIFIER_ERROR")
+        features["classifier_error"] = errors[0]["error"] if errors else "no images classified"
+        return {"flags": flags, "features": features}
+
+    aggregated = aggregate_labels([r["labels"] for r in classified])
+
+    # Extract labels, strongest first
+    labels = list(aggregated)
+    labels_upper = [name.upper() for name in labels]
+    features["rekognition_labels"] = labels
+    features["classifier_label_confidences"] = aggregated
+
+    if not aggregated:
+        flags.append("CLASSIFIER_ERROR")
+        return {"flags": flags, "features": features}
+
+    # 4) Best label (highest aggregated confidence)
+    best_name, best = next(iter(aggregated.items()))
+    best_conf = best["max"] / 100.0  # → 0.0–1.0
+
+    features["classifier_predicted"] = best_name.upper()
+    features["classifier_confidence"] = round(best_conf, 4)
+
+    # 5) Does any allowed asset match Rekognition labels?
+    # Strategy: if allowed asset name is contained in any Rekognition label (case-insensitive)
+    matches = []
+    for asset in allowed_upper:
+        for lbl in labels_upper:
+            if asset in lbl:
+                matches.append(asset)
+
+    if not matches:
+        flags.append("UNKNOWN_ASSET")
+    else:
+        features["asset_matches"] = matches
+
+    # 6) Confidence check vs threshold
+    if best_conf < confidence_threshold:
+        flags.append("LOW_CONFIDENCE")
 
     return {"flags": flags, "features": features}
+
+
+def aggregate_labels(label_sets: List[List[Dict]]) -> Dict[str, Dict]:
+    """
+    Combine per-image Rekognition labels into
+    {name: {"max": %, "mean": %, "images": n}}, ordered by max then mean.
+    mean counts images where the label is absent as 0.
+    """
+    per_label: Dict[str, List[float]] = {}
+    for labels in label_sets:
+        for lbl in labels:
+            per_label.setdefault(lbl["Name"], []).append(lbl["Confidence"])
+
+    count = max(1, len(label_sets))
+    aggregated = {
+        name: {
+            "max": round(max(confs), 4),
+            "mean": round(sum(confs) / count, 4),
+            "images": len(confs)
+        }
+        for name, confs in per_label.items()
+    }
+    return dict(sorted(aggregated.items(), key=lambda kv: (-kv[1]["max"], -kv[1]["mean"])))
+
+
+def _select_images(images: List[MediaItem], cache: MediaCache, max_images: int) -> List[MediaItem]:
+    """
+    The max_images sharpest images (Laplacian variance at low resolution),
+    in media order. Undecodable images rank last.
+    """
+    if not max_images or len(images) <= max_images:
+        return images
+
+    scores = map_media(lambda m: _sharpness(m, cache), images)
+    ranked = sorted(range(len(images)), key=lambda i: -scores[i])[:max_images]
+    return [images[i] for i in sorted(ranked)]
+
+
+def _sharpness(m: MediaItem, cache: MediaCache) -> float:
+    try:
+        gray = cache.get_image(m.fileKey).analysis(_SHARPNESS_SIDE).gray
+        return float(cv2.Laplacian(gray, cv2.CV_64F).var())
+    except Exception:
+        return -1.0
+
+
+def _classify_images(images: List[MediaItem], cache: MediaCache) -> List[Dict]:
+    """
+    {"fileKey", "labels"} or {"fileKey", "error"} per image. Cache hits skip
+    the backend; misses go to it as one batch.
+    """
+    backend = get_classifier_backend()
+    config = backend.cache_config()
+
+    def lookup(m: MediaItem):
+        try:
+            key = stage_key("ASSET_CLASSIFIER", cache.get_digest(m.fileKey), config)
+            return key, result_cache.get(key)
+        except Exception as e:
+            return None, e
+
+    lookups = map_media(lookup, images)
+
+    results: List[Optional[Dict]] = [None] * len(images)
+    pending = []
+    for i, (m, (key, found)) in enumerate(zip(images, lookups)):
+        if isinstance(found, Exception):
+            results[i] = {"fileKey": m.fileKey, "error": str(found)}
+        elif found is not None:
+            results[i] = {"fileKey": m.fileKey, "labels": found}
+        else:
+            pending.append((i, m, key))
+
+    decoded = map_media(lambda p: _decode(p[1], cache), pending)
+    to_classify = [(p, image) for p, image in zip(pending, decoded) if not isinstance(image, Exception)]
+    for (i, m, _), image in zip(pending, decoded):
+        if isinstance(image, Exception):
+            results[i] = {"fileKey": m.fileKey, "error": str(image)}
+
+    outputs = backend.classify_batch([image for _, image in to_classify]) if to_classify else []
+    for ((i, m, key), _), labels in zip(to_classify, outputs):
+        if isinstance(labels, Exception):
+            print(f"[CLASSIFIER ERROR] {m.fileKey}: {str(labels)}")
+            results[i] = {"fileKey": m.fileKey, "error": str(labels)}
+        else:
+            result_cache.set(key, labels)
+            results[i] = {"fileKey": m.fileKey, "labels": labels}
+
+    return results
+
+
+def _decode(m: MediaItem, cache: MediaCache):
+    try:
+        return cache.get_image(m.fileKey)
+    except Exception as e:
+        return e
@@ -1,47 +1,178 @@
-from typing import List
-from PIL import Image
+from typing import List, Optional
 import imagehash
-import redis
 from models.request_models import MediaItem
-from utils.s3_utils import download_from_s3_to_temp
-from utils.temp_utils import safe_remove
+from services.phash_index import (
+    LEGACY_HASH_SET_KEY,
+    add_many_to_index,
+    compact_expired,
+    find_candidates_batch,
+    get_metadata,
+    migrate_legacy_hash_set
+)
+from utils.hamming import hamming_topk, pack_hex_hashes
+from utils.decoded_image import ANALYSIS_MAX_SIDE
+from utils.media_cache import MediaCache, use_media_cache
+from utils.redis_client import redis_client
+from utils.result_cache import result_cache
+from utils.worker_pool import map_media
 import os
+import threading
 
-REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
-redis_client = redis.Redis.from_url(REDIS_URL, decode_responses=True)
+PHASH_COMPACTION_INTERVAL = int(os.getenv("PHASH_COMPACTION_INTERVAL", "3600"))
 
-HASH_SET_KEY = "image_phash_set"
+# Hashes used to live in this flat set; they are copied into the index once
+HASH_SET_KEY = LEGACY_HASH_SET_KEY
 
+_migration_lock = threading.Lock()
+_migration_checked = False
 
-def run_duplicate_checks(media: List[MediaItem], max_hash_distance: int):
+
+def _ensure_index_migrated():
+    global _migration_checked
+    if _migration_checked:
+        return
+    with _migration_lock:
+        if not _migration_checked:
+            migrate_legacy_hash_set(redis_client)
+            _migration_checked = True
+
+
+def run_duplicate_checks(media: List[MediaItem], max_hash_distance: int,
+                         tenant_id: str, submission_id: Optional[str] = None,
+                         loan_id: Optional[str] = None,
+                         media_cache: Optional[MediaCache] = None,
+                         analysis_max_side: Optional[int] = None):
+    """
+    pHash near-duplicate detection within the tenant's hash store (plus the
+    cross-tenant index when enabled). Each match reports the submission, loan
+    and fileKey that first stored the colliding hash.
+
+    All hashes are computed first; repeats inside the submission are matched
+    locally, and Redis sees one pipelined lookup, one metadata fetch and one
+    pipelined insert per submission regardless of image count.
+    """
     flags: list[str] = []
     features: dict = {"duplicate_matches": []}
 
-    for m in media:
-        if m.type != "IMAGE":
-            continue
-
-        local_path = None
-        try:
-            local_path = download_from_s3_to_temp(m.fileKey)
-            img = Image.open(local_path)
-            phash = imagehash.phash(img)
-
-            # Check against existing hashes
-            existing_hashes = redis_client.smembers(HASH_SET_KEY)
-            for h in existing_hashes:
-                diff = phash - imagehash.hex_to_hash(h)
-                if diff <= max_hash_distance:
-                    flags.append("DUPLICATE_IMAGE")
-                    features["duplicate_matches"].append({"current": str(phash), "match": h})
-
-            # Store this hash
-            redis_client.sadd(HASH_SET_KEY, str(phash))
-
-        except Exception:
-            continue
-        finally:
-            if local_path:
-                safe_remove(local_path)
+    images = [m for m in media if m.type == "IMAGE"]
+
+    # Hashing is per-image work and runs in parallel
+    with use_media_cache(media_cache) as cache:
+        hashes = map_media(lambda m: _compute_phash(m, cache, analysis_max_side), images)
+
+    hashed = [(m, phash) for m, phash in zip(images, hashes) if phash is not None]
+    if not hashed:
+        return {"flags": flags, "features": features}
+
+    submission_keys = {m.fileKey for m, _ in hashed}
+
+    try:
+        _ensure_index_migrated()
+
+        # 1 round trip: band-index candidates for every image
+        candidate_lists = find_candidates_batch(
+            redis_client, tenant_id, [h for _, h in hashed], max_hash_distance
+        )
+        stored_hits = []
+        for (_, current), candidates in zip(hashed, candidate_lists):
+            corpus = pack_hex_hashes(h for _, h in candidates)
+            stored_hits.append([
+                (candidates[index], distance)
+                for index, distance in hamming_topk(int(current, 16), corpus, max_hash_distance)
+            ])
+
+        # 1 round trip: metadata of every stored hash that matched
+        stored_metas = iter(get_metadata(redis_client, [pair for hits in stored_hits for pair, _ in hits]))
+
+        # Earlier images of this submission, compared locally in media order
+        local_corpus = pack_hex_hashes(h for _, h in hashed)
+
+        for position, ((m, current), hits) in enumerate(zip(hashed, stored_hits)):
+            for (match_tenant, match_hash), distance in hits:
+                meta = next(stored_metas) or {}
+                # This submission's own files (e.g. on retry) are covered by the local check
+                if meta.get("submissionId") == submission_id and meta.get("fileKey") in submission_keys:
+                    continue
+                _add_match(flags, features, current, match_hash, distance, match_tenant, meta)
+
+            for index, distance in hamming_topk(int(current, 16), local_corpus[:position], max_hash_distance):
+                earlier = hashed[index][0]
+                if earlier.fileKey == m.fileKey:
+                    continue
+                _add_match(flags, features, current, hashed[index][1], distance, tenant_id, {
+                    "submissionId": submission_id,
+                    "loanId": loan_id,
+                    "fileKey": earlier.fileKey
+                })
+
+        # 1 round trip: store every hash of this submission
+        add_many_to_index(redis_client, tenant_id, [
+            (current, {"submissionId": submission_id, "loanId": loan_id, "fileKey": m.fileKey})
+            for m, current in hashed
+        ])
+
+    except Exception as e:
+        print(f"[DUPLICATE ERROR] Duplicate check failed: {str(e)}")
 
     return {"flags": flags, "features": features}
+
+
+def _add_match(flags: list, features: dict, current: str, match_hash: str,
+               distance: int, match_tenant: str, meta: dict):
+    flags.append("DUPLICATE_IMAGE")
+    features["duplicate_matches"].append({
+        "current": current,
+        "match": match_hash,
+        "distance": distance,
+        "tenantId": match_tenant,
+        "submissionId": meta.get("submissionId"),
+        "loanId": meta.get("loanId"),
+        "fileKey": meta.get("fileKey")
+    })
+
+
+def _compute_phash(m: MediaItem, cache: MediaCache,
+                   analysis_max_side: Optional[int] = None) -> Optional[str]:
+    """
+    Hex pHash of the image, reused from the result cache when the content
+    was hashed before at the same analysis resolution.
+    """
+    max_side = ANALYSIS_MAX_SIDE if analysis_max_side is None else analysis_max_side
+    try:
+        # pHash works on a 32x32 thumbnail, so a reduced analysis level is plenty
+        return result_cache.get_or_compute(
+            "DUPLICATE_CHECK", cache.get_digest(m.fileKey), {"analysis_max_side": max_side},
+            lambda: str(imagehash.phash(cache.get_image(m.fileKey).analysis(max_side).rgb))
+        )
+    except Exception:
+        return None
+
+
+class PhashCompactor:
+    """
+    Background thread that periodically drops hashes past the retention window.
+    """
+
+    def __init__(self, interval: int = PHASH_COMPACTION_INTERVAL):
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self.interval <= 0:
+            return
+        self._thread = threading.Thread(target=self._run, name="phash-compactor", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                compact_expired(redis_client)
+            except Exception as e:
+                print(f"[DUPLICATE ERROR] pHash compaction failed: {str(e)}")
@@ -1,48 +1,141 @@
-from typing import List
-import os
-from PIL import Image, ImageChops
+from typing import Dict, List, Optional
+import io
+import cv2
+import numpy as np
+from PIL import Image
 from models.request_models import MediaItem
-from utils.s3_utils import download_from_s3_to_temp
-from utils.temp_utils import safe_remove
+from utils.decoded_image import ANALYSIS_MAX_SIDE
+from utils.media_cache import MediaCache, use_media_cache
+from utils.result_cache import result_cache
+from utils.worker_pool import map_media
 
+ELA_BLOCK_SIZE = 16
+# Added to the median block residual before dividing. Small enough that the
+# near-zero background of a re-exported edit still lifts the score, large
+# enough that a flat clean image does not divide by ~0.
+ELA_SCORE_FLOOR = 0.5
 
-def run_ela_checks(media: List[MediaItem]):
-    flags: list[str] = []
-    features: dict = {}
-    scores = []
 
-    for m in media:
-        if m.type != "IMAGE":
-            continue
+def run_ela_checks(media: List[MediaItem], media_cache: Optional[MediaCache] = None,
+                   jpeg_quality: int = 90, score_threshold: float = 6.0,
+                   analysis_max_side: Optional[int] = None):
+    """
+    Error Level Analysis: re-encode each image as JPEG in memory and measure
+    the per-pixel residual against the original.
+
+    The tampering score is block-based: the image is split into 16x16 blocks
+    and the 99th-percentile block residual is compared with the median block.
+    Regions pasted in from another source recompress differently from the rest
+    of the photo and stand out as high-residual blocks. ELA_TAMPERED is raised
+    when the average score across images exceeds score_threshold.
+
+    The separation relies on the image's last save being close to
+    jpeg_quality: an edited photo exported at that quality has a near-zero
+    background residual, so its edges and pasted regions dominate the score,
+    while a camera original scores low. On synthetic scenes, camera originals
+    at quality 85-95 score at most ~4.8 and composites saved at quality 90
+    score ~8 or more, hence the default of 6.0 (see tests/test_ela_service.py;
+    calibrate on real photos with benchmarks/calibrate_ela.py). Edits exported
+    at a quality far from jpeg_quality are not caught.
+
+    Rollout: this replaces the old rule, which flagged when the average sum of
+    per-channel max residuals (still reported as ela_avg_score) exceeded 500.
+    That sum is usually well below 500 at quality 90, so the old rule rarely
+    fired; expect more ELA_TAMPERED flags and recheck per-tenant
+    ela_score_threshold overrides before enabling.
 
-        local_path = None
-        try:
-            local_path = download_from_s3_to_temp(m.fileKey)
+    With an analysis_max_side the image is downscaled first; resampling
+    smooths the original JPEG grid, so recalibrate score_threshold when
+    enabling it.
+    """
+    flags: list[str] = []
+    features: dict = {}
 
-            orig = Image.open(local_path).convert("RGB")
-            ela_path = local_path + "_ela.jpg"
-            orig.save(ela_path, "JPEG", quality=90)
+    images = [m for m in media if m.type == "IMAGE"]
 
-            ela = Image.open(ela_path)
-            diff = ImageChops.difference(orig, ela)
-            extrema = diff.getextrema()
-            score = sum([e[1] for e in extrema])  # crude measure
+    with use_media_cache(media_cache) as cache:
+        per_image = map_media(lambda m: _ela_stats(m, cache, jpeg_quality, analysis_max_side), images)
 
-            scores.append(score)
+    # Keep media order so the averages match the serial computation
+    stats = [s for s in per_image if s is not None]
 
-        except Exception:
-            continue
-        finally:
-            if local_path:
-                safe_remove(local_path)
-            if local_path and os.path.exists(local_path + "_ela.jpg"):
-                safe_remove(local_path + "_ela.jpg")
+    legacy_scores = [s["extrema_sum"] for s in stats]
+    scores = [s["score"] for s in stats]
 
+    # Sum of per-channel max residuals, kept for dashboards built on it
+    features["ela_avg_score"] = sum(legacy_scores) / len(legacy_scores) if legacy_scores else 0
     avg_score = sum(scores) / len(scores) if scores else 0
-    features["ela_avg_score"] = avg_score
+    features["ela_score"] = round(avg_score, 4)
+    features["ela_images"] = stats
 
-    # threshold tweakable
-    if avg_score > 500:
+    if avg_score > score_threshold:
         flags.append("ELA_TAMPERED")
 
     return {"flags": flags, "features": features}
+
+
+def _ela_stats(m: MediaItem, cache: MediaCache, jpeg_quality: int,
+               analysis_max_side: Optional[int] = None) -> Optional[Dict]:
+    max_side = ANALYSIS_MAX_SIDE if analysis_max_side is None else analysis_max_side
+    try:
+        stats = result_cache.get_or_compute(
+            "ELA_TAMPERING", cache.get_digest(m.fileKey),
+            {"jpeg_quality": jpeg_quality, "analysis_max_side": max_side,
+             "block_size": ELA_BLOCK_SIZE, "score_floor": ELA_SCORE_FLOOR},
+            lambda: _compute_ela(cache.get_image(m.fileKey).analysis(max_side).rgb, jpeg_quality)
+        )
+        return {"fileKey": m.fileKey, **stats}
+
+    except Exception:
+        return None
+
+
+def _compute_ela(rgb: Image.Image, jpeg_quality: int) -> Dict:
+    buffer = io.BytesIO()
+    rgb.save(buffer, "JPEG", quality=jpeg_quality)
+    buffer.seek(0)
+    resaved = Image.open(buffer).convert("RGB")
+
+    diff = cv2.absdiff(np.asarray(rgb), np.asarray(resaved))
+    return ela_residual_stats(diff)
+
+
+def ela_residual_stats(diff: np.ndarray, block_size: int = ELA_BLOCK_SIZE) -> Dict:
+    """
+    Statistics of an HxWx3 uint8 absolute-difference image.
+    """
+    extrema_sum = int(diff.reshape(-1, diff.shape[-1]).max(axis=0).sum())
+
+    # Per-pixel residual = strongest channel; uint8 so a histogram gives
+    # exact mean/percentiles without sorting millions of pixels
+    residual = diff.max(axis=2)
+    hist = np.bincount(residual.ravel(), minlength=256)
+    cdf = np.cumsum(hist)
+    total = cdf[-1]
+    mean_residual = float(np.dot(np.arange(256), hist) / total)
+    p99_residual = int(np.searchsorted(cdf, 0.99 * total))
+
+    h, w = residual.shape
+    bh, bw = h // block_size, w // block_size
+    if bh == 0 or bw == 0:
+        block_means = np.array([mean_residual])
+    else:
+        cropped = residual[:bh * block_size, :bw * block_size].astype(np.float32)
+        block_means = cropped.reshape(bh, block_size, bw, block_size).mean(axis=(1, 3)).ravel()
+
+    block_median = float(np.median(block_means))
+    block_p99 = float(np.percentile(block_means, 99))
+    block_mad = float(np.median(np.abs(block_means - block_median)))
+    outlier_cut = block_median + 6 * max(block_mad, 0.5)
+    outlier_ratio = float(np.mean(block_means > outlier_cut))
+
+    return {
+        "extrema_sum": extrema_sum,
+        "mean_residual": round(mean_residual, 4),
+        "p99_residual": p99_residual,
+        "block_median": round(block_median, 4),
+        "block_p99": round(block_p99, 4),
+        "block_max": round(float(block_means.max()), 4),
+        "outlier_block_ratio": round(outlier_ratio, 6),
+        "score": round(block_p99 / (block_median + ELA_SCORE_FLOOR), 4)
+    }
@@ -1,12 +1,10 @@
-from typing import List, Dict
-import exifread
-import os
+from typing import List, Dict, Optional
 from models.request_models import MediaItem
-from utils.s3_utils import download_from_s3_to_temp
-from utils.temp_utils import safe_remove
+from utils.media_cache import MediaCache, use_media_cache
+from utils.worker_pool import map_media
 
 
-def extract_exif_data(media: List[MediaItem]) -> Dict:
+def extract_exif_data(media: List[MediaItem], media_cache: Optional[MediaCache] = None) -> Dict:
     """
     Extract detailed EXIF data from images:
     - DateTimeOriginal
@@ -18,91 +16,15 @@ def extract_exif_data(media: List[MediaItem]) -> Dict:
     exif_data = []
     flags = []
 
-    for m in media:
-        if m.type != "IMAGE":
-            continue
-
-        local_path = None
-        try:
-            local_path = download_from_s3_to_temp(m.fileKey)
-
-            with open(local_path, 'rb') as f:
-                tags = exifread.process_file(f, details=False)
-
-            item_exif = {
-                "fileKey": m.fileKey,
-                "datetime_original": None,
-                "gps_latitude": None,
-                "gps_longitude": None,
-                "software": None,
-                "camera_make": None,
-                "camera_model": None,
-                "has_exif": len(tags) > 0,
-                "exif_tags_count": len(tags)
-            }
-
-            # Extract DateTime
-            if "EXIF DateTimeOriginal" in tags:
-                item_exif["datetime_original"] = str(tags["EXIF DateTimeOriginal"])
-            elif "Image DateTime" in tags:
-                item_exif["datetime_original"] = str(tags["Image DateTime"])
-
-            # Extract GPS
-            if "GPS GPSLatitude" in tags and "GPS GPSLongitude" in tags:
-                lat = tags["GPS GPSLatitude"]
-                lng = tags["GPS GPSLongitude"]
-                lat_ref = tags.get("GPS GPSLatitudeRef", "N")
-                lng_ref = tags.get("GPS GPSLongitudeRef", "E")
-
-                # Convert to decimal
-                try:
-                    lat_deg = _convert_to_degrees(lat)
-                    lng_deg = _convert_to_degrees(lng)
-
-                    if lat_ref == "S":
-                        lat_deg = -lat_deg
-                    if lng_ref == "W":
-                        lng_deg = -lng_deg
-
-                    item_exif["gps_latitude"] = lat_deg
-                    item_exif["gps_longitude"] = lng_deg
-                except Exception:
-                    pass
-
-            # Extract Software (tampering indicator)
-            if "Image Software" in tags:
-                software = str(tags["Image Software"])
-                item_exif["software"] = software
-                
-                # Check for editing software
-                editing_software = ["photoshop", "gimp", "lightroom", "snapseed", "picsart"]
-                if any(sw in software.lower() for sw in editing_software):
-                    flags.append("EXIF_EDITING_SOFTWARE")
-
-            # Extract Camera Info
-            if "Image Make" in tags:
-                item_exif["camera_make"] = str(tags["Image Make"])
-            if "Image Model" in tags:
-                item_exif["camera_model"] = str(tags["Image Model"])
-
-            # Detect potential tampering indicators
-            if len(tags) < 10:
-                item_exif["exif_suspiciously_sparse"] = True
-            else:
-                item_exif["exif_suspiciously_sparse"] = False
-
-            exif_data.append(item_exif)
-
-        except Exception as e:
-            print(f"[ERROR] EXIF extraction failed for {m.fileKey}: {str(e)}")
-            exif_data.append({
-                "fileKey": m.fileKey,
-                "error": str(e),
-                "has_exif": False
-            })
-        finally:
-            if local_path:
-                safe_remove(local_path)
+    images = [m for m in media if m.type == "IMAGE"]
+
+    with use_media_cache(media_cache) as cache:
+        per_image = map_media(lambda m: _extract_item(m, cache), images)
+
+    # Collect in media order, matching the serial loop
+    for item_exif, item_flags in per_image:
+        exif_data.append(item_exif)
+        flags += item_flags
 
     return {
         "exif_data": exif_data,
@@ -110,6 +32,88 @@ def extract_exif_data(media: List[MediaItem]) -> Dict:
     }
 
 
+def _extract_item(m: MediaItem, cache: MediaCache):
+    """
+    EXIF details and flags for a single image.
+    """
+    item_flags = []
+
+    try:
+        tags = cache.get_exif_tags(m.fileKey)
+
+        item_exif = {
+            "fileKey": m.fileKey,
+            "datetime_original": None,
+            "gps_latitude": None,
+            "gps_longitude": None,
+            "software": None,
+            "camera_make": None,
+            "camera_model": None,
+            "has_exif": len(tags) > 0,
+            "exif_tags_count": len(tags)
+        }
+
+        # Extract DateTime
+        if "EXIF DateTimeOriginal" in tags:
+            item_exif["datetime_original"] = str(tags["EXIF DateTimeOriginal"])
+        elif "Image DateTime" in tags:
+            item_exif["datetime_original"] = str(tags["Image DateTime"])
+
+        # Extract GPS
+        if "GPS GPSLatitude" in tags and "GPS GPSLongitude" in tags:
+            lat = tags["GPS GPSLatitude"]
+            lng = tags["GPS GPSLongitude"]
+            lat_ref = tags.get("GPS GPSLatitudeRef", "N")
+            lng_ref = tags.get("GPS GPSLongitudeRef", "E")
+
+            # Convert to decimal
+            try:
+                lat_deg = _convert_to_degrees(lat)
+                lng_deg = _convert_to_degrees(lng)
+
+                if lat_ref == "S":
+                    lat_deg = -lat_deg
+                if lng_ref == "W":
+                    lng_deg = -lng_deg
+
+                item_exif["gps_latitude"] = lat_deg
+                item_exif["gps_longitude"] = lng_deg
+            except Exception:
+                pass
+
+        # Extract Software (tampering indicator)
+        if "Image Software" in tags:
+            software = str(tags["Image Software"])
+            item_exif["software"] = software
+                
+            # Check for editing software
+            editing_software = ["photoshop", "gimp", "lightroom", "snapseed", "picsart"]
+            if any(sw in software.lower() for sw in editing_software):
+                item_flags.append("EXIF_EDITING_SOFTWARE")
+
+        # Extract Camera Info
+        if "Image Make" in tags:
+            item_exif["camera_make"] = str(tags["Image Make"])
+        if "Image Model" in tags:
+            item_exif["camera_model"] = str(tags["Image Model"])
+
+        # Detect potential tampering indicators
+        if len(tags) < 10:
+            item_exif["exif_suspiciously_sparse"] = True
+        else:
+            item_exif["exif_suspiciously_sparse"] = False
+
+        return item_exif, item_flags
+
+    except Exception as e:
+        print(f"[ERROR] EXIF extraction failed for {m.fileKey}: {str(e)}")
+        return {
+            "fileKey": m.fileKey,
+            "error": str(e),
+            "has_exif": False
+        }, []
+
+
 def _convert_to_degrees(value):
     """
     Convert GPS coordinates to degrees
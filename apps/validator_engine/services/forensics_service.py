@@ -1,12 +1,48 @@
-from typing import List, Dict
-import cv2
+from typing import List, Dict, Optional
 import os
+import cv2
 from models.request_models import MediaItem
-from utils.s3_utils import download_from_s3_to_temp
-from utils.temp_utils import safe_remove
-
-
-def run_forensics_checks(media: List[MediaItem], image_quality_rules: Dict):
+from utils.decoded_image import ANALYSIS_MAX_SIDE, ImageDecodeError
+from utils.media_cache import MediaCache, use_media_cache
+from utils.result_cache import result_cache
+from utils.worker_pool import map_media
+
+# Laplacian variance measured on an image downscaled by `scale` relates to the
+# full-resolution value roughly as var_full = var_scaled * scale ** exponent.
+# Fit it for your camera mix with benchmarks/calibrate_blur.py.
+BLUR_CALIBRATION_EXPONENT = float(os.getenv("BLUR_CALIBRATION_EXPONENT", "2.0"))
+
+
+def calibrate_blur_variance(variance: float, scale: float,
+                            exponent: float = BLUR_CALIBRATION_EXPONENT) -> float:
+    """
+    Map a blur variance measured at `scale` to its full-resolution equivalent
+    so max_blur_variance thresholds keep their meaning.
+    """
+    if scale >= 1.0:
+        return variance
+    return variance * (scale ** exponent)
+
+
+def blur_check_enabled(image_quality_rules: Optional[Dict]) -> bool:
+    """
+    Blur needs decoded pixels; rulesets can switch it off with
+    "max_blur_variance": null (or 0) to keep this stage header-only.
+    """
+    return bool((image_quality_rules or {}).get("max_blur_variance", 120))
+
+
+def run_forensics_checks(media: List[MediaItem], image_quality_rules: Dict,
+                         media_cache: Optional[MediaCache] = None,
+                         analysis_max_side: Optional[int] = None):
+    """
+    Resolution, blur and screenshot heuristics. Blur is measured on the
+    analysis level (see DecodedImage.analysis) and calibrated back to full
+    resolution; resolution checks always use the true image dimensions.
+
+    With blur disabled (see blur_check_enabled) only image headers are read,
+    which MediaCache can answer from a ranged GET.
+    """
     flags: list[str] = []
     features: dict = {}
 
@@ -18,47 +54,27 @@ def run_forensics_checks(media: List[MediaItem], image_quality_rules: Dict):
     min_width = image_quality_rules.get("min_resolution", {}).get("width", 800)
     min_height = image_quality_rules.get("min_resolution", {}).get("height", 600)
     max_blur_variance = image_quality_rules.get("max_blur_variance", 120)
+    measure_blur = blur_check_enabled(image_quality_rules)
     reject_screenshots = image_quality_rules.get("reject_screenshots", True)
     reject_printed_photos = image_quality_rules.get("reject_printed_photos", True)
 
-    for m in media:
-        if m.type != "IMAGE":
-            continue
-
-        local_path = None
-        try:
-            print(f"[DEBUG] Downloading image from fileKey: {m.fileKey}")
-            local_path = download_from_s3_to_temp(m.fileKey)
-            img = cv2.imread(local_path)
-            if img is None:
-                print(f"[WARNING] Failed to read image from {local_path}")
-                continue
+    images = [m for m in media if m.type == "IMAGE"]
 
-            h, w, _ = img.shape
-            resolutions.append((w, h))
+    with use_media_cache(media_cache) as cache:
+        per_image = map_media(
+            lambda m: _analyze_image(m, cache, min_width, min_height, analysis_max_side, measure_blur),
+            images
+        )
 
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-            variance = cv2.Laplacian(gray, cv2.CV_64F).var()
-            blur_values.append(variance)
-
-            # Heuristic screenshot detection: weird aspect ratio or tiny resolution
-            aspect_ratio = w / h
-            if aspect_ratio > 2.2 or aspect_ratio < 0.4:
-                screenshot_count += 1
-
-            if w < min_width or h < min_height:
-                screenshot_count += 1
-
-            if m.isScreenshot:
-                screenshot_count += 1
-
-            # Printed-photo heuristic: high edge density in rectangular area
-            if m.isPrintedPhotoSuspect:
-                printed_suspect_count += 1
-
-        finally:
-            if local_path:
-                safe_remove(local_path)
+    # Aggregate in media order so averages match the serial computation
+    for item in per_image:
+        if item is None:
+            continue
+        resolutions.append(item["resolution"])
+        if item["blur_variance"] is not None:
+            blur_values.append(item["blur_variance"])
+        screenshot_count += item["screenshot_count"]
+        printed_suspect_count += item["printed_suspect_count"]
 
     avg_blur = sum(blur_values) / len(blur_values) if blur_values else None
     features["avg_blur_variance"] = avg_blur
@@ -76,3 +92,62 @@ def run_forensics_checks(media: List[MediaItem], image_quality_rules: Dict):
         flags.append("PRINTED_PHOTO_DETECTED")
 
     return {"flags": flags, "features": features}
+
+
+def _analyze_image(m: MediaItem, cache: MediaCache, min_width: int, min_height: int,
+                   analysis_max_side: Optional[int] = None,
+                   measure_blur: bool = True) -> Optional[Dict]:
+    """
+    Per-image forensic metrics. Returns None when the image cannot be
+    decoded; failures to fetch it (download, cache, Redis) are raised.
+    """
+    variance = None
+    try:
+        if measure_blur:
+            # Content-derived metrics are cached; the payload-driven
+            # heuristics below are always re-evaluated
+            max_side = ANALYSIS_MAX_SIDE if analysis_max_side is None else analysis_max_side
+            metrics = result_cache.get_or_compute(
+                "FORENSICS", cache.get_digest(m.fileKey),
+                {"analysis_max_side": max_side, "blur_exponent": BLUR_CALIBRATION_EXPONENT},
+                lambda: _pixel_metrics(cache, m.fileKey, max_side)
+            )
+            (w, h), variance = metrics["size"], metrics["blur_variance"]
+        else:
+            w, h = cache.get_size(m.fileKey)
+    except ImageDecodeError as e:
+        print(f"[WARNING] Failed to decode image {m.fileKey}: {str(e)}")
+        return None
+    except Exception as e:
+        print(f"[FORENSICS ERROR] Could not read image {m.fileKey}: {type(e).__name__}: {str(e)}")
+        raise
+
+    screenshot_count = 0
+
+    # Heuristic screenshot detection: weird aspect ratio or tiny resolution
+    aspect_ratio = w / h
+    if aspect_ratio > 2.2 or aspect_ratio < 0.4:
+        screenshot_count += 1
+
+    if w < min_width or h < min_height:
+        screenshot_count += 1
+
+    if m.isScreenshot:
+        screenshot_count += 1
+
+    # Printed-photo heuristic: high edge density in rectangular area
+    printed_suspect_count = 1 if m.isPrintedPhotoSuspect else 0
+
+    return {
+        "resolution": (w, h),
+        "blur_variance": variance,
+        "screenshot_count": screenshot_count,
+        "printed_suspect_count": printed_suspect_count
+    }
+
+
+def _pixel_metrics(cache: MediaCache, file_key: str, max_side: int) -> Dict:
+    image = cache.get_image(file_key)
+    view = image.analysis(max_side)
+    variance = calibrate_blur_variance(cv2.Laplacian(view.gray, cv2.CV_64F).var(), view.scale)
+    return {"size": list(image.size), "blur_variance": variance}
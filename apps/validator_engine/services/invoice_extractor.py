@@ -0,0 +1,260 @@
+# services/invoice_extractor.py
+
+import re
+from datetime import date
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Score an amount or date needs before it counts as found with confidence:
+# a currency marker or a total/date keyword on its line
+CONFIDENT_SCORE = 3.0
+
+# Smallest value considered an invoice amount (drops quantities, line numbers)
+MIN_AMOUNT = 100
+
+# --- Patterns (compiled once at import) ---
+
+# 1,50,000 / 150,000 / 150000 / 1,50,000.00, optionally with ₹ / Rs / INR and /-
+_AMOUNT_RE = re.compile(
+    r"(?P<currency>₹|\brs\b\.?|\binr\b)?\s*"
+    r"(?<![\d,])(?<!\d\.)(?P<number>\d{1,3}(?:,\d{2,3})+(?:\.\d{1,2})?|\d+(?:\.\d{1,2})?)(?![\d,]|\.\d)"
+    r"(?P<suffix>\s*/-)?",
+    re.IGNORECASE
+)
+_INDIAN_GROUPING_RE = re.compile(r"^\d{1,2}(?:,\d{2})*,\d{3}$")
+_WESTERN_GROUPING_RE = re.compile(r"^\d{1,3}(?:,\d{3})+$")
+
+# Spans that look numeric but are never the invoice amount
+_GSTIN_RE = re.compile(r"\b\d{2}[A-Z]{5}\d{4}[A-Z][A-Z\d]Z[A-Z\d]\b", re.IGNORECASE)
+_PHONE_RE = re.compile(r"(?:\+91[\s-]?)?\b[6-9]\d{9}\b")
+_IDENTIFIER_RE = re.compile(
+    r"\b(?:invoice|inv|bill|receipt|order|challan|po|hsn|sac|gstin|pan|pin|mob(?:ile)?|ph(?:one)?|tel|a/?c)"
+    r"\s*(?:no\.?|number|code|#)?\s*[:.#-]?\s*[A-Z0-9/-]*\d[A-Z0-9/-]*",
+    re.IGNORECASE
+)
+
+_GRAND_TOTAL_RE = re.compile(r"grand\s*total|total\s*(?:amount|payable|value|invoice\s*value)|net\s*(?:amount|payable|total)"
+                             r"|amount\s*payable|invoice\s*(?:total|value)|balance\s*due", re.IGNORECASE)
+_TOTAL_RE = re.compile(r"\btotal\b|\bamount\b|\bamt\b", re.IGNORECASE)
+_SUBTOTAL_RE = re.compile(r"sub\s*-?\s*total|taxable\s*value", re.IGNORECASE)
+_NOT_TOTAL_RE = re.compile(r"\b(?:[csi]gst|gst|tax|cess|discount|rate|qty|quantity|advance|emi|round(?:ed)?\s*off)\b",
+                           re.IGNORECASE)
+
+_MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+_MONTH = r"(?P<month_name>jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.?"
+_DATE_RES = [
+    # YYYY-MM-DD
+    re.compile(r"\b(?P<year>\d{4})[/.-](?P<month>\d{1,2})[/.-](?P<day>\d{1,2})\b"),
+    # DD/MM/YYYY, DD-MM-YY, DD.MM.YYYY (Indian invoices are day-first)
+    re.compile(r"\b(?P<day>\d{1,2})[/.-](?P<month>\d{1,2})[/.-](?P<year>\d{4}|\d{2})\b"),
+    # 12 Feb 2025, 12-Feb-25, 12th February, 2025
+    re.compile(r"\b(?P<day>\d{1,2})(?:st|nd|rd|th)?[\s/-]*" + _MONTH + r"[\s,/-]*(?P<year>\d{4}|\d{2})\b",
+               re.IGNORECASE),
+    # Feb 12, 2025
+    re.compile(r"\b" + _MONTH + r"\s*(?P<day>\d{1,2})(?:st|nd|rd|th)?,?\s*(?P<year>\d{4})\b", re.IGNORECASE),
+]
+# One pass to blank out everything that is not an amount (dates, GSTINs,
+# phone and document numbers); date groups are made non-capturing first
+_NON_AMOUNT_RE = re.compile(
+    "|".join([_GSTIN_RE.pattern, _IDENTIFIER_RE.pattern, _PHONE_RE.pattern]
+             + [re.sub(r"\(\?P<\w+>", "(?:", p.pattern) for p in _DATE_RES]),
+    re.IGNORECASE
+)
+_DIGIT_RE = re.compile(r"\d")
+
+_INVOICE_DATE_RE = re.compile(r"(?:invoice|inv|bill|tax\s*invoice)\s*\.?\s*date|\bdated\b", re.IGNORECASE)
+_DATE_WORD_RE = re.compile(r"\bdate\b|\bdt\b", re.IGNORECASE)
+_OTHER_DATE_RE = re.compile(r"due|expiry|valid|birth|\bdob\b|delivery|challan|order|warranty|print", re.IGNORECASE)
+
+# (text, OCR confidence 0-1) in reading order
+Lines = Sequence[Tuple[str, float]]
+
+
+def _parse_number(number: str) -> Optional[float]:
+    """
+    Numeric value of an amount token. Comma groups must follow Indian
+    (1,50,000) or Western (150,000) grouping, otherwise the token is
+    rejected as an OCR fragment.
+    """
+    integer, _, fraction = number.partition(".")
+    if "," in integer and not (_INDIAN_GROUPING_RE.match(integer) or _WESTERN_GROUPING_RE.match(integer)):
+        return None
+    try:
+        return float(integer.replace(",", "") + ("." + fraction if fraction else ""))
+    except ValueError:
+        return None
+
+
+def _blank(match: re.Match) -> str:
+    # Same-length blanks keep the offsets of everything else on the line
+    return " " * len(match.group(0))
+
+
+def _amount_line_score(text: str) -> float:
+    # Total keywords on the line, less a penalty for tax/discount/quantity lines
+    line_score = 0.0
+    if _GRAND_TOTAL_RE.search(text):
+        line_score += 4.0
+    elif _SUBTOTAL_RE.search(text):
+        line_score += 1.0
+    elif _TOTAL_RE.search(text):
+        line_score += 3.0
+    if _NOT_TOTAL_RE.search(text) and not _GRAND_TOTAL_RE.search(text):
+        line_score -= 2.0
+    return line_score
+
+
+def amount_candidates(text: str, confidence: float = 1.0, label_score: float = 0.0) -> List[Dict]:
+    """
+    Scored amount candidates on one OCR line: {"value", "score", "text",
+    "confidence"}. label_score is used when the line has no keyword of
+    its own (the label was the previous OCR box).
+    """
+    if not _DIGIT_RE.search(text):
+        return []
+    # Dates, GSTINs, phone numbers and document numbers are not amounts
+    masked = _NON_AMOUNT_RE.sub(_blank, text)
+
+    line_score = _amount_line_score(text) or label_score
+
+    candidates = []
+    for match in _AMOUNT_RE.finditer(masked):
+        number = match.group("number")
+        value = _parse_number(number)
+        if value is None or value < MIN_AMOUNT:
+            continue
+
+        currency = bool(match.group("currency"))
+        separators = "," in number or "." in number
+        # A bare 19xx/20xx is a year, not a price
+        if not currency and not separators and len(number) == 4 and 1900 <= value <= 2099:
+            continue
+
+        score = line_score
+        if currency:
+            score += 3.0
+        if separators:
+            score += 1.0
+        if match.group("suffix"):
+            score += 1.0
+        candidates.append({"value": value, "score": score, "text": match.group(0).strip(), "confidence": confidence})
+    return candidates
+
+
+def extract_amount(lines: Lines, min_confidence: float = 0.0) -> Optional[Dict]:
+    """
+    Best invoice amount over all lines: {"value", "score", "text",
+    "confidence", "confident"}, or None. Ties go to the larger value (a
+    grand total is at least its subtotal), then to the better-read line.
+    """
+    best = None
+    best_key = None
+    label_score = 0.0
+    for text, confidence in lines:
+        candidates = amount_candidates(text, confidence, label_score)
+        for candidate in candidates:
+            key = (candidate["score"], candidate["value"], confidence)
+            if best_key is None or key > best_key:
+                best, best_key = candidate, key
+        # A label with no amount ("Grand Total") scores the next line
+        label_score = 0.0 if candidates else _amount_line_score(text)
+    if best is not None:
+        best["confident"] = best["score"] >= CONFIDENT_SCORE and best["confidence"] >= min_confidence
+    return best
+
+
+def parse_date(match: re.Match) -> Optional[date]:
+    """
+    date for a _DATE_RES match, or None when it is not a real calendar date.
+    """
+    groups = match.groupdict()
+    try:
+        day = int(groups["day"])
+        month = _MONTHS[groups["month_name"][:3].lower()] if groups.get("month_name") else int(groups["month"])
+        year = int(groups["year"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    if year < 100:
+        year += 2000
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+def _date_line_score(text: str) -> float:
+    # Invoice-date keywords on the line, less a penalty for due/order/warranty dates
+    line_score = 0.0
+    if _INVOICE_DATE_RE.search(text):
+        line_score += 4.0
+    elif _DATE_WORD_RE.search(text):
+        line_score += 3.0
+    if _OTHER_DATE_RE.search(text):
+        line_score -= 3.0
+    return line_score
+
+
+def date_candidates(text: str, confidence: float = 1.0, max_year: Optional[int] = None,
+                    label_score: float = 0.0) -> List[Dict]:
+    """
+    Scored date candidates on one OCR line: {"value", "score", "text",
+    "confidence"}. Dates outside 2000..max_year (next year) are ignored;
+    label_score is used when the line has no keyword of its own.
+    """
+    if not _DIGIT_RE.search(text):
+        return []
+    max_year = max_year or date.today().year + 1
+
+    line_score = _date_line_score(text) or label_score
+
+    candidates = []
+    taken: List[Tuple[int, int]] = []
+    for pattern in _DATE_RES:
+        for match in pattern.finditer(text):
+            start, end = match.span()
+            if any(start < t_end and t_start < end for t_start, t_end in taken):
+                continue
+            value = parse_date(match)
+            if value is None or not 2000 <= value.year <= max_year:
+                continue
+            taken.append((start, end))
+            candidates.append({"value": value, "score": line_score, "text": match.group(0), "confidence": confidence})
+    return candidates
+
+
+def extract_date(lines: Lines, min_confidence: float = 0.0) -> Optional[Dict]:
+    """
+    Best invoice date over all lines: {"value" (datetime.date), "score",
+    "text", "confidence", "confident"}, or None. Ties go to the earliest
+    line (the header date comes before dates in terms and footers).
+    """
+    best = None
+    max_year = date.today().year + 1
+    label_score = 0.0
+    for text, confidence in lines:
+        candidates = date_candidates(text, confidence, max_year, label_score)
+        for candidate in candidates:
+            if best is None or candidate["score"] > best["score"]:
+                best = candidate
+        # A label with no date ("Invoice Date:") scores the next line
+        label_score = 0.0 if candidates else _date_line_score(text)
+    if best is not None:
+        best["confident"] = best["score"] >= CONFIDENT_SCORE and best["confidence"] >= min_confidence
+    return best
+
+
+def extract_invoice_fields(lines: Lines, min_confidence: float = 0.0) -> Dict:
+    """
+    {"amount", "amount_confident", "date", "date_confident"}; amount is a
+    float, date a datetime.date, either None when nothing was found.
+    """
+    amount = extract_amount(lines, min_confidence)
+    invoice_date = extract_date(lines, min_confidence)
+    return {
+        "amount": amount["value"] if amount else None,
+        "amount_confident": bool(amount and amount["confident"]),
+        "date": invoice_date["value"] if invoice_date else None,
+        "date_confident": bool(invoice_date and invoice_date["confident"]),
+    }
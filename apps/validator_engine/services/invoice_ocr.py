@@ -0,0 +1,231 @@
+# services/invoice_ocr.py
+
+import os
+import threading
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+from models.request_models import MediaItem
+from services.invoice_extractor import extract_invoice_fields
+from services.ocr_pool import OCR_LANGUAGES, ocr_pool
+from utils.decoded_image import Buffer, open_buffer
+from utils.media_cache import MediaCache
+from utils.result_cache import result_cache
+
+# Resolution invoices are read at. PDFs are rendered at OCR_TARGET_DPI;
+# photos/scans are downscaled to OCR_MAX_SIDE (~150 DPI for an A4 page)
+OCR_TARGET_DPI = int(os.getenv("OCR_TARGET_DPI", "150"))
+OCR_MAX_SIDE = int(os.getenv("OCR_MAX_SIDE", "1800"))
+# Pages read per PDF document
+OCR_MAX_PAGES = int(os.getenv("OCR_MAX_PAGES", "10"))
+# Stop reading regions/pages/documents once every wanted field is confident
+OCR_EARLY_EXIT = os.getenv("OCR_EARLY_EXIT", "true").lower() == "true"
+# Recognition confidence (0-1) a field's line needs to count as confident
+OCR_MIN_CONFIDENCE = float(os.getenv("OCR_MIN_CONFIDENCE", "0.5"))
+
+# Page bands by vertical position of the text box, read in this order:
+# totals sit at the bottom of an invoice, the invoice date in the header
+_ZONES = ("totals", "header", "body")
+_TOTALS_FROM = 0.55
+_HEADER_TO = 0.35
+
+# pdfium is not thread-safe; pages are opened and rendered under this lock
+_pdfium_lock = threading.Lock()
+
+
+def _satisfied(fields: Dict, want_amount: bool, want_date: bool) -> bool:
+    return (not want_amount or fields["amount_confident"]) and (not want_date or fields["date_confident"])
+
+
+# --- Runs on an OCR worker (ocr_pool.call) ---
+
+def ocr_page(reader, page: np.ndarray, want_amount: bool, want_date: bool,
+             min_confidence: float, early_exit: bool) -> Dict:
+    """
+    Detect every text box on the page once, then recognize zone by zone
+    (totals, header, body), stopping after the first zone that makes the
+    wanted fields confident. Returns {"lines", "regions", "regions_total"};
+    lines are the recognized boxes joined into visual rows.
+    """
+    from easyocr.utils import reformat_input
+
+    img, grey = reformat_input(page)
+    horizontal, free = reader.detect(img)
+    horizontal, free = horizontal[0], free[0]
+    height = float(page.shape[0])
+
+    # horizontal boxes are [x_min, x_max, y_min, y_max]; free boxes are 4 points
+    zoned = {zone: ([], []) for zone in _ZONES}
+    for box in horizontal:
+        zoned[_zone((box[2] + box[3]) / 2.0 / height)][0].append(box)
+    for box in free:
+        zoned[_zone(sum(p[1] for p in box) / 4.0 / height)][1].append(box)
+
+    found = []
+    recognized = 0
+    for zone in _ZONES:
+        h_boxes, f_boxes = zoned[zone]
+        if not h_boxes and not f_boxes:
+            continue
+        for box, text, confidence in reader.recognize(grey, horizontal_list=h_boxes, free_list=f_boxes, detail=1):
+            ys = [point[1] for point in box]
+            found.append((float(min(ys)), float(max(ys)), float(min(point[0] for point in box)),
+                          text, float(confidence)))
+        recognized += len(h_boxes) + len(f_boxes)
+
+        if early_exit and _satisfied(extract_invoice_fields(join_rows(found), min_confidence),
+                                     want_amount, want_date):
+            break
+
+    return {
+        "lines": [[text, round(conf, 4)] for text, conf in join_rows(found)],
+        "regions": recognized,
+        "regions_total": len(horizontal) + len(free)
+    }
+
+
+def join_rows(boxes: Sequence[Tuple[float, float, float, str, float]]) -> List[Tuple[str, float]]:
+    """
+    Group recognized boxes (y_min, y_max, x_min, text, confidence) into
+    visual rows, top to bottom. EasyOCR returns "Grand Total" and
+    "₹1,50,000" as separate boxes; the extractor needs them on one line.
+    A box joins the current row when its vertical center lies inside the
+    row's span; a row reads left to right and keeps its lowest confidence.
+    """
+    rows: List[List] = []
+    for box in sorted(boxes, key=lambda b: (b[0] + b[1]) / 2.0):
+        center = (box[0] + box[1]) / 2.0
+        if rows and rows[-1][0] <= center <= rows[-1][1]:
+            row = rows[-1]
+            row[0], row[1] = min(row[0], box[0]), max(row[1], box[1])
+            row[2].append(box)
+        else:
+            rows.append([box[0], box[1], [box]])
+    return [
+        (" ".join(b[3] for b in sorted(row_boxes, key=lambda b: b[2])), min(b[4] for b in row_boxes))
+        for _, _, row_boxes in rows
+    ]
+
+
+def _zone(y_fraction: float) -> str:
+    if y_fraction >= _TOTALS_FROM:
+        return "totals"
+    if y_fraction < _HEADER_TO:
+        return "header"
+    return "body"
+
+
+# --- Parent side ---
+
+def iter_pages(m: MediaItem, cache: MediaCache, max_pages: int = OCR_MAX_PAGES) -> Iterator[np.ndarray]:
+    """
+    RGB arrays of the document's pages at OCR resolution, one at a time, so
+    a long PDF is never rendered in full before OCR starts.
+    """
+    data = cache.get_bytes(m.fileKey)
+    if data[:5] == b"%PDF-":
+        yield from _iter_pdf_pages(data, max_pages)
+        return
+
+    view = cache.get_image(m.fileKey).analysis(OCR_MAX_SIDE)
+    yield np.ascontiguousarray(view.bgr[:, :, ::-1])
+
+
+def _iter_pdf_pages(data: Buffer, max_pages: int) -> Iterator[np.ndarray]:
+    try:
+        import pypdfium2 as pdfium
+    except ImportError:
+        raise RuntimeError("pypdfium2 is required to OCR PDF invoices")
+
+    with _pdfium_lock:
+        # pdfium takes bytes or a file object; other buffers are read in place
+        pdf = pdfium.PdfDocument(data if isinstance(data, bytes) else open_buffer(data))
+        page_count = len(pdf)
+    try:
+        for index in range(min(page_count, max_pages) if max_pages else page_count):
+            with _pdfium_lock:
+                page = pdf[index]
+                try:
+                    # PDF units are 1/72 inch; never exceed OCR_MAX_SIDE
+                    scale = OCR_TARGET_DPI / 72.0
+                    if OCR_MAX_SIDE:
+                        scale = min(scale, OCR_MAX_SIDE / max(page.get_size()))
+                    image = page.render(scale=scale).to_pil().convert("RGB")
+                finally:
+                    page.close()
+            yield np.asarray(image)
+    finally:
+        with _pdfium_lock:
+            pdf.close()
+
+
+def read_document(m: MediaItem, cache: MediaCache, want_amount: bool, want_date: bool) -> Dict:
+    """
+    OCR lines of one document, page by page, stopping once the wanted fields
+    are confident. Cached per document content and OCR settings.
+    """
+    config = {
+        "languages": OCR_LANGUAGES,
+        "dpi": OCR_TARGET_DPI,
+        "max_side": OCR_MAX_SIDE,
+        "max_pages": OCR_MAX_PAGES,
+        "early_exit": OCR_EARLY_EXIT,
+        "min_confidence": OCR_MIN_CONFIDENCE,
+        "want_amount": want_amount,
+        "want_date": want_date
+    }
+
+    def compute():
+        lines = []
+        pages = regions = regions_total = 0
+        early_exit = False
+        for page in iter_pages(m, cache):
+            result = ocr_pool.call(ocr_page, page, want_amount, want_date, OCR_MIN_CONFIDENCE, OCR_EARLY_EXIT)
+            lines.extend((text, conf) for text, conf in result["lines"])
+            pages += 1
+            regions += result["regions"]
+            regions_total += result["regions_total"]
+            fields = extract_invoice_fields(lines, OCR_MIN_CONFIDENCE)
+            if OCR_EARLY_EXIT and _satisfied(fields, want_amount, want_date):
+                early_exit = True
+                break
+        return {"lines": lines, "pages": pages, "regions": regions, "regions_total": regions_total,
+                "early_exit": early_exit}
+
+    return result_cache.get_or_compute("OCR_INVOICE", cache.get_digest(m.fileKey), config, compute)
+
+
+def read_invoices(documents: List[MediaItem], cache: MediaCache, want_amount: bool, want_date: bool) -> Dict:
+    """
+    OCR every invoice document in order until the wanted fields are
+    confident. A document that fails is recorded and skipped.
+    Returns {"lines", "fields", "documents", "pages", "regions",
+    "regions_total", "early_exit", "errors"}.
+    """
+    summary = {"lines": [], "documents": 0, "pages": 0, "regions": 0, "regions_total": 0,
+               "early_exit": False, "errors": []}
+    fields = extract_invoice_fields([])
+
+    for index, m in enumerate(documents):
+        try:
+            # Only look for what earlier documents have not settled yet
+            doc = read_document(m, cache, want_amount and not fields["amount_confident"],
+                                want_date and not fields["date_confident"])
+        except Exception as e:
+            print(f"[OCR ERROR] {m.fileKey}: {str(e)}")
+            summary["errors"].append({"fileKey": m.fileKey, "error": str(e)})
+            continue
+
+        summary["lines"].extend(tuple(line) for line in doc["lines"])
+        summary["documents"] += 1
+        for counter in ("pages", "regions", "regions_total"):
+            summary[counter] += doc[counter]
+        fields = extract_invoice_fields(summary["lines"], OCR_MIN_CONFIDENCE)
+
+        if OCR_EARLY_EXIT and _satisfied(fields, want_amount, want_date):
+            summary["early_exit"] = doc["early_exit"] or index < len(documents) - 1
+            break
+
+    summary["fields"] = fields
+    return summary
@@ -0,0 +1,285 @@
+import json
+import os
+import threading
+import time
+import traceback
+import uuid
+from datetime import datetime
+from typing import Dict, Optional
+
+from models.request_models import SubmissionPayload
+from utils.redis_client import redis_client
+from validation_engine import validate_submission_engine
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "600"))
+# A running job's lease is extended this often, so long validations are not requeued
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", str(max(1, JOB_LEASE_SECONDS // 3))))
+JOB_RESULT_TTL = int(os.getenv("JOB_RESULT_TTL", str(7 * 24 * 3600)))
+
+JOB_QUEUE_KEY = "validation_jobs:queue"
+JOB_PROCESSING_KEY = "validation_jobs:processing"
+JOB_KEY_PREFIX = "validation_job:"
+
+# Job ids found in the processing list without a lease on the previous pass
+_unleased_seen: set = set()
+
+# Move a job from the processing list back onto the queue, only if it is still
+# there (LREM removed it) and its lease is expired or, with an owner given,
+# still held by that owner. Atomic, so concurrent reapers and the failing
+# worker never push the same job twice.
+# KEYS: processing list, queue, job hash
+# ARGV: job id, updatedAt, now (epoch), lease owner or "", error or ""
+_REQUEUE_LUA = """
+if ARGV[4] ~= '' then
+    if redis.call('HGET', KEYS[3], 'leaseOwner') ~= ARGV[4] then return 0 end
+else
+    local lease = redis.call('HGET', KEYS[3], 'leaseUntil')
+    if lease and tonumber(lease) > tonumber(ARGV[3]) then return 0 end
+end
+if redis.call('LREM', KEYS[1], 1, ARGV[1]) ~= 1 then return 0 end
+redis.call('HSET', KEYS[3], 'status', 'QUEUED', 'updatedAt', ARGV[2])
+if ARGV[5] ~= '' then redis.call('HSET', KEYS[3], 'error', ARGV[5]) end
+redis.call('HDEL', KEYS[3], 'leaseUntil', 'leaseOwner')
+redis.call('LPUSH', KEYS[2], ARGV[1])
+return 1
+"""
+_requeue_script = redis_client.register_script(_REQUEUE_LUA)
+
+# Extend the lease only while this worker still owns the job
+# KEYS: job hash; ARGV: lease owner, new leaseUntil
+_RENEW_LUA = """
+if redis.call('HGET', KEYS[1], 'leaseOwner') ~= ARGV[1] then return 0 end
+redis.call('HSET', KEYS[1], 'leaseUntil', ARGV[2])
+return 1
+"""
+_renew_script = redis_client.register_script(_RENEW_LUA)
+
+
+def _job_key(job_id: str) -> str:
+    return f"{JOB_KEY_PREFIX}{job_id}"
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat() + "Z"
+
+
+def enqueue_job(payload: SubmissionPayload) -> str:
+    """
+    Persist the payload under a new job id and push it onto the work queue.
+    """
+    job_id = uuid.uuid4().hex
+    now = _now()
+
+    pipe = redis_client.pipeline()
+    pipe.hset(_job_key(job_id), mapping={
+        "jobId": job_id,
+        "submissionId": payload.submissionId,
+        "status": "QUEUED",
+        "attempts": 0,
+        "payload": payload.json(),
+        "createdAt": now,
+        "updatedAt": now
+    })
+    pipe.lpush(JOB_QUEUE_KEY, job_id)
+    pipe.execute()
+
+    print(f"[JOBS] Queued job {job_id} for submission {payload.submissionId}")
+    return job_id
+
+
+def get_job(job_id: str) -> Optional[Dict]:
+    """
+    Public view of a job: status, timestamps and (when finished) the result.
+    """
+    job = redis_client.hgetall(_job_key(job_id))
+    if not job:
+        return None
+
+    view = {
+        "jobId": job_id,
+        "submissionId": job.get("submissionId"),
+        "status": job.get("status"),
+        "attempts": int(job.get("attempts", 0)),
+        "createdAt": job.get("createdAt"),
+        "updatedAt": job.get("updatedAt")
+    }
+    if job.get("result"):
+        view["aiSummary"] = json.loads(job["result"])
+    if job.get("error"):
+        view["error"] = job["error"]
+    return view
+
+
+def requeue_stale_jobs() -> int:
+    """
+    Move jobs whose worker lease expired (worker crashed or was restarted)
+    from the processing list back onto the queue.
+    """
+    global _unleased_seen
+
+    requeued = 0
+    now = time.time()
+    unleased = set()
+    for job_id in redis_client.lrange(JOB_PROCESSING_KEY, 0, -1):
+        lease_until = redis_client.hget(_job_key(job_id), "leaseUntil")
+        if lease_until is None and job_id not in _unleased_seen:
+            # Just popped and not leased yet; only stale if still unleased next pass
+            unleased.add(job_id)
+            continue
+        if lease_until is not None and float(lease_until) > now:
+            continue
+
+        requeued += _requeue(job_id)
+
+    _unleased_seen = unleased
+    if requeued:
+        print(f"[JOBS] Requeued {requeued} stale job(s)")
+    return requeued
+
+
+def _requeue(job_id: str, owner: str = "", error: str = "") -> int:
+    return int(_requeue_script(
+        keys=[JOB_PROCESSING_KEY, JOB_QUEUE_KEY, _job_key(job_id)],
+        args=[job_id, _now(), time.time(), owner, error]
+    ))
+
+
+class _LeaseHeartbeat:
+    """
+    Extends a running job's lease every JOB_HEARTBEAT_SECONDS until stopped.
+    """
+
+    def __init__(self, job_id: str, owner: str):
+        self.job_id = job_id
+        self.owner = owner
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"job-lease-{job_id[:8]}", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(JOB_HEARTBEAT_SECONDS):
+            try:
+                renewed = _renew_script(keys=[_job_key(self.job_id)],
+                                        args=[self.owner, time.time() + JOB_LEASE_SECONDS])
+            except Exception as e:
+                print(f"[JOBS ERROR] Lease renewal for job {self.job_id} failed: {str(e)}")
+                continue
+            if not renewed:
+                print(f"[JOBS] Lost the lease on job {self.job_id}; it was requeued elsewhere")
+                return
+
+
+def _finish(job_id: str, mapping: Dict):
+    pipe = redis_client.pipeline()
+    pipe.hset(_job_key(job_id), mapping={**mapping, "updatedAt": _now()})
+    # A retried job that succeeds must not keep the previous attempt's error
+    pipe.hdel(_job_key(job_id), "leaseUntil", "leaseOwner", *(() if "error" in mapping else ("error",)))
+    pipe.expire(_job_key(job_id), JOB_RESULT_TTL)
+    pipe.lrem(JOB_PROCESSING_KEY, 1, job_id)
+    pipe.execute()
+
+
+def process_job(job_id: str):
+    """
+    Run one job. The engine itself delivers the result to the backend through
+    the callback service; the job record keeps a copy for GET /validate/jobs.
+    """
+    key = _job_key(job_id)
+    raw_payload = redis_client.hget(key, "payload")
+    if raw_payload is None:
+        print(f"[JOBS] Job {job_id} has no payload, dropping")
+        redis_client.lrem(JOB_PROCESSING_KEY, 1, job_id)
+        return
+
+    attempts = redis_client.hincrby(key, "attempts", 1)
+    owner = uuid.uuid4().hex
+    redis_client.hset(key, mapping={
+        "status": "PROCESSING",
+        "leaseUntil": time.time() + JOB_LEASE_SECONDS,
+        "leaseOwner": owner,
+        "updatedAt": _now()
+    })
+
+    try:
+        payload = SubmissionPayload.parse_raw(raw_payload)
+        with _LeaseHeartbeat(job_id, owner):
+            result = validate_submission_engine(payload)
+        _finish(job_id, {"status": "COMPLETED", "result": json.dumps(result)})
+        print(f"[JOBS] Job {job_id} completed: {result.get('decision')}")
+    except Exception as e:
+        print(f"[JOBS ERROR] Job {job_id} attempt {attempts} failed: {str(e)}")
+        print(traceback.format_exc())
+        if attempts < JOB_MAX_ATTEMPTS:
+            _requeue(job_id, owner=owner, error=str(e))
+        else:
+            _finish(job_id, {"status": "FAILED", "error": str(e)})
+
+
+class JobWorkerPool:
+    """
+    Background threads that drain the Redis job queue. BRPOPLPUSH moves each
+    job into a processing list atomically, so a crashed worker's jobs are
+    recovered by requeue_stale_jobs() once their lease runs out. A running
+    job's lease is renewed by a heartbeat, so only dead workers lose theirs.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS, poll_timeout: int = 1):
+        self.workers = workers
+        self.poll_timeout = poll_timeout
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        if self.workers <= 0:
+            print("[JOBS] Job workers disabled (JOB_WORKERS=0)")
+            return
+
+        try:
+            requeue_stale_jobs()
+        except Exception as e:
+            print(f"[JOBS ERROR] Could not recover stale jobs: {str(e)}")
+
+        for i in range(self.workers):
+            t = threading.Thread(target=self._run, name=f"job-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+        reaper = threading.Thread(target=self._reap, name="job-reaper", daemon=True)
+        reaper.start()
+        self._threads.append(reaper)
+
+        print(f"[JOBS] Started {self.workers} job worker(s)")
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        for t in self._threads:
+            t.join(timeout=timeout)
+        self._threads = []
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                job_id = redis_client.brpoplpush(JOB_QUEUE_KEY, JOB_PROCESSING_KEY, timeout=self.poll_timeout)
+            except Exception as e:
+                print(f"[JOBS ERROR] Queue poll failed: {str(e)}")
+                self._stop.wait(self.poll_timeout)
+                continue
+
+            if job_id:
+                process_job(job_id)
+
+    def _reap(self):
+        while not self._stop.wait(JOB_LEASE_SECONDS / 2):
+            try:
+                requeue_stale_jobs()
+            except Exception as e:
+                print(f"[JOBS ERROR] Stale job recovery failed: {str(e)}")
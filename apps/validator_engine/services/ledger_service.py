@@ -1,95 +1,796 @@
+import atexit
 import hashlib
 import json
-from datetime import datetime
-from typing import Dict, Any, Optional
+import multiprocessing
 import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Any, Iterable, List, Optional, Tuple
+
+from utils.merkle import leaf_hash, merkle_proof, merkle_root
+
+# SQLite file shared by every worker process on the host
+LEDGER_DB_PATH = os.getenv("LEDGER_DB_PATH", "ledger.sqlite3")
+# Entries are buffered and written in one transaction per batch
+LEDGER_FLUSH_INTERVAL = float(os.getenv("LEDGER_FLUSH_INTERVAL", "0.2"))
+LEDGER_FLUSH_BATCH = int(os.getenv("LEDGER_FLUSH_BATCH", "256"))
+# Unflushed entries held in memory; add_entry waits (up to the timeout) when full
+LEDGER_BUFFER_MAX = int(os.getenv("LEDGER_BUFFER_MAX", "10000"))
+LEDGER_BUFFER_TIMEOUT = float(os.getenv("LEDGER_BUFFER_TIMEOUT", "30"))
+# Append buffers, picked by submission id; concurrent validations rarely share one
+LEDGER_SHARDS = int(os.getenv("LEDGER_SHARDS", "16"))
+# Seconds between Merkle anchors of the sub-chain heads; 0 = only on shutdown
+LEDGER_ANCHOR_INTERVAL = float(os.getenv("LEDGER_ANCHOR_INTERVAL", "60"))
+# FULL fsyncs every batch commit; NORMAL only at WAL checkpoints
+LEDGER_SYNCHRONOUS = os.getenv("LEDGER_SYNCHRONOUS", "FULL").upper()
+# Hash scheme for new entries (1 = sorted-key JSON of the entry, 2 = length-prefixed fields)
+LEDGER_HASH_VERSION = int(os.getenv("LEDGER_HASH_VERSION", "2"))
+# Processes used by a full audit; 0 = one per CPU
+LEDGER_AUDIT_WORKERS = int(os.getenv("LEDGER_AUDIT_WORKERS", "0"))
+
+GENESIS_HASH = "0" * 64
+
+# Smallest seq span handed to one audit worker; below it process start-up dominates
+_AUDIT_MIN_SLICE = 10000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ledger_entries (
+    seq           INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp     TEXT NOT NULL,
+    event_type    TEXT NOT NULL,
+    submission_id TEXT NOT NULL,
+    performed_by  TEXT NOT NULL,
+    event_data    TEXT NOT NULL,
+    previous_hash TEXT NOT NULL,
+    entry_hash    TEXT NOT NULL UNIQUE,
+    hash_version  INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS ledger_entries_submission ON ledger_entries (submission_id, seq);
+CREATE TRIGGER IF NOT EXISTS ledger_entries_no_update BEFORE UPDATE ON ledger_entries
+BEGIN SELECT RAISE(ABORT, 'ledger is append-only'); END;
+CREATE TRIGGER IF NOT EXISTS ledger_entries_no_delete BEFORE DELETE ON ledger_entries
+BEGIN SELECT RAISE(ABORT, 'ledger is append-only'); END;
+
+CREATE TABLE IF NOT EXISTS ledger_anchors (
+    anchor_id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at           TEXT NOT NULL,
+    first_seq            INTEGER NOT NULL,
+    last_seq             INTEGER NOT NULL,
+    leaf_count           INTEGER NOT NULL,
+    merkle_root          TEXT NOT NULL,
+    previous_anchor_hash TEXT NOT NULL,
+    anchor_hash          TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS ledger_anchor_leaves (
+    anchor_id     INTEGER NOT NULL,
+    position      INTEGER NOT NULL,
+    submission_id TEXT NOT NULL,
+    head_seq      INTEGER NOT NULL,
+    head_hash     TEXT NOT NULL,
+    PRIMARY KEY (anchor_id, position)
+);
+CREATE INDEX IF NOT EXISTS ledger_anchor_leaves_submission ON ledger_anchor_leaves (submission_id, anchor_id);
+CREATE TRIGGER IF NOT EXISTS ledger_anchors_no_update BEFORE UPDATE ON ledger_anchors
+BEGIN SELECT RAISE(ABORT, 'ledger is append-only'); END;
+CREATE TRIGGER IF NOT EXISTS ledger_anchors_no_delete BEFORE DELETE ON ledger_anchors
+BEGIN SELECT RAISE(ABORT, 'ledger is append-only'); END;
+
+CREATE TABLE IF NOT EXISTS ledger_checkpoints (
+    checkpoint_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at    TEXT NOT NULL,
+    mode          TEXT NOT NULL,
+    verified_seq  INTEGER NOT NULL,
+    anchor_id     INTEGER NOT NULL,
+    anchor_hash   TEXT NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS ledger_checkpoints_no_update BEFORE UPDATE ON ledger_checkpoints
+BEGIN SELECT RAISE(ABORT, 'ledger is append-only'); END;
+CREATE TRIGGER IF NOT EXISTS ledger_checkpoints_no_delete BEFORE DELETE ON ledger_checkpoints
+BEGIN SELECT RAISE(ABORT, 'ledger is append-only'); END;
+"""
+
+_ENTRY_COLUMNS = ("seq, timestamp, event_type, submission_id, performed_by, event_data, previous_hash, "
+                  "entry_hash, hash_version")
+# Positions in an _ENTRY_COLUMNS row; verification works on raw rows
+_SEQ, _TIMESTAMP, _EVENT_TYPE, _SUBMISSION, _PERFORMED_BY, _EVENT_DATA, _PREVIOUS, _HASH, _VERSION = range(9)
+
+
+def canonical_event_json(event_data: Any) -> str:
+    """
+    The stored form of event_data; hash version 2 covers this exact text.
+    """
+    return json.dumps(event_data, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def _hash_v1(timestamp: str, event_type: str, submission_id: str, performed_by: str,
+             event_json: str, previous_hash: str) -> str:
+    # Original scheme: sorted-key JSON of the whole entry, so event_data is parsed and re-serialized
+    entry = {
+        "timestamp": timestamp,
+        "event_type": event_type,
+        "submission_id": submission_id,
+        "event_data": json.loads(event_json),
+        "performed_by": performed_by,
+        "previous_hash": previous_hash
+    }
+    return hashlib.sha256(json.dumps(entry, sort_keys=True).encode()).hexdigest()
+
+
+def _hash_v2(timestamp: str, event_type: str, submission_id: str, performed_by: str,
+             event_json: str, previous_hash: str) -> str:
+    # Length-prefixed fields over the stored text: no JSON work to verify an entry
+    digest = hashlib.sha256(b"ledger-v2")
+    for field in (timestamp, event_type, submission_id, performed_by, previous_hash, event_json):
+        data = field.encode()
+        digest.update(b"%d:" % len(data))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+_HASHERS = {1: _hash_v1, 2: _hash_v2}
+
+
+def compute_entry_hash(version: int, timestamp: str, event_type: str, submission_id: str,
+                       performed_by: str, event_json: str, previous_hash: str) -> str:
+    hasher = _HASHERS.get(version)
+    if hasher is None:
+        raise ValueError(f"Unknown ledger hash version {version}")
+    return hasher(timestamp, event_type, submission_id, performed_by, event_json, previous_hash)
+
+
+def _row_hash(row: tuple) -> str:
+    return compute_entry_hash(row[_VERSION], row[_TIMESTAMP], row[_EVENT_TYPE], row[_SUBMISSION],
+                              row[_PERFORMED_BY], row[_EVENT_DATA], row[_PREVIOUS])
+
+
+def _check_rows(rows: Iterable[tuple], heads: Dict[str, str],
+                previous_for: Callable[[tuple], str]) -> Tuple[int, Optional[str]]:
+    """
+    Verify rows (in seq order) against the running per-submission heads.
+    previous_for(row) gives the expected previous_hash when the row's
+    submission is not in heads yet. Returns (rows checked, first error).
+    """
+    checked = 0
+    for row in rows:
+        submission_id = row[_SUBMISSION]
+        expected = heads.get(submission_id)
+        if expected is None:
+            expected = previous_for(row)
+
+        # Verify previous hash matches
+        if row[_PREVIOUS] != expected:
+            return checked, f"{submission_id}: Hash chain broken at {row[_TIMESTAMP]} (seq {row[_SEQ]})"
+
+        # Verify entry hash
+        if _row_hash(row) != row[_HASH]:
+            return checked, f"{submission_id}: Entry hash mismatch at {row[_TIMESTAMP]} (seq {row[_SEQ]})"
+
+        heads[submission_id] = row[_HASH]
+        checked += 1
+    return checked, None
+
+
+def _audit_range(db_path: str, first_seq: int, last_seq: int) -> Dict:
+    """
+    Full-audit worker: check every entry hash in [first_seq, last_seq] and
+    the links inside the range. Each submission's first link points into an
+    earlier range, so it is returned ("boundaries") with the submission's
+    last hash ("heads") for the parent to stitch.
+    """
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        rows = conn.execute(
+            f"SELECT {_ENTRY_COLUMNS} FROM ledger_entries WHERE seq BETWEEN ? AND ? ORDER BY seq",
+            (first_seq, last_seq)
+        )
+        boundaries: Dict[str, Tuple[int, str]] = {}
+
+        def defer_link(row: tuple) -> str:
+            boundaries[row[_SUBMISSION]] = (row[_SEQ], row[_PREVIOUS])
+            return row[_PREVIOUS]
+
+        heads: Dict[str, str] = {}
+        checked, error = _check_rows(rows, heads, defer_link)
+        return {"checked": checked, "error": error, "boundaries": boundaries, "heads": heads}
+    finally:
+        conn.close()
+
+
+def _stitch(results: Iterable[Dict]) -> Tuple[int, Optional[str]]:
+    """
+    Join _audit_range results, in seq order: a submission's first link in a
+    range must be its last hash in the ranges before (or genesis).
+    """
+    heads: Dict[str, str] = {}
+    checked = 0
+    for result in results:
+        checked += result["checked"]
+        if result["error"]:
+            return checked, result["error"]
+        for submission_id, (seq, previous_hash) in result["boundaries"].items():
+            if previous_hash != heads.get(submission_id, GENESIS_HASH):
+                return checked, f"{submission_id}: Hash chain broken at seq {seq}"
+        heads.update(result["heads"])
+    return checked, None
+
+
+class _Shard:
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.entries: deque = deque()
+        self.cond = threading.Condition()
 
 
 class LedgerService:
     """
     Blockchain-style ledger for audit trail
-    Each entry is hash-chained to previous entry
-    """
-    
-    def __init__(self):
-        self.entries = []
-        self.previous_hash = "0" * 64  # Genesis hash
-    
-    def add_entry(self, event_type: str, event_data: Dict[str, Any], 
+    Each entry is hash-chained to the previous entry of the same submission
+
+    Entries are appended to a SQLite table that UPDATE/DELETE triggers keep
+    append-only. add_entry() only appends to one of LEDGER_SHARDS buffers
+    (picked by submission id, so a submission's entries stay in order); a
+    background thread writes them in batches, linking each entry to its
+    submission's last hash inside the write transaction. Submissions never
+    wait on each other's chain, and a sub-chain is verified from its own
+    rows only.
+
+    Every LEDGER_ANCHOR_INTERVAL seconds the heads of the sub-chains that
+    changed are anchored: their Merkle root is stored in ledger_anchors,
+    and each anchor is hash-chained to the previous one. get_proof() returns
+    a submission's entries with the inclusion proof of its latest anchor.
+
+    verify_chain() checks only what was added after the last row of
+    ledger_checkpoints and then moves the checkpoint; audit() re-verifies
+    everything from genesis, split into seq ranges across processes.
+    Each entry records the hash_version it was written with, so old
+    entries keep verifying after LEDGER_HASH_VERSION changes.
+    """
+
+    def __init__(self, db_path: str = LEDGER_DB_PATH, shards: int = LEDGER_SHARDS,
+                 hash_version: int = LEDGER_HASH_VERSION):
+        if hash_version not in _HASHERS:
+            raise ValueError(f"Unknown ledger hash version {hash_version}")
+        self.db_path = db_path
+        self.hash_version = hash_version
+        self._shards = [_Shard(max(1, LEDGER_BUFFER_MAX // max(1, shards))) for _ in range(max(1, shards))]
+        self._wake = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self._schema_ready = False
+        self._last_anchor = time.monotonic()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={LEDGER_SYNCHRONOUS}")
+        if not self._schema_ready:
+            conn.executescript(_SCHEMA)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(ledger_entries)")}
+            if "hash_version" not in columns:
+                # Ledgers created before versioned hashing hold version 1 entries
+                try:
+                    conn.execute("ALTER TABLE ledger_entries ADD COLUMN hash_version INTEGER NOT NULL DEFAULT 1")
+                except sqlite3.OperationalError as e:
+                    if "duplicate column" not in str(e):
+                        raise
+            self._schema_ready = True
+        return conn
+
+    def _shard_for(self, submission_id: str) -> _Shard:
+        # crc32, not hash(): stable across processes and restarts
+        return self._shards[zlib.crc32(submission_id.encode()) % len(self._shards)]
+
+    def add_entry(self, event_type: str, event_data: Dict[str, Any],
                   submission_id: str, performed_by: str = "system") -> Dict:
         """
-        Add a new ledger entry with hash chaining
+        Queue a new ledger entry. previous_hash and entry_hash are filled in
+        on the returned dict when its batch is written.
         """
         timestamp = datetime.utcnow().isoformat() + "Z"
-        
+
         entry = {
             "timestamp": timestamp,
             "event_type": event_type,
             "submission_id": submission_id,
             "event_data": event_data,
-            "performed_by": performed_by,
-            "previous_hash": self.previous_hash
+            "performed_by": performed_by
         }
-        
-        # Calculate hash of this entry
-        entry_hash = self._calculate_hash(entry)
-        entry["entry_hash"] = entry_hash
-        
-        # Update previous hash for next entry
-        self.previous_hash = entry_hash
-        
-        self.entries.append(entry)
-        
-        # Log to console (in production, send to backend or file)
-        print(f"[LEDGER] {event_type} | Hash: {entry_hash[:16]}... | Submission: {submission_id}")
-        
+        # Serialized once here; the stored text is what gets hashed
+        event_json = canonical_event_json(event_data)
+
+        if self._closed:
+            raise RuntimeError("Ledger is closed")
+        self._start_flusher()
+
+        shard = self._shard_for(submission_id)
+        with shard.cond:
+            if len(shard.entries) >= shard.capacity:
+                self._wake.set()
+                if not shard.cond.wait_for(lambda: len(shard.entries) < shard.capacity,
+                                           timeout=LEDGER_BUFFER_TIMEOUT):
+                    raise RuntimeError(f"Ledger buffer full for {LEDGER_BUFFER_TIMEOUT}s")
+            shard.entries.append((entry, event_json))
+            if len(shard.entries) >= LEDGER_FLUSH_BATCH:
+                self._wake.set()
+
         return entry
-    
-    def _calculate_hash(self, entry: Dict) -> str:
+
+    def _start_flusher(self):
+        # Started on first use so importing the module spawns nothing
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._flush_loop, name="ledger-flush", daemon=True)
+                    self._thread.start()
+
+    def _flush_loop(self):
+        while True:
+            self._wake.wait(timeout=LEDGER_FLUSH_INTERVAL)
+            self._wake.clear()
+            try:
+                self.flush()
+                if LEDGER_ANCHOR_INTERVAL and time.monotonic() - self._last_anchor >= LEDGER_ANCHOR_INTERVAL:
+                    self.anchor()
+            except Exception as e:
+                print(f"[LEDGER ERROR] Flush failed, retrying: {str(e)}")
+                time.sleep(1.0)
+            if self._closed and not self._pending():
+                return
+
+    def _pending(self) -> int:
+        return sum(len(shard.entries) for shard in self._shards)
+
+    def flush(self) -> int:
+        """
+        Write everything buffered so far. Returns the number of entries written.
+        """
+        written = 0
+        with self._flush_lock:
+            while True:
+                # Take from every shard; entries of one submission keep their order
+                taken = []
+                batch = []
+                for shard in self._shards:
+                    room = LEDGER_FLUSH_BATCH - len(batch)
+                    if room <= 0:
+                        break
+                    with shard.cond:
+                        part = [shard.entries[i] for i in range(min(room, len(shard.entries)))]
+                    if part:
+                        taken.append((shard, len(part)))
+                        batch.extend(part)
+                if not batch:
+                    return written
+
+                self._write_batch(batch)
+                for shard, count in taken:
+                    with shard.cond:
+                        for _ in range(count):
+                            shard.entries.popleft()
+                        shard.cond.notify_all()
+                written += len(batch)
+
+    def _write_batch(self, batch: List[Tuple[Dict, str]]):
+        conn = self._connect()
+        try:
+            # IMMEDIATE takes the write lock before reading the sub-chain
+            # heads, so concurrent processes append one batch after another
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                heads: Dict[str, str] = {}
+                rows = []
+                hashes = []
+                for entry, event_json in batch:
+                    submission_id = entry["submission_id"]
+                    previous_hash = heads.get(submission_id)
+                    if previous_hash is None:
+                        previous_hash = _previous_hash(conn, submission_id)
+                    entry_hash = compute_entry_hash(
+                        self.hash_version, entry["timestamp"], entry["event_type"], submission_id,
+                        entry["performed_by"], event_json, previous_hash
+                    )
+                    rows.append((
+                        entry["timestamp"], entry["event_type"], submission_id, entry["performed_by"],
+                        event_json, previous_hash, entry_hash, self.hash_version
+                    ))
+                    hashes.append((previous_hash, entry_hash))
+                    heads[submission_id] = entry_hash
+                conn.executemany(
+                    "INSERT INTO ledger_entries (timestamp, event_type, submission_id, performed_by, event_data, "
+                    "previous_hash, entry_hash, hash_version) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+
+        for (entry, _), (previous_hash, entry_hash) in zip(batch, hashes):
+            entry["previous_hash"] = previous_hash
+            entry["entry_hash"] = entry_hash
+            # Log to console (in production, send to backend or file)
+            print(f"[LEDGER] {entry['event_type']} | Hash: {entry_hash[:16]}... | Submission: {entry['submission_id']}")
+
+    # --- Anchoring ---
+
+    def anchor(self) -> Optional[Dict]:
+        """
+        Anchor the head of every sub-chain written since the last anchor
+        into a new Merkle root. Returns the anchor, or None if nothing changed.
+        """
+        self._last_anchor = time.monotonic()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                last = conn.execute(
+                    "SELECT last_seq, anchor_hash FROM ledger_anchors ORDER BY anchor_id DESC LIMIT 1"
+                ).fetchone()
+                after_seq, previous_anchor_hash = last if last else (0, GENESIS_HASH)
+
+                heads = conn.execute(
+                    "SELECT e.submission_id, e.seq, e.entry_hash FROM ledger_entries e "
+                    "JOIN (SELECT MAX(seq) AS seq FROM ledger_entries WHERE seq > ? GROUP BY submission_id) h "
+                    "ON e.seq = h.seq ORDER BY e.submission_id",
+                    (after_seq,)
+                ).fetchall()
+                if not heads:
+                    conn.execute("ROLLBACK")
+                    return None
+
+                first_seq = conn.execute(
+                    "SELECT MIN(seq) FROM ledger_entries WHERE seq > ?", (after_seq,)
+                ).fetchone()[0]
+                last_seq = max(seq for _, seq, _ in heads)
+                root = merkle_root([_leaf(*head) for head in heads])
+                created_at = datetime.utcnow().isoformat() + "Z"
+                anchor_hash = _anchor_hash(previous_anchor_hash, root, first_seq, last_seq, created_at)
+
+                cursor = conn.execute(
+                    "INSERT INTO ledger_anchors (created_at, first_seq, last_seq, leaf_count, merkle_root, "
+                    "previous_anchor_hash, anchor_hash) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (created_at, first_seq, last_seq, len(heads), root, previous_anchor_hash, anchor_hash)
+                )
+                anchor_id = cursor.lastrowid
+                conn.executemany(
+                    "INSERT INTO ledger_anchor_leaves (anchor_id, position, submission_id, head_seq, head_hash) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [(anchor_id, position, *head) for position, head in enumerate(heads)]
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+
+        print(f"[LEDGER] Anchor {anchor_id} | Root: {root[:16]}... | "
+              f"{len(heads)} submissions, seq {first_seq}-{last_seq}")
+        return {"anchor_id": anchor_id, "merkle_root": root, "anchor_hash": anchor_hash,
+                "first_seq": first_seq, "last_seq": last_seq, "leaf_count": len(heads)}
+
+    # --- Reads and verification ---
+
+    def _rows(self, conn: sqlite3.Connection, where: str = "", params: tuple = (),
+              limit: Optional[int] = None) -> sqlite3.Cursor:
+        sql = f"SELECT {_ENTRY_COLUMNS} FROM ledger_entries {where} ORDER BY seq"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        return conn.execute(sql, params)
+
+    def _submission_rows(self, submission_id: str) -> List[tuple]:
+        conn = self._connect()
+        try:
+            return self._rows(conn, "WHERE submission_id = ?", (submission_id,)).fetchall()
+        finally:
+            conn.close()
+
+    def get_entries(self, submission_id: Optional[str] = None, after_seq: int = 0,
+                    limit: Optional[int] = 1000) -> list:
         """
-        Calculate SHA-256 hash of entry
+        Get ledger entries in write order, optionally for one submission.
+        Pending entries are flushed first so callers see their own writes.
         """
-        # Create deterministic string from entry
-        entry_copy = entry.copy()
-        entry_copy.pop("entry_hash", None)  # Remove hash if exists
-        
-        entry_string = json.dumps(entry_copy, sort_keys=True)
-        return hashlib.sha256(entry_string.encode()).hexdigest()
-    
-    def get_entries(self) -> list:
+        self.flush()
+        conn = self._connect()
+        try:
+            if submission_id is not None:
+                rows = self._rows(conn, "WHERE seq > ? AND submission_id = ?", (after_seq, submission_id), limit)
+            else:
+                rows = self._rows(conn, "WHERE seq > ?", (after_seq,), limit)
+            return [_to_entry(row) for row in rows]
+        finally:
+            conn.close()
+
+    def verify_submission(self, submission_id: str) -> Dict:
         """
-        Get all ledger entries
+        Verify one submission's sub-chain; reads only that submission's rows.
         """
-        return self.entries
-    
+        self.flush()
+        rows = self._submission_rows(submission_id)
+        _, error = _check_rows(rows, {}, lambda row: GENESIS_HASH)
+        if error:
+            print(f"[LEDGER ERROR] {error}")
+        return {"valid": error is None, "entries": len(rows), "error": error}
+
     def verify_chain(self) -> bool:
         """
-        Verify integrity of hash chain
-        """
-        if not self.entries:
-            return True
-        
-        previous_hash = "0" * 64
-        
-        for entry in self.entries:
-            # Verify previous hash matches
-            if entry["previous_hash"] != previous_hash:
-                print(f"[LEDGER ERROR] Hash chain broken at {entry['timestamp']}")
-                return False
-            
-            # Verify entry hash
-            calculated_hash = self._calculate_hash(entry)
-            if calculated_hash != entry["entry_hash"]:
-                print(f"[LEDGER ERROR] Entry hash mismatch at {entry['timestamp']}")
-                return False
-            
-            previous_hash = entry["entry_hash"]
-        
-        return True
+        Verify integrity of the sub-chains and anchor chain since the last checkpoint
+        """
+        return self.verify_incremental()["valid"]
+
+    def verify_incremental(self) -> Dict:
+        """
+        Verify the entries and anchors added after the latest checkpoint,
+        then record a new checkpoint. The first new entry of a submission is
+        linked to its previous entry through the submission index, so the
+        work is proportional to what was added. Entries below the checkpoint
+        are trusted here; audit() re-checks them.
+        """
+        self.flush()
+        conn = self._connect()
+        try:
+            # One read snapshot, so rows written meanwhile wait for the next run
+            conn.execute("BEGIN")
+            verified_seq, anchor_id, anchor_hash = _latest_checkpoint(conn)
+            max_seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM ledger_entries").fetchone()[0]
+
+            rows = self._rows(conn, "WHERE seq > ? AND seq <= ?", (verified_seq, max_seq))
+            checked, error = _check_rows(
+                rows, {}, lambda row: _previous_hash(conn, row[_SUBMISSION], row[_SEQ])
+            )
+            if error is None:
+                anchor_id, anchor_hash, error = _verify_anchors(conn, anchor_id, anchor_hash)
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+        if error:
+            print(f"[LEDGER ERROR] {error}")
+            return {"valid": False, "checked": checked, "verified_seq": verified_seq, "error": error}
+
+        self._save_checkpoint("incremental", max_seq, anchor_id, anchor_hash)
+        return {"valid": True, "checked": checked, "verified_seq": max_seq, "error": None}
+
+    def audit(self, workers: Optional[int] = None) -> Dict:
+        """
+        Re-verify the whole ledger from genesis, ignoring checkpoints. The
+        seq range is cut into slices hashed in parallel by worker processes;
+        the parent stitches the slice boundaries and checks every anchor.
+        """
+        self.flush()
+        workers = workers or LEDGER_AUDIT_WORKERS or os.cpu_count() or 1
+        started = time.time()
+
+        conn = self._connect()
+        try:
+            first_seq, last_seq = conn.execute("SELECT MIN(seq), MAX(seq) FROM ledger_entries").fetchone()
+        finally:
+            conn.close()
+
+        checked, error = 0, None
+        if first_seq is not None:
+            # A few slices per worker evens out slow slices; tiny ledgers stay in one
+            slices = max(1, min(workers * 4, (last_seq - first_seq) // _AUDIT_MIN_SLICE + 1))
+            step = (last_seq - first_seq) // slices + 1
+            ranges = [(start, min(start + step - 1, last_seq)) for start in range(first_seq, last_seq + 1, step)]
+
+            if workers <= 1 or len(ranges) == 1:
+                checked, error = _stitch(_audit_range(self.db_path, start, end) for start, end in ranges)
+            else:
+                # spawn: the parent runs threads (flusher, server) that fork would copy mid-state
+                db_path = os.path.abspath(self.db_path)
+                context = multiprocessing.get_context("spawn")
+                with ProcessPoolExecutor(max_workers=min(workers, len(ranges)), mp_context=context) as executor:
+                    futures = [executor.submit(_audit_range, db_path, start, end) for start, end in ranges]
+                    checked, error = _stitch(future.result() for future in futures)
+
+        anchor_id, anchor_hash = 0, GENESIS_HASH
+        if error is None:
+            conn = self._connect()
+            try:
+                anchor_id, anchor_hash, error = _verify_anchors(conn, 0, GENESIS_HASH)
+            finally:
+                conn.close()
+
+        elapsed = round(time.time() - started, 3)
+        if error:
+            print(f"[LEDGER ERROR] Audit failed: {error}")
+            return {"valid": False, "checked": checked, "error": error, "seconds": elapsed, "workers": workers}
+
+        self._save_checkpoint("audit", last_seq or 0, anchor_id, anchor_hash)
+        print(f"[LEDGER] Audit OK | {checked} entries in {elapsed}s with {workers} workers")
+        return {"valid": True, "checked": checked, "error": None, "seconds": elapsed, "workers": workers}
+
+    def _save_checkpoint(self, mode: str, verified_seq: int, anchor_id: int, anchor_hash: str):
+        conn = self._connect()
+        try:
+            conn.execute(
+                "INSERT INTO ledger_checkpoints (created_at, mode, verified_seq, anchor_id, anchor_hash) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (datetime.utcnow().isoformat() + "Z", mode, verified_seq, anchor_id, anchor_hash)
+            )
+        finally:
+            conn.close()
+
+    def get_proof(self, submission_id: str) -> Dict:
+        """
+        A submission's entries, their sub-chain verification, and the
+        Merkle inclusion proof of the latest anchor that covers them.
+        """
+        self.flush()
+        rows = self._submission_rows(submission_id)
+        _, error = _check_rows(rows, {}, lambda row: GENESIS_HASH)
+
+        proof = {
+            "submission_id": submission_id,
+            "entries": [_to_entry(row) for row in rows],
+            "valid": error is None,
+            "error": error,
+            "head_hash": rows[-1][_HASH] if rows else None,
+            "anchor": None,
+            "unanchored_entries": len(rows)
+        }
+
+        conn = self._connect()
+        try:
+            leaf_row = conn.execute(
+                "SELECT anchor_id, position, head_seq, head_hash FROM ledger_anchor_leaves "
+                "WHERE submission_id = ? ORDER BY anchor_id DESC LIMIT 1",
+                (submission_id,)
+            ).fetchone()
+            if leaf_row is None:
+                return proof
+            anchor_id, position, head_seq, head_hash = leaf_row
+
+            anchor = conn.execute(
+                "SELECT created_at, first_seq, last_seq, leaf_count, merkle_root, previous_anchor_hash, anchor_hash "
+                "FROM ledger_anchors WHERE anchor_id = ?",
+                (anchor_id,)
+            ).fetchone()
+            leaves = [
+                _leaf(*row) for row in conn.execute(
+                    "SELECT submission_id, head_seq, head_hash FROM ledger_anchor_leaves "
+                    "WHERE anchor_id = ? ORDER BY position",
+                    (anchor_id,)
+                )
+            ]
+        finally:
+            conn.close()
+
+        created_at, first_seq, last_seq, leaf_count, root, previous_anchor_hash, anchor_hash = anchor
+        proof["anchor"] = {
+            "anchor_id": anchor_id,
+            "created_at": created_at,
+            "first_seq": first_seq,
+            "last_seq": last_seq,
+            "leaf_count": leaf_count,
+            "merkle_root": root,
+            "previous_anchor_hash": previous_anchor_hash,
+            "anchor_hash": anchor_hash,
+            "leaf": {
+                "position": position,
+                "head_seq": head_seq,
+                "head_hash": head_hash,
+                "leaf_hash": leaves[position]
+            },
+            "proof": merkle_proof(leaves, position)
+        }
+        proof["unanchored_entries"] = sum(1 for row in rows if row[_SEQ] > head_seq)
+        return proof
+
+    def close(self):
+        """
+        Flush what is buffered, anchor it, and stop the background writer.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread is None:
+            # Nothing was logged from this process (e.g. an audit worker)
+            return
+        self._wake.set()
+        self._thread.join(timeout=LEDGER_BUFFER_TIMEOUT)
+        try:
+            self.flush()
+            self.anchor()
+        except Exception as e:
+            print(f"[LEDGER ERROR] Final flush failed, {self._pending()} entries lost: {str(e)}")
+
+
+def _to_entry(row: tuple) -> Dict:
+    return {
+        "seq": row[_SEQ],
+        "timestamp": row[_TIMESTAMP],
+        "event_type": row[_EVENT_TYPE],
+        "submission_id": row[_SUBMISSION],
+        "performed_by": row[_PERFORMED_BY],
+        "event_data": json.loads(row[_EVENT_DATA]),
+        "previous_hash": row[_PREVIOUS],
+        "entry_hash": row[_HASH],
+        "hash_version": row[_VERSION]
+    }
+
+
+def _previous_hash(conn: sqlite3.Connection, submission_id: str, before_seq: Optional[int] = None) -> str:
+    """
+    Hash of the submission's latest entry (before before_seq), or genesis.
+    """
+    if before_seq is None:
+        row = conn.execute(
+            "SELECT entry_hash FROM ledger_entries WHERE submission_id = ? ORDER BY seq DESC LIMIT 1",
+            (submission_id,)
+        ).fetchone()
+    else:
+        row = conn.execute(
+            "SELECT entry_hash FROM ledger_entries WHERE submission_id = ? AND seq < ? ORDER BY seq DESC LIMIT 1",
+            (submission_id, before_seq)
+        ).fetchone()
+    return row[0] if row else GENESIS_HASH
+
+
+def _latest_checkpoint(conn: sqlite3.Connection) -> Tuple[int, int, str]:
+    row = conn.execute(
+        "SELECT verified_seq, anchor_id, anchor_hash FROM ledger_checkpoints ORDER BY checkpoint_id DESC LIMIT 1"
+    ).fetchone()
+    return tuple(row) if row else (0, 0, GENESIS_HASH)
+
+
+def _verify_anchors(conn: sqlite3.Connection, after_anchor_id: int,
+                    previous_anchor_hash: str) -> Tuple[int, str, Optional[str]]:
+    """
+    Verify anchors after after_anchor_id, which must chain from
+    previous_anchor_hash. Returns (last anchor id, its hash, first error).
+    """
+    last_anchor_id = after_anchor_id
+    anchors = conn.execute(
+        "SELECT anchor_id, created_at, first_seq, last_seq, merkle_root, previous_anchor_hash, anchor_hash "
+        "FROM ledger_anchors WHERE anchor_id > ? ORDER BY anchor_id",
+        (after_anchor_id,)
+    ).fetchall()
+    for anchor_id, created_at, first_seq, last_seq, root, prev_hash, anchor_hash in anchors:
+        if prev_hash != previous_anchor_hash or \
+                _anchor_hash(prev_hash, root, first_seq, last_seq, created_at) != anchor_hash:
+            return last_anchor_id, previous_anchor_hash, f"Anchor chain broken at anchor {anchor_id}"
+
+        leaves = []
+        for submission_id, head_seq, head_hash in conn.execute(
+                "SELECT l.submission_id, l.head_seq, l.head_hash FROM ledger_anchor_leaves l "
+                "WHERE l.anchor_id = ? ORDER BY l.position", (anchor_id,)):
+            # The anchored head must still be that submission's entry
+            row = conn.execute("SELECT submission_id, entry_hash FROM ledger_entries WHERE seq = ?",
+                               (head_seq,)).fetchone()
+            if row != (submission_id, head_hash):
+                return last_anchor_id, previous_anchor_hash, \
+                    f"Anchor {anchor_id} leaf {submission_id} does not match entry {head_seq}"
+            leaves.append(_leaf(submission_id, head_seq, head_hash))
+
+        if merkle_root(leaves) != root:
+            return last_anchor_id, previous_anchor_hash, f"Merkle root mismatch at anchor {anchor_id}"
+        last_anchor_id, previous_anchor_hash = anchor_id, anchor_hash
+    return last_anchor_id, previous_anchor_hash, None
+
+
+def _leaf(submission_id: str, head_seq: int, head_hash: str) -> str:
+    return leaf_hash(f"{submission_id}|{head_seq}|{head_hash}")
+
+
+def _anchor_hash(previous_anchor_hash: str, root: str, first_seq: int, last_seq: int, created_at: str) -> str:
+    return hashlib.sha256(f"{previous_anchor_hash}|{root}|{first_seq}|{last_seq}|{created_at}".encode()).hexdigest()
 
 
 # Global ledger instance
 _ledger = LedgerService()
+atexit.register(_ledger.close)
 
 
 def log_validation_step(submission_id: str, step_name: str, result: Dict[str, Any]):
@@ -132,15 +833,46 @@ def log_validation_complete(submission_id: str, result: Dict[str, Any]):
     )
 
 
-def get_ledger_entries():
+def get_ledger_entries(submission_id: Optional[str] = None, after_seq: int = 0, limit: Optional[int] = 1000):
     """
-    Get all ledger entries
+    Get ledger entries (paged by seq; limit=None returns everything)
     """
-    return _ledger.get_entries()
+    return _ledger.get_entries(submission_id, after_seq, limit)
 
 
-def verify_ledger_integrity():
+def verify_ledger_integrity(full: bool = False, workers: Optional[int] = None):
     """
-    Verify ledger hash chain integrity
+    Verify ledger hash chain integrity (entries since the last checkpoint,
+    or everything from genesis with full=True)
     """
+    if full:
+        return _ledger.audit(workers)["valid"]
     return _ledger.verify_chain()
+
+
+def audit_ledger(workers: Optional[int] = None) -> Dict:
+    """
+    Parallel full audit, with entry count and timing
+    """
+    return _ledger.audit(workers)
+
+
+def verify_submission_ledger(submission_id: str) -> Dict:
+    """
+    Verify one submission's sub-chain
+    """
+    return _ledger.verify_submission(submission_id)
+
+
+def get_submission_proof(submission_id: str) -> Dict:
+    """
+    Entries plus Merkle anchor proof for one submission
+    """
+    return _ledger.get_proof(submission_id)
+
+
+def close_ledger():
+    """
+    Flush buffered entries; called on application shutdown
+    """
+    _ledger.close()
@@ -0,0 +1,210 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, List, Optional
+
+# Worker processes holding a warm easyocr.Reader; 0 = run OCR in-process
+OCR_POOL_SIZE = int(os.getenv("OCR_POOL_SIZE", "2"))
+# OCR calls allowed to wait for a worker before callers are turned away
+OCR_QUEUE_SIZE = int(os.getenv("OCR_QUEUE_SIZE", "8"))
+OCR_QUEUE_TIMEOUT = float(os.getenv("OCR_QUEUE_TIMEOUT", "60"))
+# torch intra-op threads per worker; pool size x threads should fit the cores
+OCR_TORCH_THREADS = int(os.getenv("OCR_TORCH_THREADS", "1"))
+OCR_LANGUAGES = [lang.strip() for lang in os.getenv("OCR_LANGUAGES", "en").split(",") if lang.strip()]
+
+
+class OcrUnavailable(Exception):
+    pass
+
+
+# --- Worker process side ---
+
+_worker_reader = None
+_warm_barrier = None
+
+
+def _init_worker(languages: List[str], torch_threads: int, warm_barrier):
+    global _worker_reader, _warm_barrier
+    _warm_barrier = warm_barrier
+    os.environ["OMP_NUM_THREADS"] = str(torch_threads)
+    os.environ["MKL_NUM_THREADS"] = str(torch_threads)
+    import torch
+    import easyocr
+    torch.set_num_threads(torch_threads)
+    _worker_reader = easyocr.Reader(languages, gpu=False)
+
+
+def _worker_ready() -> int:
+    # Hold this task until every worker has one, so each worker (not just the
+    # first one to finish loading) reports in exactly once
+    _warm_barrier.wait(timeout=600)
+    return os.getpid()
+
+
+def _worker_readtext(image, kwargs: Dict):
+    return _worker_reader.readtext(image, **kwargs)
+
+
+def _worker_call(fn: Callable, args: tuple):
+    return fn(_worker_reader, *args)
+
+
+def _call_local(reader, worker_fn: Callable, *args):
+    # Same calls as the worker functions above, against an in-process reader
+    if worker_fn is _worker_call:
+        fn, fn_args = args
+        return fn(reader, *fn_args)
+    image, kwargs = args
+    return reader.readtext(image, **kwargs)
+
+
+# --- Parent side ---
+
+class OcrPool:
+    """
+    Pool of pre-warmed EasyOCR readers in separate processes.
+
+    start() spawns the workers and loads the model in each of them in the
+    background; ready() turns true once every worker has answered. Calls are
+    admitted through a bounded queue (OCR_POOL_SIZE running +
+    OCR_QUEUE_SIZE waiting) so a burst of invoices cannot pile up unbounded
+    work. A crashed worker breaks the pool; it is rebuilt on the next call.
+    """
+
+    def __init__(self, size: int = OCR_POOL_SIZE, queue_size: int = OCR_QUEUE_SIZE,
+                 queue_timeout: float = OCR_QUEUE_TIMEOUT, torch_threads: int = OCR_TORCH_THREADS,
+                 languages: Optional[List[str]] = None):
+        self.size = size
+        self.queue_timeout = queue_timeout
+        self.torch_threads = torch_threads
+        self.languages = languages or OCR_LANGUAGES
+        self._slots = threading.BoundedSemaphore(max(1, size) + queue_size)
+        # Re-entrant: shutting an executor down can run warm-up callbacks inline
+        self._lock = threading.RLock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._warm_pids: set = set()
+        self._started_at: Optional[float] = None
+        self._error: Optional[str] = None
+        # In-process fallback when size == 0
+        self._local_reader = None
+        self._local_lock = threading.Lock()
+
+    def start(self):
+        """
+        Spawn the workers and warm them without blocking the caller.
+        """
+        if self.size <= 0:
+            threading.Thread(target=self._warm_local, name="ocr-warmup", daemon=True).start()
+            return
+        with self._lock:
+            self._spawn()
+
+    def _spawn(self):
+        # spawn, not fork: torch does not survive forking a threaded parent
+        context = multiprocessing.get_context("spawn")
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.size,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(self.languages, self.torch_threads, context.Barrier(self.size))
+        )
+        self._warm_pids = set()
+        self._started_at = time.time()
+        self._error = None
+        executor = self._executor
+        # One task per worker; each returns once that worker's reader is loaded
+        futures = [executor.submit(_worker_ready) for _ in range(self.size)]
+        for future in futures:
+            future.add_done_callback(lambda f, ex=executor: self._on_warm(ex, f))
+        print(f"[OCR] Starting {self.size} OCR workers ({self.torch_threads} torch threads each)")
+
+    def _on_warm(self, executor, future):
+        with self._lock:
+            if executor is not self._executor:
+                return
+            try:
+                self._warm_pids.add(future.result())
+            except Exception as e:
+                self._error = str(e)
+                print(f"[OCR ERROR] Worker failed to start: {str(e)}")
+            if len(self._warm_pids) >= self.size:
+                print(f"[OCR] {self.size} OCR workers warm after {time.time() - self._started_at:.1f}s")
+
+    def _warm_local(self):
+        try:
+            self._get_local_reader()
+        except Exception as e:
+            self._error = str(e)
+            print(f"[OCR ERROR] Reader failed to load: {str(e)}")
+
+    def _get_local_reader(self):
+        with self._local_lock:
+            if self._local_reader is None:
+                import easyocr
+                self._local_reader = easyocr.Reader(self.languages, gpu=False)
+            return self._local_reader
+
+    def ready(self) -> bool:
+        if self.size <= 0:
+            return self._local_reader is not None
+        return self._executor is not None and len(self._warm_pids) >= self.size
+
+    def status(self) -> Dict:
+        return {
+            "ready": self.ready(),
+            "workers": self.size,
+            "warm_workers": len(self._warm_pids),
+            "error": self._error
+        }
+
+    def readtext(self, image, **kwargs):
+        """
+        easyocr Reader.readtext(image, **kwargs) on a warm worker. image can
+        be a path, encoded bytes or a numpy array.
+        """
+        return self._run(_worker_readtext, image, kwargs)
+
+    def call(self, fn: Callable, *args):
+        """
+        fn(reader, *args) on a warm worker, for pipelines that combine
+        detect/recognize steps. fn must be a module-level function.
+        """
+        return self._run(_worker_call, fn, args)
+
+    def _run(self, worker_fn: Callable, *args):
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise OcrUnavailable(f"OCR queue full for {self.queue_timeout}s")
+        try:
+            if self.size <= 0:
+                reader = self._get_local_reader()
+                # One reader, one inference at a time
+                with self._local_lock:
+                    return _call_local(reader, worker_fn, *args)
+
+            with self._lock:
+                if self._executor is None:
+                    self._spawn()
+                executor = self._executor
+            try:
+                return executor.submit(worker_fn, *args).result()
+            except BrokenProcessPool:
+                with self._lock:
+                    if self._executor is executor:
+                        print("[OCR ERROR] OCR worker died; restarting pool")
+                        executor.shutdown(wait=False)
+                        self._spawn()
+                raise OcrUnavailable("OCR worker crashed; pool restarted")
+        finally:
+            self._slots.release()
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+ocr_pool = OcrPool()
@@ -1,21 +1,12 @@
+from datetime import datetime
 from typing import List, Dict, Optional
 from models.request_models import MediaItem
-from utils.s3_utils import download_from_s3_to_temp
-from utils.temp_utils import safe_remove
-import easyocr
-import re
+from utils.media_cache import MediaCache, use_media_cache
+from services.invoice_ocr import read_invoices
 
-_reader = None
 
-
-def _get_reader():
-    global _reader
-    if _reader is None:
-        _reader = easyocr.Reader(["en"], gpu=False)
-    return _reader
-
-
-def run_ocr_checks(media: List[MediaItem], document_rules: Dict, expected_amount: Optional[float]):
+def run_ocr_checks(media: List[MediaItem], document_rules: Dict, expected_amount: Optional[float],
+                   media_cache: Optional[MediaCache] = None, sanction_date: Optional[str] = None):
     flags: list[str] = []
     features: dict = {
         "invoice_present": False,
@@ -30,58 +21,66 @@ def run_ocr_checks(media: List[MediaItem], document_rules: Dict, expected_amount
 
     features["invoice_present"] = True
 
-    if not (document_rules.get("invoice_ocr_match_amount") or document_rules.get("invoice_ocr_match_date")):
+    match_amount = bool(document_rules.get("invoice_ocr_match_amount"))
+    match_date = bool(document_rules.get("invoice_ocr_match_date"))
+    if not (match_amount or match_date):
         return {"flags": flags, "features": features}
 
-    reader = _get_reader()
-
-    # Just take first invoice doc for now
-    item = invoice_items[0]
-    local_path = None
     try:
-        local_path = download_from_s3_to_temp(item.fileKey)
-        result = reader.readtext(local_path, detail=0)
-        text = " ".join(result)
-        features["invoice_ocr_text"] = text[:500]
-
-        # Extract amount-like patterns
-        amounts = re.findall(r"\b\d{3,7}\b", text)
-        if amounts:
-            ocr_amount = float(amounts[-1])  # heuristic: last big number
-            features["invoice_amount_ocr"] = ocr_amount
-            if expected_amount is not None and document_rules.get("invoice_ocr_match_amount"):
-                tolerance = 5000  # ₹5000 tolerance
-                if abs(ocr_amount - expected_amount) > tolerance:
-                    flags.append("INVOICE_AMOUNT_MISMATCH")
-
-        # Extract date patterns (DD/MM/YYYY, DD-MM-YYYY, YYYY-MM-DD, etc.)
-        date_patterns = [
-            r"\b\d{1,2}[/-]\d{1,2}[/-]\d{2,4}\b",  # DD/MM/YYYY or DD-MM-YYYY
-            r"\b\d{4}[/-]\d{1,2}[/-]\d{1,2}\b",    # YYYY-MM-DD
-            r"\b\d{1,2}\s+(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\s+\d{2,4}\b",  # DD Month YYYY
-        ]
-        
-        dates_found = []
-        for pattern in date_patterns:
-            dates_found.extend(re.findall(pattern, text, re.IGNORECASE))
-        
-        if dates_found:
-            features["invoice_date_ocr"] = dates_found[0] if isinstance(dates_found[0], str) else dates_found[0][0]
-            
-            # Check if date matching is required
-            if document_rules.get("invoice_ocr_match_date"):
-                # This is a placeholder - you would need to compare with expected date
-                # For now, just record that we found a date
-                features["invoice_date_found"] = True
-        else:
-            if document_rules.get("invoice_ocr_match_date"):
-                flags.append("INVOICE_DATE_MISSING")
-
+        # Every invoice document and PDF page, in order, until amount and date are found
+        with use_media_cache(media_cache) as cache:
+            result = read_invoices(invoice_items, cache, match_amount, match_date)
     except Exception as e:
         flags.append("INVOICE_OCR_ERROR")
         features["ocr_error"] = str(e)
-    finally:
-        if local_path:
-            safe_remove(local_path)
+        return {"flags": flags, "features": features}
+
+    features["invoice_ocr_documents"] = result["documents"]
+    features["invoice_ocr_pages"] = result["pages"]
+    features["invoice_ocr_regions"] = {"read": result["regions"], "detected": result["regions_total"]}
+    features["invoice_ocr_early_exit"] = result["early_exit"]
+    if result["errors"]:
+        features["ocr_errors"] = result["errors"]
+        if not result["documents"]:
+            flags.append("INVOICE_OCR_ERROR")
+            features["ocr_error"] = result["errors"][0]["error"]
+            return {"flags": flags, "features": features}
+
+    text = " ".join(t for t, _ in result["lines"])
+    features["invoice_ocr_text"] = text[:500]
+
+    fields = result["fields"]
+    if fields["amount"] is not None:
+        ocr_amount = fields["amount"]
+        features["invoice_amount_ocr"] = ocr_amount
+        features["invoice_amount_confident"] = fields["amount_confident"]
+        if expected_amount is not None and match_amount:
+            tolerance = 5000  # ₹5000 tolerance
+            if abs(ocr_amount - expected_amount) > tolerance:
+                flags.append("INVOICE_AMOUNT_MISMATCH")
+
+    if fields["date"]:
+        invoice_date = fields["date"]
+        features["invoice_date_ocr"] = invoice_date.isoformat()
+
+        # Check if date matching is required
+        if match_date:
+            features["invoice_date_found"] = True
+            if sanction_date:
+                try:
+                    sanction_day = datetime.fromisoformat(sanction_date.replace("Z", "+00:00")).date()
+                except ValueError:
+                    sanction_day = None
+                if sanction_day is not None:
+                    # Invoices are expected shortly before (quotation) or after (purchase) sanction
+                    days = (invoice_date - sanction_day).days
+                    features["invoice_days_from_sanction"] = days
+                    max_before = document_rules.get("invoice_max_days_before_sanction", 30)
+                    max_after = document_rules.get("invoice_max_days_after_sanction", 60)
+                    if days < -max_before or days > max_after:
+                        flags.append("INVOICE_DATE_MISMATCH")
+    else:
+        if match_date:
+            flags.append("INVOICE_DATE_MISSING")
 
     return {"flags": flags, "features": features}
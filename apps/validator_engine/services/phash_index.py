@@ -0,0 +1,252 @@
+"""
+Tenant-scoped multi-index hashing (MIH) store for 64-bit perceptual hashes.
+
+Each hash is split into PHASH_BANDS bands of 16 bits and added to one Redis
+set per (scope, band, band value). If two hashes differ in at most r bits,
+at least one band differs in at most r // PHASH_BANDS bits (pigeonhole), so a
+lookup only unions the sets of nearby band values and checks the candidates
+exactly.
+
+Key layout (scope is a tenantId, "global" for the cross-tenant index, or
+"legacy" for hashes migrated from the old flat set, which every lookup searches):
+    phash:{scope}:band:{band}:{value}   set of hex hashes ("tenant:hex" in global)
+    phash:{tenant}:meta                 hex -> JSON of the first submission that stored it
+    phash:{tenant}:added                zset hex -> first-seen epoch seconds, drives retention
+    phash:tenants                       set of tenants that have stored hashes
+"""
+
+import json
+import os
+import time
+from itertools import combinations
+from typing import Dict, Iterable, List, Optional, Tuple
+
+PHASH_BITS = 64
+PHASH_BANDS = 4
+BAND_BITS = PHASH_BITS // PHASH_BANDS
+BAND_MASK = (1 << BAND_BITS) - 1
+
+# Also index every hash in a shared cross-tenant scope and search it on lookup
+PHASH_CROSS_TENANT_INDEX = os.getenv("PHASH_CROSS_TENANT_INDEX", "false").lower() == "true"
+# Hashes older than this are removed by compaction; 0 keeps them forever
+PHASH_RETENTION_DAYS = int(os.getenv("PHASH_RETENTION_DAYS", "365"))
+
+GLOBAL_SCOPE = "global"
+LEGACY_TENANT = "legacy"
+TENANTS_KEY = "phash:tenants"
+LEGACY_HASH_SET_KEY = "image_phash_set"
+MIGRATION_FLAG_KEY = "phash:legacy_migrated"
+
+
+def band_values(phash_hex: str) -> List[int]:
+    value = int(phash_hex, 16)
+    return [(value >> (i * BAND_BITS)) & BAND_MASK for i in range(PHASH_BANDS)]
+
+
+def band_key(scope: str, band: int, value: int) -> str:
+    return f"phash:{scope}:band:{band}:{value:04x}"
+
+
+def meta_key(tenant_id: str) -> str:
+    return f"phash:{tenant_id}:meta"
+
+
+def added_key(tenant_id: str) -> str:
+    return f"phash:{tenant_id}:added"
+
+
+def _neighbours(value: int, radius: int) -> Iterable[int]:
+    """
+    Every BAND_BITS-bit value within `radius` bit flips of `value`.
+    """
+    yield value
+    for r in range(1, radius + 1):
+        for bits in combinations(range(BAND_BITS), r):
+            flipped = value
+            for b in bits:
+                flipped ^= 1 << b
+            yield flipped
+
+
+def candidate_keys(scope: str, phash_hex: str, max_distance: int) -> List[str]:
+    """
+    Band keys in `scope` whose members may lie within max_distance of phash_hex.
+    """
+    radius = max(0, max_distance) // PHASH_BANDS
+    keys = []
+    for band, value in enumerate(band_values(phash_hex)):
+        keys.extend(band_key(scope, band, v) for v in _neighbours(value, radius))
+    return keys
+
+
+def index_keys(scope: str, phash_hex: str) -> List[str]:
+    """
+    Band keys a hash is stored under within `scope`.
+    """
+    return [band_key(scope, band, value) for band, value in enumerate(band_values(phash_hex))]
+
+
+def lookup_scopes(tenant_id: str) -> List[str]:
+    # Pre-tenant hashes stay searchable whatever the cross-tenant setting
+    scopes = [tenant_id] if tenant_id == LEGACY_TENANT else [tenant_id, LEGACY_TENANT]
+    if PHASH_CROSS_TENANT_INDEX:
+        scopes.append(GLOBAL_SCOPE)
+    return scopes
+
+
+def parse_members(scope: str, tenant_id: str, members: Iterable[str]) -> List[Tuple[str, str]]:
+    """
+    Band-set members as (owning tenant, hex) pairs.
+    """
+    if scope != GLOBAL_SCOPE:
+        # A tenant scope (or the legacy scope) is named after its owner
+        return [(scope, m) for m in members]
+    return [tuple(m.split(":", 1)) for m in members]
+
+
+def find_candidates(client, tenant_id: str, phash_hex: str, max_distance: int) -> List[Tuple[str, str]]:
+    """
+    Sorted, de-duplicated (tenant, hex) candidates from the tenant's index, the
+    legacy index and, when enabled, the cross-tenant index.
+    """
+    return find_candidates_batch(client, tenant_id, [phash_hex], max_distance)[0]
+
+
+def find_candidates_batch(client, tenant_id: str, phash_hexes: List[str],
+                          max_distance: int) -> List[List[Tuple[str, str]]]:
+    """
+    find_candidates for many hashes in one pipelined round trip.
+    """
+    if not phash_hexes:
+        return []
+
+    scopes = lookup_scopes(tenant_id)
+    pipe = client.pipeline(transaction=False)
+    for phash_hex in phash_hexes:
+        for scope in scopes:
+            pipe.sunion(candidate_keys(scope, phash_hex, max_distance))
+    replies = iter(pipe.execute())
+
+    batches = []
+    for _ in phash_hexes:
+        found = set()
+        for scope in scopes:
+            found.update(parse_members(scope, tenant_id, next(replies)))
+        batches.append(sorted(found))
+    return batches
+
+
+def queue_add(pipe, tenant_id: str, phash_hex: str, meta: Dict, now: Optional[float] = None):
+    """
+    Queue the writes that store one hash onto a pipeline. Metadata and the
+    first-seen time are only set the first time a tenant stores the hash, so
+    matches keep pointing at the earliest submission.
+    """
+    now = time.time() if now is None else now
+    for key in index_keys(tenant_id, phash_hex):
+        pipe.sadd(key, phash_hex)
+    if PHASH_CROSS_TENANT_INDEX:
+        for key in index_keys(GLOBAL_SCOPE, phash_hex):
+            pipe.sadd(key, f"{tenant_id}:{phash_hex}")
+    pipe.hsetnx(meta_key(tenant_id), phash_hex, json.dumps({**meta, "storedAt": now}))
+    pipe.zadd(added_key(tenant_id), {phash_hex: now}, nx=True)
+    pipe.sadd(TENANTS_KEY, tenant_id)
+
+
+def add_to_index(client, tenant_id: str, phash_hex: str, meta: Dict):
+    add_many_to_index(client, tenant_id, [(phash_hex, meta)])
+
+
+def add_many_to_index(client, tenant_id: str, entries: List[Tuple[str, Dict]]):
+    """
+    Store several (hex, meta) entries in one pipelined round trip.
+    """
+    if not entries:
+        return
+    now = time.time()
+    pipe = client.pipeline(transaction=False)
+    for phash_hex, meta in entries:
+        queue_add(pipe, tenant_id, phash_hex, meta, now=now)
+    pipe.execute()
+
+
+def get_metadata(client, pairs: List[Tuple[str, str]]) -> List[Optional[Dict]]:
+    """
+    Stored metadata for (tenant, hex) pairs, in the same order.
+    """
+    if not pairs:
+        return []
+    pipe = client.pipeline(transaction=False)
+    for tenant_id, phash_hex in pairs:
+        pipe.hget(meta_key(tenant_id), phash_hex)
+    return [json.loads(raw) if raw else None for raw in pipe.execute()]
+
+
+def compact_expired(client, retention_days: int = PHASH_RETENTION_DAYS,
+                    batch_size: int = 500, now: Optional[float] = None) -> int:
+    """
+    Remove hashes first seen more than retention_days ago from every tenant's
+    band sets, the cross-tenant index, metadata and first-seen zset.
+    """
+    if retention_days <= 0:
+        return 0
+
+    cutoff = (time.time() if now is None else now) - retention_days * 86400
+    removed = 0
+
+    for tenant_id in client.smembers(TENANTS_KEY):
+        while True:
+            expired = client.zrangebyscore(added_key(tenant_id), "-inf", cutoff, start=0, num=batch_size)
+            if not expired:
+                break
+
+            pipe = client.pipeline(transaction=False)
+            for phash_hex in expired:
+                for key in index_keys(tenant_id, phash_hex):
+                    pipe.srem(key, phash_hex)
+                for key in index_keys(GLOBAL_SCOPE, phash_hex):
+                    pipe.srem(key, f"{tenant_id}:{phash_hex}")
+            pipe.hdel(meta_key(tenant_id), *expired)
+            pipe.zrem(added_key(tenant_id), *expired)
+            pipe.execute()
+            removed += len(expired)
+
+    if removed:
+        print(f"[DUPLICATE] Compaction removed {removed} pHash(es) older than {retention_days} days")
+    return removed
+
+
+def migrate_legacy_hash_set(client, batch_size: int = 1000) -> int:
+    """
+    One-time copy of hashes from the old flat set. They carry no tenant, so
+    they are stored under the "legacy" tenant, whose scope every lookup
+    searches. Guarded by a flag key so only the first caller does the work.
+    """
+    if not client.set(MIGRATION_FLAG_KEY, "in_progress", nx=True):
+        return 0
+
+    migrated = 0
+    now = time.time()
+    try:
+        cursor = 0
+        while True:
+            cursor, members = client.sscan(LEGACY_HASH_SET_KEY, cursor=cursor, count=batch_size)
+            if members:
+                pipe = client.pipeline(transaction=False)
+                for phash_hex in members:
+                    for key in index_keys(LEGACY_TENANT, phash_hex):
+                        pipe.sadd(key, phash_hex)
+                    pipe.zadd(added_key(LEGACY_TENANT), {phash_hex: now}, nx=True)
+                pipe.sadd(TENANTS_KEY, LEGACY_TENANT)
+                pipe.execute()
+                migrated += len(members)
+            if cursor == 0:
+                break
+    except Exception:
+        client.delete(MIGRATION_FLAG_KEY)
+        raise
+
+    client.set(MIGRATION_FLAG_KEY, "done")
+    if migrated:
+        print(f"[DUPLICATE] Migrated {migrated} legacy pHashes into the legacy index")
+    return migrated
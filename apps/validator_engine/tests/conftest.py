@@ -0,0 +1,125 @@
+import os
+import sys
+
+import pytest
+
+# Modules import each other as top-level packages (services.*, utils.*) from apps/validator_engine
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakeRedis:
+    """
+    In-memory stand-in for the redis-py calls the pHash index makes
+    (decode_responses=True semantics: str in, str out).
+    """
+
+    def __init__(self):
+        self.data = {}
+
+    def pipeline(self, transaction=True):
+        return _FakePipeline(self)
+
+    # strings
+    def set(self, key, value, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def delete(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    # sets
+    def sadd(self, key, *members):
+        target = self.data.setdefault(key, set())
+        before = len(target)
+        target.update(members)
+        return len(target) - before
+
+    def srem(self, key, *members):
+        target = self.data.get(key, set())
+        before = len(target)
+        target.difference_update(members)
+        return before - len(target)
+
+    def smembers(self, key):
+        return set(self.data.get(key, set()))
+
+    def sunion(self, keys, *more):
+        keys = [keys] if isinstance(keys, str) else list(keys)
+        found = set()
+        for key in keys + list(more):
+            found |= self.data.get(key, set())
+        return found
+
+    def sscan(self, key, cursor=0, count=10):
+        members = sorted(self.data.get(key, set()))
+        batch = members[cursor:cursor + count]
+        following = cursor + count
+        return (following if following < len(members) else 0), batch
+
+    # hashes
+    def hsetnx(self, key, field, value):
+        target = self.data.setdefault(key, {})
+        if field in target:
+            return 0
+        target[field] = value
+        return 1
+
+    def hget(self, key, field):
+        return self.data.get(key, {}).get(field)
+
+    def hdel(self, key, *fields):
+        target = self.data.get(key, {})
+        return sum(target.pop(field, None) is not None for field in fields)
+
+    # sorted sets
+    def zadd(self, key, mapping, nx=False):
+        target = self.data.setdefault(key, {})
+        added = 0
+        for member, score in mapping.items():
+            if nx and member in target:
+                continue
+            added += member not in target
+            target[member] = score
+        return added
+
+    def zrem(self, key, *members):
+        target = self.data.get(key, {})
+        return sum(target.pop(member, None) is not None for member in members)
+
+    def zrangebyscore(self, key, low, high, start=None, num=None):
+        low = float(low)
+        high = float(high)
+        members = sorted((score, member) for member, score in self.data.get(key, {}).items()
+                         if low <= score <= high)
+        members = [member for _, member in members]
+        if start is not None:
+            members = members[start:start + num]
+        return members
+
+
+class _FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        method = getattr(self.client, name)
+
+        def queue(*args, **kwargs):
+            self.calls.append((method, args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        calls, self.calls = self.calls, []
+        return [method(*args, **kwargs) for method, args, kwargs in calls]
+
+
+@pytest.fixture
+def fake_redis():
+    return FakeRedis()
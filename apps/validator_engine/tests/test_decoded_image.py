@@ -0,0 +1,51 @@
+import io
+
+import pytest
+
+pytest.importorskip("cv2")
+Image = pytest.importorskip("PIL.Image")
+
+from utils.decoded_image import DecodedImage, ImageDecodeError  # noqa: E402
+
+
+def _jpeg(size=(64, 48)) -> bytes:
+    out = io.BytesIO()
+    Image.new("RGB", size, (120, 30, 200)).save(out, "JPEG")
+    return out.getvalue()
+
+
+def test_valid_image_decodes():
+    image = DecodedImage(_jpeg())
+    assert image.size == (64, 48)
+    assert image.bgr.shape == (48, 64, 3)
+
+
+@pytest.mark.parametrize("data", [b"not an image", _jpeg()[:40]])
+def test_corrupt_image_raises_decode_error(data):
+    image = DecodedImage(data)
+    with pytest.raises(ImageDecodeError):
+        image.bgr
+    with pytest.raises(ImageDecodeError):
+        image.analysis(16)
+
+
+def test_missing_spill_file_is_not_a_decode_error(tmp_path):
+    image = DecodedImage(path=str(tmp_path / "gone.jpg"))
+    with pytest.raises(FileNotFoundError):
+        image.size
+
+
+def test_release_pixels_keeps_header_and_decodes_again():
+    image = DecodedImage(_jpeg((200, 100)))
+    assert image.pixel_nbytes == 0
+    bgr = image.bgr
+    image.analysis(50)
+    held = image.pixel_nbytes
+    assert held >= bgr.nbytes
+
+    assert image.release_pixels() == held
+    assert image.pixel_nbytes == 0
+    assert image.size == (200, 100)
+    # Arrays already handed out stay usable; new accesses decode again
+    assert bgr.shape == (100, 200, 3)
+    assert image.bgr is not bgr and (image.bgr == bgr).all()
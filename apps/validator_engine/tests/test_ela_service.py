@@ -0,0 +1,74 @@
+import io
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+pytest.importorskip("pydantic")
+Image = pytest.importorskip("PIL.Image")
+
+from services.ela_service import _compute_ela  # noqa: E402
+
+DEFAULT_THRESHOLD = 6.0
+
+
+def _jpeg(img, quality):
+    out = io.BytesIO()
+    img.save(out, "JPEG", quality=quality)
+    out.seek(0)
+    return Image.open(out).convert("RGB")
+
+
+def _scene(h=480, w=640, seed=0):
+    """
+    Gradients, flat discs and sensor-like noise: edges and texture for the
+    JPEG grid to act on.
+    """
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:h, 0:w]
+    base = np.stack([(x * 0.3 + y * 0.1) % 255, (y * 0.4) % 255, x * 0.2 + 60], -1)
+    for _ in range(12):
+        cy, cx, radius = rng.integers(0, h), rng.integers(0, w), rng.integers(20, 90)
+        base[(y - cy) ** 2 + (x - cx) ** 2 < radius ** 2] = rng.integers(0, 255, 3)
+    noisy = base + rng.normal(0, 12, (h, w, 3))
+    return Image.fromarray(np.clip(noisy, 0, 255).astype(np.uint8))
+
+
+def _score(img):
+    return _compute_ela(img, 90)["score"]
+
+
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.parametrize("camera_quality", [85, 90, 95])
+def test_camera_original_is_below_default(seed, camera_quality):
+    assert _score(_jpeg(_scene(seed=seed), camera_quality)) < DEFAULT_THRESHOLD
+
+
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.parametrize("camera_quality", [85, 90, 95])
+@pytest.mark.parametrize("patch_quality", [None, 70])
+def test_spliced_photo_is_above_default(seed, camera_quality, patch_quality):
+    original = _jpeg(_scene(seed=seed), camera_quality)
+    patch = _scene(160, 200, seed=seed + 100)
+    if patch_quality:
+        patch = _jpeg(patch, patch_quality)
+    original.paste(patch, (203, 151))
+
+    assert _score(_jpeg(original, 90)) > DEFAULT_THRESHOLD
+
+
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.parametrize("camera_quality", [85, 95])
+def test_resaved_photo_is_above_default(seed, camera_quality):
+    original = _jpeg(_scene(seed=seed), camera_quality)
+    assert _score(_jpeg(original, 90)) > DEFAULT_THRESHOLD
+
+
+def test_old_extrema_rule_missed_the_splice():
+    # The replaced rule flagged extrema_sum > 500; a splice stays far below it
+    original = _jpeg(_scene(), 95)
+    original.paste(_scene(160, 200, seed=100), (203, 151))
+    stats = _compute_ela(_jpeg(original, 90), 90)
+
+    assert stats["extrema_sum"] < 500
+    assert stats["score"] > DEFAULT_THRESHOLD
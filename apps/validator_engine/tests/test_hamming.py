@@ -0,0 +1,49 @@
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from utils import hamming  # noqa: E402
+from utils.hamming import hamming_distances, hamming_topk, pack_hex_hashes, popcount64  # noqa: E402
+
+
+def _scalar(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+@pytest.fixture
+def corpus():
+    rng = random.Random(7)
+    values = [rng.getrandbits(64) for _ in range(500)] + [0, 2 ** 64 - 1, 1, 2 ** 63]
+    return values, pack_hex_hashes(f"{v:x}" for v in values)
+
+
+def test_pack_round_trips_short_hex():
+    assert pack_hex_hashes(["1", "ff", "ffffffffffffffff"]).tolist() == [1, 255, 2 ** 64 - 1]
+    assert pack_hex_hashes([]).size == 0
+
+
+def test_distances_match_scalar_reference(corpus):
+    values, packed = corpus
+    for query in values[:20] + [0, 2 ** 64 - 1]:
+        assert hamming_distances(query, packed).tolist() == [_scalar(query, v) for v in values]
+
+
+def test_table_popcount_matches_bitwise_count(corpus, monkeypatch):
+    values, packed = corpus
+    expected = [bin(v).count("1") for v in values]
+    monkeypatch.delattr(hamming.np, "bitwise_count", raising=False)
+    assert popcount64(packed).tolist() == expected
+
+
+def test_topk_matches_scalar_reference(corpus):
+    values, packed = corpus
+    query = values[3]
+    for max_distance in (0, 24, 30, 64):
+        expected = sorted(
+            ((i, _scalar(query, v)) for i, v in enumerate(values) if _scalar(query, v) <= max_distance),
+            key=lambda hit: hit[1]
+        )
+        assert hamming_topk(query, packed, max_distance) == expected
+        assert hamming_topk(query, packed, max_distance, k=5) == expected[:5]
@@ -0,0 +1,44 @@
+import struct
+
+import pytest
+
+pytest.importorskip("exifread")
+
+from utils import image_probe  # noqa: E402
+from utils.image_probe import MediaProbe  # noqa: E402
+
+# SOI + SOF0 for a 640x480 baseline JPEG, no EXIF
+_JPEG_HEADER = b"\xff\xd8" + b"\xff\xc0" + struct.pack(">HBHHB", 8, 8, 480, 640, 3)
+_PNG_HEADER = b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR" + struct.pack(">II", 640, 480)
+
+
+def _failing_parse(*args, **kwargs):
+    raise ValueError("truncated IFD")
+
+
+def test_jpeg_probe_is_reliable_when_exif_parses():
+    probe = MediaProbe(_JPEG_HEADER, total_size=10 ** 6)
+    assert probe.size == (640, 480)
+    assert probe.exif_reliable
+    assert probe.exif_error is None
+
+
+def test_failed_exif_parse_is_not_reliable(monkeypatch):
+    monkeypatch.setattr(image_probe.exifread, "process_file", _failing_parse)
+    probe = MediaProbe(_JPEG_HEADER, total_size=10 ** 6)
+    assert not probe.exif_reliable
+    assert probe.exif_tags == {}
+    assert probe.exif_error == "truncated IFD"
+
+
+def test_failed_exif_parse_of_complete_object_is_not_reliable(monkeypatch):
+    monkeypatch.setattr(image_probe.exifread, "process_file", _failing_parse)
+    probe = MediaProbe(_PNG_HEADER, total_size=len(_PNG_HEADER))
+    assert probe.complete
+    assert not probe.exif_reliable
+
+
+def test_partial_non_jpeg_probe_is_not_reliable():
+    probe = MediaProbe(_PNG_HEADER, total_size=10 ** 6)
+    assert probe.size == (640, 480)
+    assert not probe.exif_reliable
@@ -0,0 +1,128 @@
+import json
+import os
+from datetime import date
+
+import pytest
+
+from services.invoice_extractor import (
+    _DATE_RES, _NON_AMOUNT_RE, _blank, _parse_number, amount_candidates, date_candidates, extract_invoice_fields,
+    parse_date
+)
+
+CORPUS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                      "benchmarks", "invoice_ocr_corpus.json")
+
+
+@pytest.mark.parametrize("token, value", [
+    ("1,50,000", 150000.0),
+    ("150,000", 150000.0),
+    ("150000", 150000.0),
+    ("7,61,600.00", 761600.0),
+    ("36250.50", 36250.5),
+    ("12,34,56,789", 123456789.0),
+])
+def test_parse_number_accepts_indian_and_western_grouping(token, value):
+    assert _parse_number(token) == value
+
+
+@pytest.mark.parametrize("token", ["1,5,000", "15,00,0", "1,500,00", "150,0000"])
+def test_parse_number_rejects_broken_grouping(token):
+    assert _parse_number(token) is None
+
+
+@pytest.mark.parametrize("text", [
+    "GSTIN 27AAPFU0939F1ZV",
+    "Mob 9876543210",
+    "+91 9448012345",
+    "Invoice No: INV/2025/00123",
+    "HSN 8701",
+    "A/C No 50100234567891",
+    "12/02/2025",
+    "2025-02-10",
+    "3rd March, 2025",
+])
+def test_non_amount_spans_are_masked(text):
+    masked = _NON_AMOUNT_RE.sub(_blank, text)
+    assert len(masked) == len(text)
+    assert not any(c.isdigit() for c in masked)
+    assert amount_candidates(text) == []
+
+
+def test_masking_keeps_the_amount_on_a_mixed_line():
+    text = "Bill No 4471 Date 02/01/2025 Net Payable ₹ 98,750"
+    assert [c["value"] for c in amount_candidates(text)] == [98750.0]
+
+
+def test_currency_and_keyword_make_an_amount_confident():
+    [bare] = amount_candidates("1,50,000")
+    [total] = amount_candidates("Grand Total Rs.1,50,000/-")
+    assert bare["score"] < 3.0 <= total["score"]
+
+
+def test_bare_year_is_not_an_amount():
+    assert amount_candidates("Thank you for your business 2024") == []
+
+
+def _first_date(text):
+    for pattern in _DATE_RES:
+        match = pattern.search(text)
+        if match:
+            return parse_date(match)
+    return None
+
+
+@pytest.mark.parametrize("text, value", [
+    ("12/02/2025", date(2025, 2, 12)),
+    ("05-01-25", date(2025, 1, 5)),
+    ("21.08.2024", date(2024, 8, 21)),
+    ("2024/12/05", date(2024, 12, 5)),
+    ("05-Jan-2025", date(2025, 1, 5)),
+    ("3rd March, 2025", date(2025, 3, 3)),
+    ("Jan 15, 2025", date(2025, 1, 15)),
+    ("12 Sept 2024", date(2024, 9, 12)),
+])
+def test_parse_date_formats(text, value):
+    assert _first_date(text) == value
+
+
+def test_parse_date_rejects_impossible_dates():
+    assert _first_date("31/02/2025") is None
+    assert date_candidates("Ref 31/02/2025") == []
+
+
+def test_dates_outside_the_year_window_are_ignored():
+    assert date_candidates("Date 12/02/1999", max_year=2026) == []
+    assert date_candidates("Date 12/02/2030", max_year=2026) == []
+
+
+def test_invoice_date_beats_due_date():
+    fields = extract_invoice_fields([("Due date 03/04/2025", 0.9), ("Invoice dated 3rd March, 2025", 0.9)])
+    assert fields["date"] == date(2025, 3, 3) and fields["date_confident"]
+
+
+def test_split_label_and_value_boxes_are_confident():
+    fields = extract_invoice_fields([("Grand Total", 0.9), ("1,50,000", 0.9),
+                                     ("Invoice Date:", 0.9), ("12/02/2025", 0.9)], 0.5)
+    assert fields["amount"] == 150000.0 and fields["amount_confident"]
+    assert fields["date"] == date(2025, 2, 12) and fields["date_confident"]
+
+
+def test_label_only_scores_the_next_line():
+    fields = extract_invoice_fields([("Grand Total", 0.9), ("Thank you", 0.9), ("1,50,000", 0.9)], 0.5)
+    assert not fields["amount_confident"]
+
+
+def test_low_ocr_confidence_is_never_confident():
+    fields = extract_invoice_fields([("Grand Total ₹ 1,50,000", 0.3)], 0.5)
+    assert fields["amount"] == 150000.0 and not fields["amount_confident"]
+
+
+def test_corpus():
+    with open(CORPUS, "r", encoding="utf-8") as f:
+        cases = json.load(f)
+    for case in cases:
+        lines = [tuple(line) if isinstance(line, list) else (line, 0.9) for line in case["lines"]]
+        fields = extract_invoice_fields(lines, 0.5)
+        expected_date = date.fromisoformat(case["date"]) if case["date"] else None
+        assert fields["amount"] == pytest.approx(case["amount"]), case["name"]
+        assert fields["date"] == expected_date, case["name"]
@@ -0,0 +1,34 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from services.invoice_extractor import extract_invoice_fields
+from services.invoice_ocr import join_rows
+
+
+def test_join_rows_merges_split_boxes_left_to_right():
+    boxes = [
+        (100, 120, 200, "12/02/2025", 0.95),
+        (500, 520, 300, "₹1,50,000", 0.8),
+        (102, 121, 10, "Invoice Date:", 0.9),
+        (498, 519, 10, "Grand Total", 0.9),
+        (300, 318, 10, "Tractor", 0.9),
+    ]
+    assert join_rows(boxes) == [
+        ("Invoice Date: 12/02/2025", 0.9),
+        ("Tractor", 0.9),
+        ("Grand Total ₹1,50,000", 0.8),
+    ]
+
+
+def test_join_rows_keeps_stacked_rows_apart():
+    boxes = [(0, 20, 0, "Subtotal 2,400", 0.9), (22, 42, 0, "Total 2,832", 0.9)]
+    assert [text for text, _ in join_rows(boxes)] == ["Subtotal 2,400", "Total 2,832"]
+
+
+def test_split_boxes_are_confident_after_joining():
+    boxes = [(10, 30, 0, "Invoice Date:", 0.9), (12, 31, 150, "12/02/2025", 0.9),
+             (400, 420, 0, "Grand Total", 0.9), (401, 421, 150, "1,50,000", 0.9)]
+    fields = extract_invoice_fields(join_rows(boxes), 0.5)
+    assert fields["amount"] == 150000 and fields["amount_confident"]
+    assert fields["date_confident"]
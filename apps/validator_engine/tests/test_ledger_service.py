@@ -0,0 +1,140 @@
+import sqlite3
+
+import pytest
+
+from services import ledger_service
+from services.ledger_service import GENESIS_HASH, LedgerService, _stitch
+from utils.merkle import verify_proof
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    service = LedgerService(str(tmp_path / "ledger.sqlite3"), shards=2)
+    yield service
+    service.close()
+
+
+def _fill(ledger, count, submissions=3, offset=0):
+    for i in range(offset, offset + count):
+        ledger.add_entry("VALIDATION_STEP", {"step": i, "flags": []}, f"SUB-{i % submissions}")
+    ledger.flush()
+
+
+def _tamper(ledger, sql, params=()):
+    # Triggers keep the tables append-only; an attacker with file access drops them first
+    conn = sqlite3.connect(ledger.db_path, isolation_level=None)
+    try:
+        conn.execute("DROP TRIGGER ledger_entries_no_update")
+        conn.execute("DROP TRIGGER ledger_anchors_no_update")
+        conn.execute(sql, params)
+    finally:
+        conn.close()
+
+
+def test_flush_persists_entries_in_write_order(ledger, tmp_path):
+    _fill(ledger, 5)
+    reopened = LedgerService(str(tmp_path / "ledger.sqlite3"))
+    assert [e["event_data"]["step"] for e in reopened.get_entries()] == [0, 1, 2, 3, 4]
+    assert [e["seq"] for e in reopened.get_entries(after_seq=3)] == [4, 5]
+
+
+def test_updates_and_deletes_are_rejected_by_triggers(ledger):
+    _fill(ledger, 1)
+    conn = sqlite3.connect(ledger.db_path)
+    with pytest.raises(sqlite3.DatabaseError, match="append-only"):
+        conn.execute("UPDATE ledger_entries SET event_data = '{}'")
+    with pytest.raises(sqlite3.DatabaseError, match="append-only"):
+        conn.execute("DELETE FROM ledger_entries")
+    conn.close()
+
+
+def test_sub_chains_link_per_submission(ledger):
+    _fill(ledger, 6)
+    entries = ledger.get_entries("SUB-1")
+    assert [e["event_data"]["step"] for e in entries] == [1, 4]
+    assert entries[0]["previous_hash"] == GENESIS_HASH
+    assert entries[1]["previous_hash"] == entries[0]["entry_hash"]
+    assert ledger.verify_submission("SUB-1") == {"valid": True, "entries": 2, "error": None}
+
+
+def test_tampered_entry_breaks_only_its_sub_chain(ledger):
+    _fill(ledger, 6)
+    _tamper(ledger, "UPDATE ledger_entries SET event_data = ? WHERE seq = 5", ('{"step":99,"flags":[]}',))
+
+    assert ledger.verify_submission("SUB-1")["error"].startswith("SUB-1: Entry hash mismatch")
+    assert ledger.verify_submission("SUB-0")["valid"]
+    assert not ledger.get_proof("SUB-1")["valid"]
+    assert not ledger.verify_incremental()["valid"]
+    assert not ledger.audit(workers=1)["valid"]
+
+
+def test_anchor_proof_verifies(ledger):
+    _fill(ledger, 9)
+    anchor = ledger.anchor()
+    assert anchor["leaf_count"] == 3
+    assert ledger.anchor() is None
+
+    proof = ledger.get_proof("SUB-2")
+    leaf = proof["anchor"]["leaf"]
+    assert proof["valid"] and proof["unanchored_entries"] == 0
+    assert verify_proof(leaf["leaf_hash"], proof["anchor"]["proof"], anchor["merkle_root"])
+    assert ledger.verify_incremental()["valid"]
+
+    _fill(ledger, 2, offset=9)
+    assert ledger.get_proof("SUB-0")["unanchored_entries"] == 1
+
+
+def test_incremental_verify_moves_the_checkpoint(ledger):
+    _fill(ledger, 10)
+    first = ledger.verify_incremental()
+    assert first == {"valid": True, "checked": 10, "verified_seq": 10, "error": None}
+
+    _fill(ledger, 4, offset=10)
+    second = ledger.verify_incremental()
+    # Only the new entries are hashed, but their links reach back past the checkpoint
+    assert second == {"valid": True, "checked": 4, "verified_seq": 14, "error": None}
+    assert ledger.verify_incremental()["checked"] == 0
+
+
+def test_audit_catches_tampering_below_the_checkpoint(ledger):
+    _fill(ledger, 10)
+    assert ledger.verify_incremental()["valid"]
+    _tamper(ledger, "UPDATE ledger_entries SET performed_by = 'someone' WHERE seq = 2")
+
+    # Entries below the checkpoint are trusted by the incremental check
+    assert ledger.verify_incremental()["valid"]
+    result = ledger.audit(workers=1)
+    assert not result["valid"]
+    assert "seq 2" in result["error"]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_sliced_audit_matches_single_pass(ledger, monkeypatch, workers):
+    monkeypatch.setattr(ledger_service, "_AUDIT_MIN_SLICE", 4)
+    _fill(ledger, 30, submissions=4)
+    ledger.anchor()
+
+    result = ledger.audit(workers=workers)
+    assert result["valid"] and result["checked"] == 30
+
+    _tamper(ledger, "UPDATE ledger_entries SET event_type = 'X' WHERE seq = 22")
+    result = ledger.audit(workers=workers)
+    assert not result["valid"] and "seq 22" in result["error"]
+
+
+def test_stitch_rejects_a_broken_link_between_slices():
+    first = {"checked": 2, "error": None, "boundaries": {"SUB-0": (1, GENESIS_HASH)}, "heads": {"SUB-0": "a" * 64}}
+    linked = {"checked": 1, "error": None, "boundaries": {"SUB-0": (7, "a" * 64)}, "heads": {"SUB-0": "b" * 64}}
+    broken = {"checked": 1, "error": None, "boundaries": {"SUB-0": (7, "c" * 64)}, "heads": {"SUB-0": "b" * 64}}
+
+    assert _stitch([first, linked]) == (3, None)
+    assert _stitch([first, broken]) == (3, "SUB-0: Hash chain broken at seq 7")
+
+
+def test_tampered_anchor_is_detected(ledger):
+    _fill(ledger, 6)
+    ledger.anchor()
+    _tamper(ledger, "UPDATE ledger_anchors SET merkle_root = ?", ("0" * 64,))
+
+    assert "Anchor chain broken at anchor 1" in ledger.verify_incremental()["error"]
+    assert not ledger.audit(workers=1)["valid"]
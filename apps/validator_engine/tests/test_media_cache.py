@@ -0,0 +1,56 @@
+import io
+
+import pytest
+
+pytest.importorskip("boto3")
+pytest.importorskip("cv2")
+Image = pytest.importorskip("PIL.Image")
+
+from utils import media_cache  # noqa: E402
+from utils.media_cache import MediaCache  # noqa: E402
+
+
+def _jpeg(size) -> bytes:
+    out = io.BytesIO()
+    Image.new("RGB", size, (10, 200, 90)).save(out, "JPEG")
+    return out.getvalue()
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    # Three 1000x1000 images already downloaded; 6 MB of pixels each (PIL + BGR) once bgr is read
+    cache = MediaCache(probe=False)
+    for key in ("a.jpg", "b.jpg", "c.jpg"):
+        cache._bytes[key] = _jpeg((1000, 1000))
+    yield cache
+    cache.close()
+
+
+def test_decoded_pixels_stay_within_budget(cache, monkeypatch):
+    monkeypatch.setattr(media_cache, "DECODED_MEMORY_MAX_MB", 10)
+    a = cache.get_image("a.jpg")
+    a.bgr
+    b = cache.get_image("b.jpg")
+    b.bgr
+    assert a.pixel_nbytes and b.pixel_nbytes
+
+    # Over budget: the least recently requested image is released first
+    c = cache.get_image("c.jpg")
+    assert a.pixel_nbytes == 0 and b.pixel_nbytes
+
+    cache.get_image("b.jpg")
+    c.bgr
+    cache.get_image("b.jpg")
+    assert c.pixel_nbytes == 0 and b.pixel_nbytes
+
+    # A released image is still the shared instance and decodes again
+    assert cache.get_image("a.jpg") is a and a.bgr.shape == (1000, 1000, 3)
+
+
+def test_no_budget_keeps_everything(cache, monkeypatch):
+    monkeypatch.setattr(media_cache, "DECODED_MEMORY_MAX_MB", 0)
+    images = [cache.get_image(key) for key in ("a.jpg", "b.jpg", "c.jpg")]
+    for image in images:
+        image.bgr
+    cache.get_image("a.jpg")
+    assert all(image.pixel_nbytes for image in images)
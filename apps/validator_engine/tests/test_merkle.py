@@ -0,0 +1,48 @@
+import hashlib
+
+import pytest
+
+from utils.merkle import leaf_hash, merkle_proof, merkle_root, node_hash, verify_proof
+
+
+def _leaves(count):
+    return [leaf_hash(f"leaf-{i}") for i in range(count)]
+
+
+def test_empty_and_single_leaf_roots():
+    assert merkle_root([]) == hashlib.sha256(b"").hexdigest()
+    leaf = leaf_hash("only")
+    assert merkle_root([leaf]) == leaf
+    assert merkle_proof([leaf], 0) == []
+
+
+def test_odd_node_is_carried_up():
+    a, b, c = _leaves(3)
+    assert merkle_root([a, b, c]) == node_hash(node_hash(a, b), c)
+
+
+@pytest.mark.parametrize("count", [1, 2, 3, 5, 6, 7, 9, 17])
+def test_every_proof_verifies(count):
+    leaves = _leaves(count)
+    root = merkle_root(leaves)
+    for index, leaf in enumerate(leaves):
+        assert verify_proof(leaf, merkle_proof(leaves, index), root)
+
+
+@pytest.mark.parametrize("count", [3, 5, 7])
+def test_tampered_leaf_or_proof_fails(count):
+    leaves = _leaves(count)
+    root = merkle_root(leaves)
+    for index, leaf in enumerate(leaves):
+        proof = merkle_proof(leaves, index)
+        assert not verify_proof(leaf_hash("forged"), proof, root)
+        # Another leaf's path does not prove this one
+        other = (index + 1) % count
+        assert not verify_proof(leaf, merkle_proof(leaves, other), root)
+
+
+def test_swapped_sides_fail():
+    leaves = _leaves(5)
+    root = merkle_root(leaves)
+    proof = [{**step, "side": "left" if step["side"] == "right" else "right"} for step in merkle_proof(leaves, 2)]
+    assert not verify_proof(leaves[2], proof, root)
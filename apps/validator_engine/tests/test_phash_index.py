@@ -0,0 +1,58 @@
+import random
+
+import pytest
+
+from services import phash_index
+from services.phash_index import (
+    BAND_BITS, LEGACY_HASH_SET_KEY, LEGACY_TENANT, PHASH_BANDS, add_many_to_index, add_to_index,
+    find_candidates, migrate_legacy_hash_set
+)
+
+
+def test_legacy_hashes_match_without_cross_tenant_index(fake_redis, monkeypatch):
+    monkeypatch.setattr(phash_index, "PHASH_CROSS_TENANT_INDEX", False)
+    fake_redis.sadd(LEGACY_HASH_SET_KEY, "ffff0000ffff0000", "0123456789abcdef")
+
+    assert migrate_legacy_hash_set(fake_redis, batch_size=1) == 2
+    assert migrate_legacy_hash_set(fake_redis) == 0
+
+    candidates = find_candidates(fake_redis, "tenant-a", "ffff0000ffff0001", 10)
+    assert (LEGACY_TENANT, "ffff0000ffff0000") in candidates
+
+
+def test_tenant_scopes_stay_separate(fake_redis, monkeypatch):
+    monkeypatch.setattr(phash_index, "PHASH_CROSS_TENANT_INDEX", False)
+    add_to_index(fake_redis, "tenant-a", "ffff0000ffff0000", {"submissionId": "s1"})
+
+    assert find_candidates(fake_redis, "tenant-a", "ffff0000ffff0000", 0) == [("tenant-a", "ffff0000ffff0000")]
+    assert find_candidates(fake_redis, "tenant-b", "ffff0000ffff0000", 0) == []
+
+
+def test_cross_tenant_index_reports_the_owning_tenant(fake_redis, monkeypatch):
+    monkeypatch.setattr(phash_index, "PHASH_CROSS_TENANT_INDEX", True)
+    add_to_index(fake_redis, "tenant-a", "ffff0000ffff0000", {"submissionId": "s1"})
+
+    assert find_candidates(fake_redis, "tenant-b", "ffff0000ffff0000", 0) == [("tenant-a", "ffff0000ffff0000")]
+
+
+def _flip(phash_hex: str, bits) -> str:
+    value = int(phash_hex, 16)
+    for b in bits:
+        value ^= 1 << b
+    return f"{value:016x}"
+
+
+@pytest.mark.parametrize("max_distance", [0, 3, 4, 8, 10, 11, 12])
+def test_every_hash_at_the_threshold_is_a_candidate(fake_redis, monkeypatch, max_distance):
+    monkeypatch.setattr(phash_index, "PHASH_CROSS_TENANT_INDEX", False)
+    rng = random.Random(max_distance)
+    query = f"{rng.getrandbits(64):016x}"
+
+    stored = [_flip(query, rng.sample(range(64), max_distance)) for _ in range(50)]
+    # Worst case for the pigeonhole bound: flips spread as evenly as possible over the bands
+    spread = [(i % PHASH_BANDS) * BAND_BITS + i // PHASH_BANDS for i in range(max_distance)]
+    stored.append(_flip(query, spread))
+    add_many_to_index(fake_redis, "tenant-a", [(h, {"submissionId": h}) for h in stored])
+
+    found = {h for _, h in find_candidates(fake_redis, "tenant-a", query, max_distance)}
+    assert set(stored) <= found
@@ -0,0 +1,158 @@
+import os
+
+import pytest
+
+boto3 = pytest.importorskip("boto3")
+pytest.importorskip("dotenv")
+
+from utils import s3_utils  # noqa: E402
+from utils.temp_utils import safe_remove  # noqa: E402
+
+
+class _Response:
+    def __init__(self, etag):
+        self.headers = {"ETag": etag}
+
+    def raise_for_status(self):
+        pass
+
+
+@pytest.fixture
+def stores(monkeypatch):
+    calls = []
+    monkeypatch.setattr(s3_utils, "AWS_S3_BUCKET", "default-bucket")
+    monkeypatch.setattr(s3_utils.s3_client, "head_object",
+                        lambda Bucket, Key: calls.append(("head", Bucket, Key)) or {"ETag": '"abc"'})
+    monkeypatch.setattr(s3_utils._http, "get",
+                        lambda url, **kwargs: calls.append(("get", url)) or _Response('"abc"'))
+    return calls
+
+
+def test_plain_key_uses_configured_bucket(stores):
+    assert s3_utils.fetch_etag("loans/1/photo.jpg") == ("default-bucket", "abc")
+    assert stores == [("head", "default-bucket", "loans/1/photo.jpg")]
+
+
+def test_s3_urls_carry_their_bucket(stores):
+    assert s3_utils.fetch_etag("https://media.s3.amazonaws.com/a.jpg") == ("media", "abc")
+    assert s3_utils.fetch_etag("https://s3.ap-south-1.amazonaws.com/other/a.jpg") == ("other", "abc")
+
+
+def test_presigned_urls_carry_bucket_or_host(stores):
+    url = "https://media.s3.amazonaws.com/a.jpg?X-Amz-Signature=x"
+    assert s3_utils.fetch_etag(url) == ("media", "abc")
+    assert s3_utils.fetch_etag("https://minio.local:9000/media/a.jpg?X-Amz-Signature=x") == ("minio.local:9000", "abc")
+
+
+def test_non_s3_urls_have_no_etag(stores):
+    # A CDN's ETag says nothing about the bytes; the caller hashes them instead
+    assert s3_utils.fetch_etag("https://cdn.example.com/a.jpg") is None
+    assert stores == []
+
+
+_MB = 1024 * 1024
+
+
+@pytest.fixture
+def bucket(monkeypatch, tmp_path):
+    moto = pytest.importorskip("moto")
+    monkeypatch.setattr(s3_utils, "AWS_S3_BUCKET", "media")
+    monkeypatch.setattr(s3_utils, "S3_MULTIPART_CHUNK_MB", 1)
+    monkeypatch.setattr("utils.temp_utils.MEDIA_SPILL_DIR", str(tmp_path))
+    with moto.mock_aws():
+        # The module's client predates the mock, so swap in one built under it
+        client = boto3.client("s3", region_name=s3_utils.AWS_REGION)
+        client.create_bucket(Bucket="media", CreateBucketConfiguration={"LocationConstraint": s3_utils.AWS_REGION})
+        monkeypatch.setattr(s3_utils, "s3_client", client)
+        yield client
+
+
+@pytest.mark.parametrize("size", [0, 1, _MB, _MB + 1, 3 * _MB + 5])
+@pytest.mark.parametrize("memory_limit", [0, 8 * _MB])
+def test_download_media_returns_the_whole_object(bucket, size, memory_limit):
+    body = os.urandom(size)
+    bucket.put_object(Bucket="media", Key="loans/photo.jpg", Body=body)
+
+    data, local_path = s3_utils.download_media("loans/photo.jpg", memory_limit)
+    if size <= memory_limit:
+        assert local_path is None and bytes(data) == body
+    else:
+        with open(local_path, "rb") as f:
+            assert data is None and f.read() == body
+        safe_remove(local_path)
+
+
+def test_probe_of_an_empty_object(bucket):
+    bucket.put_object(Bucket="media", Key="empty.jpg", Body=b"")
+    assert s3_utils.fetch_range("empty.jpg", 128 * 1024) == (b"", 0)
+
+
+class _UnrangedResponse:
+    """
+    A 200 reply from a server that ignores Range; counts what was streamed.
+    """
+
+    status_code = 200
+    headers = {}
+
+    def __init__(self, body, log):
+        self.body = body
+        self.log = log
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    @property
+    def content(self):
+        raise AssertionError("whole body read into memory")
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.body), chunk_size):
+            self.log.append(min(chunk_size, len(self.body) - start))
+            yield self.body[start:start + chunk_size]
+
+
+@pytest.fixture
+def unranged_server(monkeypatch, tmp_path):
+    body = os.urandom(3 * _MB + 5)
+    reads = []
+
+    def get(url, headers=None, **kwargs):
+        assert kwargs.get("stream")
+        reads.append([])
+        return _UnrangedResponse(body, reads[-1])
+
+    monkeypatch.setattr(s3_utils, "S3_MULTIPART_CHUNK_MB", 1)
+    monkeypatch.setattr(s3_utils._http, "get", get)
+    monkeypatch.setattr("utils.temp_utils.MEDIA_SPILL_DIR", str(tmp_path))
+    return body, reads
+
+
+def test_unranged_body_spills_past_the_memory_limit(unranged_server):
+    body, reads = unranged_server
+    data, local_path = s3_utils.download_media("https://cdn.example.com/invoice.pdf", memory_limit=_MB)
+
+    with open(local_path, "rb") as f:
+        assert data is None and f.read() == body
+    # The probing request stopped after one part instead of reading the whole body
+    assert sum(reads[0]) <= _MB + 64 * 1024
+    safe_remove(local_path)
+
+
+def test_unranged_body_within_the_limit_stays_in_memory(unranged_server):
+    body, _ = unranged_server
+    data, local_path = s3_utils.download_media("https://cdn.example.com/invoice.pdf", memory_limit=8 * _MB)
+    assert local_path is None and bytes(data) == body
+
+
+def test_unranged_probe_reads_only_the_window(unranged_server):
+    body, reads = unranged_server
+    data, total = s3_utils.fetch_range("https://cdn.example.com/invoice.pdf", 128 * 1024)
+    assert data == body[:128 * 1024] and total is None
+    assert sum(reads[0]) <= 192 * 1024
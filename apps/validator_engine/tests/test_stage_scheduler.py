@@ -0,0 +1,74 @@
+import threading
+import time
+
+import pytest
+
+from utils.stage_scheduler import Stage, run_stages
+
+
+def _recorder(log, name, result=None, delay=0.0, error=None):
+    def run():
+        log.append(("start", name))
+        time.sleep(delay)
+        log.append(("end", name))
+        if error is not None:
+            raise error
+        return result if result is not None else name
+    return run
+
+
+def test_stage_starts_after_its_requirements():
+    log = []
+    results = run_stages([
+        Stage("exif", _recorder(log, "exif", delay=0.05)),
+        Stage("gps", _recorder(log, "gps"), requires=["exif"]),
+        Stage("blur", _recorder(log, "blur")),
+    ])
+    assert results == {"exif": "exif", "gps": "gps", "blur": "blur"}
+    assert log.index(("end", "exif")) < log.index(("start", "gps"))
+
+
+def test_independent_stages_run_concurrently():
+    barrier = threading.Barrier(2, timeout=5)
+    # Each stage waits for the other; a serial scheduler would time out
+    results = run_stages([Stage("a", barrier.wait), Stage("b", barrier.wait)])
+    assert sorted(results.values()) == [0, 1]
+
+
+def test_disabled_requirement_counts_as_satisfied():
+    log = []
+    results = run_stages([
+        Stage("ocr", _recorder(log, "ocr"), enabled=False),
+        Stage("amount", _recorder(log, "amount"), requires=["ocr"]),
+    ])
+    assert results == {"amount": "amount"}
+    assert ("start", "ocr") not in log
+
+
+def test_first_error_in_list_order_wins_after_started_stages_settle():
+    log = []
+    with pytest.raises(KeyError):
+        run_stages([
+            Stage("first", _recorder(log, "first", delay=0.05, error=KeyError("first"))),
+            Stage("second", _recorder(log, "second", error=ValueError("second"))),
+            Stage("slow", _recorder(log, "slow", delay=0.1)),
+        ])
+    # Started stages are not abandoned mid-run
+    assert ("end", "slow") in log
+
+
+def test_dependents_of_a_failed_stage_never_start():
+    log = []
+    with pytest.raises(RuntimeError):
+        run_stages([
+            Stage("exif", _recorder(log, "exif", error=RuntimeError("bad exif"))),
+            Stage("gps", _recorder(log, "gps"), requires=["exif"]),
+        ])
+    assert ("start", "gps") not in log
+
+
+def test_unknown_requirement_and_cycle_are_rejected():
+    with pytest.raises(ValueError, match="unknown"):
+        run_stages([Stage("gps", lambda: None, requires=["missing"])])
+    with pytest.raises(ValueError, match="cycle"):
+        run_stages([Stage("a", lambda: None, requires=["b"]), Stage("b", lambda: None, requires=["a"])])
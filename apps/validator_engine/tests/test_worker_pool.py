@@ -0,0 +1,26 @@
+import time
+
+import pytest
+
+from utils.worker_pool import map_media
+
+
+def test_map_media_keeps_input_order():
+    # Later items finish first
+    results = map_media(lambda i: time.sleep((5 - i) * 0.01) or i * i, range(5), max_workers=4)
+    assert results == [0, 1, 4, 9, 16]
+
+
+def test_map_media_raises_first_failure_in_input_order():
+    finished = []
+
+    def work(i):
+        time.sleep(0.05 if i == 1 else 0)
+        finished.append(i)
+        if i in (1, 2):
+            raise ValueError(f"item {i}")
+        return i
+
+    with pytest.raises(ValueError, match="item 1"):
+        map_media(work, range(4), max_workers=4)
+    assert sorted(finished) == [0, 1, 2, 3]
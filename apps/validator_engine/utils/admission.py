@@ -0,0 +1,69 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+
+class AdmissionRejected(Exception):
+    """
+    Raised when a request cannot be admitted. status_code is 429 when the
+    wait queue is full and 503 when the request waited too long for a slot.
+    """
+
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Bounds how many validations run at once and how many may wait for a slot.
+    Meant to be used from a single event loop.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int, queue_timeout: float):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self._semaphore = None
+        self._waiting = 0
+        self._active = 0
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so it binds to the running loop, not import time
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    @property
+    def waiting(self) -> int:
+        return self._waiting
+
+    @asynccontextmanager
+    async def admit(self):
+        semaphore = self._get_semaphore()
+
+        if semaphore.locked():
+            if self._waiting >= self.max_queue:
+                raise AdmissionRejected(429, "Too many validations queued, retry later", retry_after=5)
+
+            self._waiting += 1
+            try:
+                await asyncio.wait_for(semaphore.acquire(), timeout=self.queue_timeout)
+            except asyncio.TimeoutError:
+                raise AdmissionRejected(503, "Validation capacity exhausted, retry later", retry_after=10)
+            finally:
+                self._waiting -= 1
+        else:
+            await semaphore.acquire()
+
+        self._active += 1
+        try:
+            yield
+        finally:
+            self._active -= 1
+            semaphore.release()
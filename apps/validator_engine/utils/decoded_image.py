@@ -0,0 +1,330 @@
+import io
+import mmap
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple, Union
+
+import cv2
+import exifread
+import numpy as np
+from PIL import Image, ImageOps
+
+# Longest side (px) forensic metrics, ELA and hashing work at; 0 = full resolution
+ANALYSIS_MAX_SIDE = int(os.getenv("ANALYSIS_MAX_SIDE", "0"))
+
+_EXIF_ORIENTATION_TAG = 0x0112
+_ORIENTATION_TRANSPOSE = {
+    2: Image.FLIP_LEFT_RIGHT,
+    3: Image.ROTATE_180,
+    4: Image.FLIP_TOP_BOTTOM,
+    5: Image.TRANSPOSE,
+    6: Image.ROTATE_270,
+    7: Image.TRANSVERSE,
+    8: Image.ROTATE_90,
+}
+
+
+# Encoded object: bytes, a memoryview over a download buffer, or a mapped spill file
+Buffer = Union[bytes, memoryview, mmap.mmap]
+
+
+class ImageDecodeError(ValueError):
+    """
+    The object was read but is not a decodable image (corrupt, truncated,
+    unsupported format). Failures to fetch or open it are raised as is.
+    """
+
+
+class _BufferReader(io.RawIOBase):
+    """
+    Seekable read-only file over a bytes-like object. io.BytesIO copies
+    anything that is not bytes; this reads straight from the buffer.
+    """
+
+    def __init__(self, data: Buffer):
+        self._view = memoryview(data).cast("B")
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        n = min(len(b), len(self._view) - self._pos)
+        if n <= 0:
+            return 0
+        b[:n] = self._view[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = len(self._view) + offset
+        else:
+            raise ValueError(f"Invalid whence {whence}")
+        if pos < 0:
+            raise ValueError("Negative seek position")
+        self._pos = pos
+        return pos
+
+    def tell(self) -> int:
+        return self._pos
+
+
+def open_buffer(data: Buffer) -> io.BufferedIOBase:
+    """
+    Binary file object over data without copying it.
+    """
+    if isinstance(data, bytes):
+        # BytesIO shares a bytes object until written to
+        return io.BytesIO(data)
+    return io.BufferedReader(_BufferReader(data))
+
+
+def map_file(path: str) -> Buffer:
+    """
+    Read-only mapping of a spill file: pages come from the page cache on
+    demand instead of being read onto the heap.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class AnalysisView:
+    """
+    One level of the analysis pyramid.
+
+    rgb        PIL RGB image in stored orientation (ELA, hashing)
+    bgr, gray  OpenCV arrays with EXIF orientation applied (forensics)
+    scale      working size / true size, 1.0 at full resolution
+    """
+
+    def __init__(self, rgb: Image.Image, bgr: np.ndarray, scale: float):
+        self.rgb = rgb
+        self.bgr = bgr
+        self.scale = scale
+        self._gray: Optional[np.ndarray] = None
+
+    @property
+    def gray(self) -> np.ndarray:
+        if self._gray is None:
+            self._gray = cv2.cvtColor(self.bgr, cv2.COLOR_BGR2GRAY)
+        return self._gray
+
+
+class DecodedImage:
+    """
+    Decode-once view of a single image.
+
+    Each representation (PIL image, RGB copy, OpenCV BGR/gray arrays, EXIF
+    tags) is built on first access and memoized, so forensics, duplicate,
+    ELA and EXIF stages share one JPEG decode per media item.
+
+    analysis(max_side) returns a memoized downscaled level. For JPEGs it is
+    decoded directly at reduced scale (libjpeg DCT scaling) and never needs
+    the full-resolution pixels; size comes from the header.
+
+    Built from the encoded bytes, or from a path for spilled objects, which
+    are then read from the file by every decode instead of held in memory.
+    release_pixels() drops the memoized pixels (MediaCache does this to stay
+    within DECODED_MEMORY_MAX_MB); they are decoded again on next access.
+    """
+
+    def __init__(self, data: Optional[Buffer] = None, path: Optional[str] = None):
+        if data is None and path is None:
+            raise ValueError("DecodedImage needs data or a path")
+        self._data = data
+        self._path = path
+        self._lock = threading.RLock()
+        self._pil: Optional[Image.Image] = None
+        self._rgb: Optional[Image.Image] = None
+        self._bgr: Optional[np.ndarray] = None
+        self._gray: Optional[np.ndarray] = None
+        self._exif_tags: Optional[Dict] = None
+        self._header: Optional[Tuple[Tuple[int, int], int]] = None
+        self._levels: Dict[int, AnalysisView] = {}
+
+    @property
+    def data(self) -> Buffer:
+        """
+        Encoded object; a path-backed image is mapped, not read.
+        """
+        with self._lock:
+            if self._data is None:
+                self._data = map_file(self._path)
+            return self._data
+
+    @property
+    def nbytes(self) -> int:
+        if self._data is None:
+            return os.path.getsize(self._path)
+        return len(self._data)
+
+    def _open(self) -> io.BufferedIOBase:
+        if self._data is None:
+            return open(self._path, "rb")
+        return open_buffer(self._data)
+
+    @contextmanager
+    def _decoding(self):
+        # Opening is I/O; anything PIL raises while parsing means a bad image
+        with self._open() as f:
+            try:
+                yield f
+            except Exception as e:
+                raise ImageDecodeError(f"{type(e).__name__}: {str(e)}") from e
+
+    @property
+    def pil(self) -> Image.Image:
+        """
+        Fully loaded PIL image in its original mode and orientation.
+        """
+        with self._lock:
+            if self._pil is None:
+                with self._decoding() as f:
+                    img = Image.open(f)
+                    img.load()
+                self._pil = img
+            return self._pil
+
+    @property
+    def rgb(self) -> Image.Image:
+        """
+        PIL image converted to RGB (same as Image.open(...).convert("RGB")).
+        """
+        with self._lock:
+            if self._rgb is None:
+                pil = self.pil
+                self._rgb = pil if pil.mode == "RGB" else pil.convert("RGB")
+            return self._rgb
+
+    @property
+    def bgr(self) -> np.ndarray:
+        """
+        OpenCV-style BGR array. EXIF orientation is applied, matching what
+        cv2.imread returned for the same file.
+        """
+        with self._lock:
+            if self._bgr is None:
+                oriented = ImageOps.exif_transpose(self.pil).convert("RGB")
+                self._bgr = np.ascontiguousarray(np.asarray(oriented)[:, :, ::-1])
+            return self._bgr
+
+    @property
+    def gray(self) -> np.ndarray:
+        with self._lock:
+            if self._gray is None:
+                self._gray = cv2.cvtColor(self.bgr, cv2.COLOR_BGR2GRAY)
+            return self._gray
+
+    def _read_header(self) -> Tuple[Tuple[int, int], int]:
+        """
+        ((width, height) as stored, EXIF orientation) without decoding pixels.
+        """
+        with self._lock:
+            if self._header is None:
+                with self._decoding() as f:
+                    img = Image.open(f)
+                    try:
+                        orientation = int(img.getexif().get(_EXIF_ORIENTATION_TAG, 1))
+                    except Exception:
+                        orientation = 1
+                    self._header = (img.size, orientation)
+            return self._header
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        """
+        True (width, height) after EXIF orientation, read from the header.
+        """
+        (w, h), orientation = self._read_header()
+        if orientation in (5, 6, 7, 8):
+            return h, w
+        return w, h
+
+    def analysis(self, max_side: Optional[int] = None) -> AnalysisView:
+        """
+        Analysis level whose longest side is at most max_side (defaults to
+        ANALYSIS_MAX_SIDE). Falls back to full resolution when max_side is 0
+        or the image is already small enough.
+        """
+        max_side = ANALYSIS_MAX_SIDE if max_side is None else max_side
+        (w, h), orientation = self._read_header()
+
+        if not max_side or max(w, h) <= max_side:
+            max_side = 0
+
+        with self._lock:
+            view = self._levels.get(max_side)
+            if view is not None:
+                return view
+
+            if max_side == 0:
+                view = AnalysisView(self.rgb, self.bgr, 1.0)
+            else:
+                scale = max_side / float(max(w, h))
+                target = (max(1, round(w * scale)), max(1, round(h * scale)))
+
+                with self._decoding() as f:
+                    img = Image.open(f)
+                    # JPEG: let the decoder produce the smallest DCT scale >= target
+                    img.draft("RGB", target)
+                    img = img.convert("RGB")
+                if img.size != target:
+                    img = img.resize(target, Image.BILINEAR, reducing_gap=3.0)
+
+                transpose = _ORIENTATION_TRANSPOSE.get(orientation)
+                oriented = img.transpose(transpose) if transpose is not None else img
+                bgr = np.ascontiguousarray(np.asarray(oriented)[:, :, ::-1])
+                view = AnalysisView(img, bgr, scale)
+
+            self._levels[max_side] = view
+            return view
+
+    @property
+    def pixel_nbytes(self) -> int:
+        """
+        Approximate bytes held by memoized pixels, full resolution and
+        analysis levels. Read without the lock so it never waits on a decode.
+        """
+        images = [self._pil, self._rgb]
+        arrays = [self._bgr, self._gray]
+        for view in list(self._levels.values()):
+            images.append(view.rgb)
+            arrays.extend((view.bgr, view._gray))
+        # Levels can share the full-resolution objects; count each once
+        images = {id(i): i for i in images if i is not None}
+        arrays = {id(a): a for a in arrays if a is not None}
+        return (sum(i.width * i.height * len(i.getbands()) for i in images.values())
+                + sum(a.nbytes for a in arrays.values()))
+
+    def release_pixels(self) -> int:
+        """
+        Forget the memoized pixels, keeping the header, EXIF tags and encoded
+        object. Arrays a caller still holds stay valid. Returns bytes released.
+        """
+        with self._lock:
+            released = self.pixel_nbytes
+            self._pil = self._rgb = self._bgr = self._gray = None
+            self._levels.clear()
+            return released
+
+    @property
+    def exif_tags(self) -> Dict:
+        """
+        exifread tag dict (details=False), parsed from the encoded object.
+        """
+        with self._lock:
+            if self._exif_tags is None:
+                with self._open() as f:
+                    self._exif_tags = exifread.process_file(f, details=False)
+            return self._exif_tags
@@ -0,0 +1,51 @@
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Per-byte popcount table for NumPy builds without np.bitwise_count (< 2.0)
+_POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def pack_hex_hashes(hex_hashes: Iterable[str]) -> np.ndarray:
+    """
+    Pack 16-char hex pHashes into a uint64 array in one pass.
+    """
+    hex_hashes = list(hex_hashes)
+    if not hex_hashes:
+        return np.empty(0, dtype=np.uint64)
+    raw = bytes.fromhex("".join(h.zfill(16) for h in hex_hashes))
+    return np.frombuffer(raw, dtype=">u8").astype(np.uint64)
+
+
+def popcount64(values: np.ndarray) -> np.ndarray:
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(values)
+    as_bytes = values.view(np.uint8).reshape(-1, 8)
+    return _POPCOUNT_TABLE[as_bytes].sum(axis=1, dtype=np.uint8)
+
+
+def hamming_distances(query: int, corpus: np.ndarray) -> np.ndarray:
+    """
+    Hamming distance from a 64-bit query to every hash in a packed corpus.
+    """
+    return popcount64(np.bitwise_xor(corpus, np.uint64(query)))
+
+
+def hamming_topk(query: int, corpus: np.ndarray, max_distance: int,
+                 k: Optional[int] = None) -> List[Tuple[int, int]]:
+    """
+    (index, distance) of corpus entries within max_distance of query, closest
+    first (ties in corpus order), truncated to k when given.
+    """
+    if corpus.size == 0:
+        return []
+
+    distances = hamming_distances(query, corpus)
+    hits = np.flatnonzero(distances <= max_distance)
+    if hits.size == 0:
+        return []
+
+    order = np.argsort(distances[hits], kind="stable")
+    if k is not None:
+        order = order[:k]
+    return [(int(hits[i]), int(distances[hits[i]])) for i in order]
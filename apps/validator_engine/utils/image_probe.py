@@ -0,0 +1,201 @@
+import io
+import struct
+import threading
+from typing import Dict, Optional, Tuple
+
+import exifread
+
+_JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+_HEIF_BRANDS = {b"heic", b"heix", b"heim", b"heis", b"hevc", b"hevx", b"mif1", b"msf1", b"avif"}
+# ISOBMFF boxes that only hold other boxes on the path meta -> iprp -> ipco
+_HEIF_CONTAINERS = {b"meta", b"iprp", b"ipco"}
+
+
+def parse_header(data: bytes) -> Optional[Tuple[str, Tuple[int, int], int]]:
+    """
+    (format, (width, height) as stored, orientation) from the leading bytes of
+    a JPEG, PNG or HEIC/AVIF file, or None when the header is not recognised
+    or lies beyond `data`.
+
+    Orientation is the EXIF value (1-8) for JPEG; for HEIF the irot rotation
+    is mapped onto the equivalent EXIF value. PNG is always 1.
+    """
+    try:
+        if data[:2] == b"\xff\xd8":
+            return _parse_jpeg(data)
+        if data[:8] == b"\x89PNG\r\n\x1a\n":
+            return _parse_png(data)
+        if data[4:8] == b"ftyp" and data[8:12] in _HEIF_BRANDS:
+            return _parse_heif(data)
+    except (struct.error, IndexError, ValueError):
+        return None
+    return None
+
+
+def _parse_png(data: bytes):
+    # IHDR is always the first chunk
+    if data[12:16] != b"IHDR":
+        return None
+    width, height = struct.unpack(">II", data[16:24])
+    return "PNG", (width, height), 1
+
+
+def _parse_jpeg(data: bytes):
+    orientation = 1
+    pos = 2
+    while pos + 4 <= len(data):
+        if data[pos] != 0xFF:
+            return None
+        marker = data[pos + 1]
+        if marker == 0xFF:  # fill byte
+            pos += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            pos += 2
+            continue
+        if marker == 0xDA:  # start of scan before any SOF
+            return None
+
+        (length,) = struct.unpack(">H", data[pos + 2:pos + 4])
+        segment = data[pos + 4:pos + 2 + length]
+
+        if marker == 0xE1 and segment[:6] == b"Exif\x00\x00":
+            orientation = _tiff_orientation(segment[6:]) or orientation
+        elif marker in _JPEG_SOF_MARKERS:
+            if len(segment) < 5:
+                return None
+            height, width = struct.unpack(">HH", segment[1:5])
+            return "JPEG", (width, height), orientation
+
+        pos += 2 + length
+    return None
+
+
+def _tiff_orientation(tiff: bytes) -> Optional[int]:
+    """
+    Orientation tag (0x0112) from IFD0 of a TIFF/EXIF block.
+    """
+    if tiff[:2] == b"II":
+        endian = "<"
+    elif tiff[:2] == b"MM":
+        endian = ">"
+    else:
+        return None
+    (ifd_offset,) = struct.unpack(endian + "I", tiff[4:8])
+    (count,) = struct.unpack(endian + "H", tiff[ifd_offset:ifd_offset + 2])
+    for i in range(count):
+        entry = ifd_offset + 2 + i * 12
+        tag, _, _, value = struct.unpack(endian + "HHIH", tiff[entry:entry + 10])
+        if tag == 0x0112:
+            return value if 1 <= value <= 8 else None
+    return None
+
+
+def _iter_boxes(data: bytes, start: int, end: int):
+    pos = start
+    while pos + 8 <= end:
+        size, box_type = struct.unpack(">I4s", data[pos:pos + 8])
+        header = 8
+        if size == 1:
+            (size,) = struct.unpack(">Q", data[pos + 8:pos + 16])
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header:
+            return
+        yield box_type, pos + header, min(pos + size, end)
+        pos += size
+
+
+def _parse_heif(data: bytes):
+    sizes = []
+    rotation = 0
+
+    def walk(start, end):
+        nonlocal rotation
+        for box_type, body, box_end in _iter_boxes(data, start, end):
+            if box_type == b"meta":
+                walk(body + 4, box_end)  # full box: skip version/flags
+            elif box_type in _HEIF_CONTAINERS:
+                walk(body, box_end)
+            elif box_type == b"ispe" and box_end - body >= 12:
+                sizes.append(struct.unpack(">II", data[body + 4:body + 12]))
+            elif box_type == b"irot" and box_end > body:
+                rotation = data[body] & 0x03
+
+    walk(0, len(data))
+    if not sizes:
+        return None
+    # The primary image is the largest; smaller ispe entries are thumbnails/tiles
+    width, height = max(sizes, key=lambda s: s[0] * s[1])
+    # irot is counter-clockwise; 90/270 swap the axes like EXIF 8/6
+    orientation = {0: 1, 1: 8, 2: 3, 3: 6}[rotation]
+    return "HEIF", (width, height), orientation
+
+
+class MediaProbe:
+    """
+    Metadata view built from the first bytes of an object (see
+    MediaCache.get_probe). Exposes the same size / exif_tags interface as
+    DecodedImage so metadata-only checks work with either.
+
+    complete is True when `data` holds the whole object; exif_error is set
+    once EXIF parsing of the probed bytes has failed.
+    """
+
+    def __init__(self, data: bytes, total_size: Optional[int] = None):
+        self._data = data
+        self.total_size = total_size
+        self.complete = total_size is not None and total_size <= len(data)
+        self._lock = threading.Lock()
+        self._exif_tags: Optional[Dict] = None
+        self.exif_error: Optional[str] = None
+        header = parse_header(data)
+        self.format = header[0] if header else None
+        self._header = header
+
+    @property
+    def data(self) -> bytes:
+        return self._data
+
+    @property
+    def size(self) -> Optional[Tuple[int, int]]:
+        """
+        True (width, height) after orientation, or None if the header
+        could not be parsed from the probed bytes.
+        """
+        if self._header is None:
+            return None
+        _, (w, h), orientation = self._header
+        if orientation in (5, 6, 7, 8):
+            return h, w
+        return w, h
+
+    @property
+    def exif_tags(self) -> Dict:
+        """
+        exifread tag dict (details=False) parsed from the probed bytes.
+        """
+        with self._lock:
+            if self._exif_tags is None:
+                try:
+                    self._exif_tags = exifread.process_file(io.BytesIO(self._data), details=False)
+                except Exception as e:
+                    # Usually EXIF running past the probe window; see exif_reliable
+                    self._exif_tags = {}
+                    self.exif_error = str(e) or type(e).__name__
+            return self._exif_tags
+
+    @property
+    def exif_reliable(self) -> bool:
+        """
+        Whether exif_tags can be trusted to be complete. JPEG EXIF lives in
+        APP1 right after SOI (max 64 KB) and is always inside a probe of that
+        size; for other formats it may sit anywhere in the file. Parses the
+        tags, and is False when that failed, since an empty dict would
+        otherwise read as "no EXIF".
+        """
+        if not (self.complete or self.format == "JPEG"):
+            return False
+        self.exif_tags  # parse once so a failure is known
+        return self.exif_error is None
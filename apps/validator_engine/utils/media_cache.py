@@ -0,0 +1,326 @@
+import hashlib
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from utils.decoded_image import Buffer, DecodedImage, map_file
+from utils.image_probe import MediaProbe
+from utils.s3_utils import download_media, fetch_etag, fetch_range
+from utils.temp_utils import make_temp_path, safe_remove
+
+# Objects up to this size stay in memory; larger ones spill to MEDIA_SPILL_DIR
+MEDIA_MEMORY_MAX_MB = int(os.getenv("MEDIA_MEMORY_MAX_MB", "32"))
+# Decoded pixels kept per cache (a 12 MP photo is ~80 MB across its
+# representations); least recently requested images are released past it. 0 = no limit
+DECODED_MEMORY_MAX_MB = int(os.getenv("DECODED_MEMORY_MAX_MB", "256"))
+# Bytes fetched by a header probe; covers JPEG APP1 (EXIF, max 64 KB) plus SOF
+PROBE_BYTES = int(os.getenv("PROBE_BYTES", str(128 * 1024)))
+# Start all of a submission's downloads before the stages run. Turn off when
+# most validations are answered from the result cache.
+MEDIA_PREFETCH = os.getenv("MEDIA_PREFETCH", "true").lower() == "true"
+# Concurrent object downloads across all submissions in this process
+MEDIA_DOWNLOAD_WORKERS = int(os.getenv("MEDIA_DOWNLOAD_WORKERS", "16"))
+
+_download_executor = ThreadPoolExecutor(
+    max_workers=MEDIA_DOWNLOAD_WORKERS,
+    thread_name_prefix="media-download"
+)
+
+
+class MediaCache:
+    """
+    Submission-scoped download cache.
+
+    Each fileKey is fetched from S3 at most once per validation run; every
+    service asks the cache for the raw bytes (or, if it really needs one, a
+    local path) instead of downloading itself. Objects up to
+    MEDIA_MEMORY_MAX_MB are held in memory and never touch the filesystem;
+    larger ones spill to the managed temp directory and are only ever read
+    from there (mapped or opened by path), never held on the heap. get_image()
+    additionally shares one DecodedImage per fileKey, releasing the pixels of
+    other images once decoded pixels pass DECODED_MEMORY_MAX_MB. close()
+    removes any spilled files.
+
+    Metadata-only checks use get_size() / get_exif_tags(), which answer from
+    a ranged GET of the first PROBE_BYTES when probing is enabled and fall
+    back to the full object when the header does not fit. Pass probe=False
+    when a pixel-level stage will download everything anyway, so the same
+    object is not requested twice.
+    """
+
+    def __init__(self, probe: bool = True):
+        self.probe = probe
+        self._paths: Dict[str, str] = {}
+        self._bytes: Dict[str, Buffer] = {}
+        self._probes: Dict[str, Optional[MediaProbe]] = {}
+        self._digests: Dict[str, str] = {}
+        # Least recently requested first
+        self._images: "OrderedDict[str, DecodedImage]" = OrderedDict()
+        self._errors: Dict[str, Exception] = {}
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _lock_for(self, file_key: str) -> threading.Lock:
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("MediaCache is closed")
+            lock = self._key_locks.get(file_key)
+            if lock is None:
+                lock = threading.Lock()
+                self._key_locks[file_key] = lock
+            return lock
+
+    def _ensure(self, file_key: str):
+        """
+        Download the object on first access only, into memory or a spill
+        file; a failed download is remembered and re-raised for later callers.
+        Must be called with the key's lock held.
+        """
+        if file_key in self._bytes or file_key in self._paths:
+            return
+        if file_key in self._errors:
+            raise self._errors[file_key]
+
+        try:
+            data, local_path = download_media(file_key, MEDIA_MEMORY_MAX_MB * 1024 * 1024)
+        except Exception as e:
+            self._errors[file_key] = e
+            raise
+
+        if data is not None:
+            self._bytes[file_key] = data
+        else:
+            self._paths[file_key] = local_path
+
+    def get_path(self, file_key: str) -> str:
+        """
+        Local path of the object, for consumers that can only read files.
+        In-memory objects are written to the spill directory on demand.
+        """
+        with self._lock_for(file_key):
+            self._ensure(file_key)
+            path = self._paths.get(file_key)
+            if path is None:
+                path = make_temp_path(os.path.basename(file_key.split("?")[0]) or "file")
+                with open(path, "wb") as f:
+                    f.write(self._bytes[file_key])
+                self._paths[file_key] = path
+            return path
+
+    def prefetch(self, file_keys: Iterable[str]) -> List[Future]:
+        """
+        Start downloading every key concurrently and return immediately.
+        Stages calling get_path/get_bytes later wait on the same per-key
+        lock, so each object is still fetched once; failures are remembered
+        and surface in the stage that needs the object.
+        """
+        futures = []
+        for file_key in dict.fromkeys(file_keys):
+            futures.append(_download_executor.submit(self._prefetch_one, file_key))
+        return futures
+
+    def _prefetch_one(self, file_key: str):
+        try:
+            with self._lock_for(file_key):
+                self._ensure(file_key)
+        except Exception:
+            pass
+
+    def get_bytes(self, file_key: str) -> Buffer:
+        """
+        Raw object as a bytes-like buffer. Spilled objects come back as a
+        read-only mapping of the spill file and are not cached in memory.
+        """
+        with self._lock_for(file_key):
+            self._ensure(file_key)
+            data = self._bytes.get(file_key)
+            if data is not None:
+                return data
+            path = self._paths[file_key]
+        return map_file(path)
+
+    def get_image(self, file_key: str) -> DecodedImage:
+        """
+        Shared DecodedImage for the object; decoding itself stays lazy.
+        Spilled objects are decoded from their file.
+        """
+        with self._lock_for(file_key):
+            image = self._images.get(file_key)
+            if image is None:
+                self._ensure(file_key)
+                data = self._bytes.get(file_key)
+                image = DecodedImage(data) if data is not None else DecodedImage(path=self._paths[file_key])
+                with self._lock:
+                    self._images[file_key] = image
+        self._trim_decoded(file_key)
+        return image
+
+    def _trim_decoded(self, file_key: str):
+        """
+        Mark file_key as most recently requested and release the pixels of
+        the least recently requested other images until the decoded total is
+        within DECODED_MEMORY_MAX_MB. A released image decodes again if a
+        later stage asks for its pixels.
+        """
+        with self._lock:
+            if file_key in self._images:
+                self._images.move_to_end(file_key)
+            others = [image for key, image in self._images.items() if key != file_key]
+            current = self._images.get(file_key)
+        if not DECODED_MEMORY_MAX_MB:
+            return
+
+        budget = DECODED_MEMORY_MAX_MB * 1024 * 1024
+        sizes = [image.pixel_nbytes for image in others]
+        total = sum(sizes) + (current.pixel_nbytes if current is not None else 0)
+        released = 0
+        for image, size in zip(others, sizes):
+            if total <= budget:
+                break
+            if size:
+                total -= size
+                image.release_pixels()
+                released += 1
+        if released:
+            print(f"[MEDIA] Released decoded pixels of {released} image(s) to stay within {DECODED_MEMORY_MAX_MB} MB")
+
+    def get_probe(self, file_key: str) -> Optional[MediaProbe]:
+        """
+        Header probe of the object, or None when probing is disabled, the
+        full object is already cached, or the ranged GET failed. A probe that
+        turns out to cover the whole object also fills the bytes cache.
+        """
+        if not self.probe:
+            return None
+        with self._lock_for(file_key):
+            if file_key in self._probes:
+                return self._probes[file_key]
+            if file_key in self._bytes or file_key in self._paths:
+                return None
+
+            try:
+                data, total_size = fetch_range(file_key, PROBE_BYTES)
+                probe = MediaProbe(data, total_size)
+            except Exception as e:
+                print(f"[WARNING] Header probe failed for {file_key}, using full download: {str(e)}")
+                probe = None
+
+            if probe is not None and probe.complete:
+                self._bytes[file_key] = data
+            self._probes[file_key] = probe
+            return probe
+
+    def get_size(self, file_key: str) -> Tuple[int, int]:
+        """
+        Oriented (width, height), from the header probe when possible.
+        """
+        probe = self.get_probe(file_key)
+        if probe is not None and probe.size is not None:
+            return probe.size
+        return self.get_image(file_key).size
+
+    def get_exif_tags(self, file_key: str) -> Dict:
+        """
+        exifread tags, from the header probe when it is known to hold them
+        and parsed cleanly, else from the full download.
+        """
+        probe = self.get_probe(file_key)
+        if probe is not None:
+            if probe.exif_reliable:
+                return probe.exif_tags
+            if probe.exif_error:
+                print(f"[WARNING] EXIF parse of header probe failed for {file_key}, "
+                      f"using full download: {probe.exif_error}")
+        return self.get_image(file_key).exif_tags
+
+    def get_digest(self, file_key: str) -> str:
+        """
+        Content identity for the result cache: "etag:<bucket>:<ETag>" for S3
+        objects (no download needed), else "sha256:<hex>" of the bytes.
+        Other HTTP servers' ETags are not content hashes, so they are not used.
+        """
+        with self._lock_for(file_key):
+            digest = self._digests.get(file_key)
+        if digest is not None:
+            return digest
+
+        try:
+            etag = fetch_etag(file_key)
+        except Exception as e:
+            print(f"[WARNING] ETag lookup failed for {file_key}: {str(e)}")
+            etag = None
+
+        if etag:
+            origin, tag = etag
+            digest = f"etag:{origin}:{tag}"
+        else:
+            digest = "sha256:" + hashlib.sha256(self.get_bytes(file_key)).hexdigest()
+
+        with self._lock_for(file_key):
+            self._digests[file_key] = digest
+        return digest
+
+    def evict(self, file_key: str):
+        """
+        Forget one object and delete its temp file. Used by long-lived shared
+        caches (batch validation) once no pending submission needs the key.
+        """
+        with self._lock:
+            if self._closed:
+                return
+        with self._lock_for(file_key):
+            path = self._paths.pop(file_key, None)
+            self._bytes.pop(file_key, None)
+            self._probes.pop(file_key, None)
+            self._digests.pop(file_key, None)
+            self._errors.pop(file_key, None)
+        with self._lock:
+            self._images.pop(file_key, None)
+            self._key_locks.pop(file_key, None)
+
+        if path:
+            safe_remove(path)
+
+    def close(self):
+        """
+        Remove every spill file written during this run.
+        """
+        with self._lock:
+            self._closed = True
+            paths = list(self._paths.values())
+            self._paths.clear()
+            self._bytes.clear()
+            self._probes.clear()
+            self._digests.clear()
+            self._images.clear()
+            self._errors.clear()
+
+        for path in paths:
+            safe_remove(path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+@contextmanager
+def use_media_cache(media_cache: Optional[MediaCache] = None):
+    """
+    Yield the caller's cache, or a private one that is closed on exit.
+    Lets services keep working when called outside validate_submission_engine.
+    """
+    if media_cache is not None:
+        yield media_cache
+        return
+
+    cache = MediaCache()
+    try:
+        yield cache
+    finally:
+        cache.close()
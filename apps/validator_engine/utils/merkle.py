@@ -0,0 +1,59 @@
+import hashlib
+from typing import Dict, List
+
+# Domain separation so a leaf can never be passed off as an inner node
+_LEAF_PREFIX = b"\x00"
+_NODE_PREFIX = b"\x01"
+
+
+def leaf_hash(data: str) -> str:
+    return hashlib.sha256(_LEAF_PREFIX + data.encode()).hexdigest()
+
+
+def node_hash(left: str, right: str) -> str:
+    return hashlib.sha256(_NODE_PREFIX + bytes.fromhex(left) + bytes.fromhex(right)).hexdigest()
+
+
+def _next_level(level: List[str]) -> List[str]:
+    parents = [node_hash(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+    if len(level) % 2:
+        # An odd node is carried up unchanged rather than paired with itself
+        parents.append(level[-1])
+    return parents
+
+
+def merkle_root(leaves: List[str]) -> str:
+    """
+    Root over hex leaf hashes (sha256 of nothing for an empty tree).
+    """
+    if not leaves:
+        return hashlib.sha256(b"").hexdigest()
+    level = list(leaves)
+    while len(level) > 1:
+        level = _next_level(level)
+    return level[0]
+
+
+def merkle_proof(leaves: List[str], index: int) -> List[Dict]:
+    """
+    Audit path for leaves[index], bottom-up: [{"side": "left"|"right", "hash"}].
+    """
+    proof = []
+    level = list(leaves)
+    while len(level) > 1:
+        sibling = index ^ 1
+        if sibling < len(level):
+            proof.append({"side": "left" if sibling < index else "right", "hash": level[sibling]})
+        level = _next_level(level)
+        index //= 2
+    return proof
+
+
+def verify_proof(leaf: str, proof: List[Dict], root: str) -> bool:
+    current = leaf
+    for step in proof:
+        if step["side"] == "left":
+            current = node_hash(step["hash"], current)
+        else:
+            current = node_hash(current, step["hash"])
+    return current == root
@@ -0,0 +1,17 @@
+import os
+import redis
+from dotenv import load_dotenv
+
+load_dotenv()
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "32"))
+
+# One connection pool per process, shared by the duplicate store and job queue
+_pool = redis.ConnectionPool.from_url(
+    REDIS_URL,
+    decode_responses=True,
+    max_connections=REDIS_MAX_CONNECTIONS
+)
+
+redis_client = redis.Redis(connection_pool=_pool)
@@ -0,0 +1,187 @@
+"""
+Content-addressed cache for per-media stage outputs.
+
+Keys are derived from (media digest, stage name, stage config), where the
+digest is the object's S3 ETag or SHA-256 (MediaCache.get_digest) and the
+config holds only the parameters that change the stage's raw output. Rule
+thresholds are applied after the lookup, so retries and rule tweaks reuse
+paid Rekognition calls, OCR passes and pixel metrics.
+
+Two tiers:
+- in-process LRU bounded by RESULT_CACHE_MEMORY_MB
+- Redis, entries expire after RESULT_CACHE_TTL seconds; the oldest writes
+  are evicted once the tracked total exceeds RESULT_CACHE_REDIS_MB
+
+Redis layout:
+    stage_cache:entry:{sha256}   JSON value (SET ... EX ttl)
+    stage_cache:lru              ZSET entry key -> last write time
+    stage_cache:sizes            HASH entry key -> bytes
+    stage_cache:bytes            tracked total bytes
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from utils.redis_client import redis_client
+
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "true").lower() == "true"
+RESULT_CACHE_MEMORY_MB = int(os.getenv("RESULT_CACHE_MEMORY_MB", "64"))
+RESULT_CACHE_REDIS_MB = int(os.getenv("RESULT_CACHE_REDIS_MB", "256"))
+RESULT_CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL", str(7 * 24 * 3600)))
+RESULT_CACHE_MAX_ENTRY_KB = int(os.getenv("RESULT_CACHE_MAX_ENTRY_KB", "256"))
+
+ENTRY_PREFIX = "stage_cache:entry:"
+LRU_KEY = "stage_cache:lru"
+SIZES_KEY = "stage_cache:sizes"
+BYTES_KEY = "stage_cache:bytes"
+
+_EVICT_BATCH = 100
+
+
+def stage_key(stage: str, digest: str, config: Optional[Dict] = None, version: int = 1) -> str:
+    """
+    Cache key for one stage output on one piece of media. Bump version when
+    the stage's computation changes so old entries stop matching.
+    """
+    material = json.dumps(
+        {"stage": stage, "version": version, "digest": digest, "config": config or {}},
+        sort_keys=True, separators=(",", ":"), default=str
+    )
+    return ENTRY_PREFIX + hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    Two-tier (memory LRU + Redis) JSON value cache. Redis failures are
+    logged and the cache degrades to the memory tier.
+    """
+
+    def __init__(self, client=redis_client, enabled: bool = RESULT_CACHE_ENABLED,
+                 memory_bytes: int = RESULT_CACHE_MEMORY_MB * 1024 * 1024,
+                 redis_bytes: int = RESULT_CACHE_REDIS_MB * 1024 * 1024,
+                 ttl: int = RESULT_CACHE_TTL,
+                 max_entry_bytes: int = RESULT_CACHE_MAX_ENTRY_KB * 1024):
+        self.client = client
+        self.enabled = enabled
+        self.memory_bytes = memory_bytes
+        self.redis_bytes = redis_bytes
+        self.ttl = ttl
+        self.max_entry_bytes = max_entry_bytes
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._memory_used = 0
+        self._lock = threading.Lock()
+
+    def _memory_get(self, key: str) -> Optional[str]:
+        with self._lock:
+            raw = self._memory.get(key)
+            if raw is not None:
+                self._memory.move_to_end(key)
+            return raw
+
+    def _memory_put(self, key: str, raw: str):
+        size = len(raw)
+        if size > self.memory_bytes:
+            return
+        with self._lock:
+            old = self._memory.pop(key, None)
+            if old is not None:
+                self._memory_used -= len(old)
+            self._memory[key] = raw
+            self._memory_used += size
+            while self._memory_used > self.memory_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_used -= len(evicted)
+
+    def get(self, key: str) -> Optional[Any]:
+        if not self.enabled:
+            return None
+
+        raw = self._memory_get(key)
+        if raw is None:
+            try:
+                raw = self.client.get(key)
+            except Exception as e:
+                print(f"[CACHE WARNING] Redis read failed: {str(e)}")
+                raw = None
+            if raw is None:
+                return None
+            self._memory_put(key, raw)
+
+        return json.loads(raw)
+
+    def set(self, key: str, value: Any):
+        if not self.enabled or value is None:
+            return
+
+        raw = json.dumps(value, separators=(",", ":"), default=str)
+        size = len(raw)
+        if size > self.max_entry_bytes:
+            return
+        self._memory_put(key, raw)
+
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            pipe.set(key, raw, ex=self.ttl)
+            pipe.zadd(LRU_KEY, {key: time.time()})
+            pipe.hget(SIZES_KEY, key)
+            pipe.hset(SIZES_KEY, key, size)
+            results = pipe.execute()
+
+            previous = int(results[2] or 0)
+            total = self.client.incrby(BYTES_KEY, size - previous)
+            if total > self.redis_bytes:
+                self._evict(total)
+        except Exception as e:
+            print(f"[CACHE WARNING] Redis write failed: {str(e)}")
+
+    def _evict(self, total: int):
+        """
+        Drop the oldest writes until the tracked total is 10% under budget.
+        Entries that already expired are still tracked and, being oldest,
+        go first, which corrects the counter.
+        """
+        target = int(self.redis_bytes * 0.9)
+        while total > target:
+            oldest = self.client.zrange(LRU_KEY, 0, _EVICT_BATCH - 1)
+            if not oldest:
+                self.client.set(BYTES_KEY, 0)
+                return
+
+            keys, freed = [], 0
+            for key, size in zip(oldest, self.client.hmget(SIZES_KEY, oldest)):
+                keys.append(key)
+                freed += int(size or 0)
+                if total - freed <= target:
+                    break
+
+            pipe = self.client.pipeline(transaction=False)
+            pipe.delete(*keys)
+            pipe.zrem(LRU_KEY, *keys)
+            pipe.hdel(SIZES_KEY, *keys)
+            pipe.decrby(BYTES_KEY, freed)
+            total = pipe.execute()[-1]
+            print(f"[CACHE] Evicted {len(keys)} stage results ({freed} bytes)")
+
+    def get_or_compute(self, stage: str, digest: str, config: Optional[Dict],
+                       compute: Callable[[], Any], version: int = 1) -> Any:
+        """
+        Cached value for (stage, digest, config), computing and storing it on
+        a miss. compute() must return JSON-serialisable data; None results
+        and exceptions are not cached.
+        """
+        key = stage_key(stage, digest, config, version)
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+
+        value = compute()
+        self.set(key, value)
+        return value
+
+
+result_cache = ResultCache()
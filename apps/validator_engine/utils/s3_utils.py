@@ -1,85 +1,77 @@
 import os
-import uuid
+from concurrent.futures import ThreadPoolExecutor
 import boto3
 import requests
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from requests.adapters import HTTPAdapter
+from typing import List, Optional, Tuple, Union
 from urllib.parse import urlparse
 from dotenv import load_dotenv
+from utils.temp_utils import make_temp_path, safe_remove
 
 # Load environment variables
 load_dotenv()
 
 AWS_REGION = os.getenv("AWS_REGION", "ap-south-1")
 AWS_S3_BUCKET = os.getenv("AWS_S3_BUCKET")  # optional if using URL-only flow
+# Point at a local S3 stand-in (moto server, MinIO) for testing
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL") or None
+
+S3_MAX_POOL_CONNECTIONS = int(os.getenv("S3_MAX_POOL_CONNECTIONS", "64"))
+# Objects larger than one chunk are fetched as parallel ranged GETs
+S3_MULTIPART_CHUNK_MB = int(os.getenv("S3_MULTIPART_CHUNK_MB", "8"))
+S3_TRANSFER_CONCURRENCY = int(os.getenv("S3_TRANSFER_CONCURRENCY", "8"))
 
 s3_client = boto3.client(
     "s3",
     region_name=AWS_REGION,
+    endpoint_url=S3_ENDPOINT_URL,
     aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
     aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
+    config=Config(
+        max_pool_connections=S3_MAX_POOL_CONNECTIONS,
+        retries={"max_attempts": 5, "mode": "adaptive"}
+    )
 )
 
+# Presigned / plain HTTP downloads reuse keep-alive connections
+_http = requests.Session()
+_http.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=S3_MAX_POOL_CONNECTIONS))
+_http.mount("http://", HTTPAdapter(pool_connections=16, pool_maxsize=S3_MAX_POOL_CONNECTIONS))
 
-def _make_temp_path(original_name: str) -> str:
-    import tempfile
-    temp_dir = os.path.join(tempfile.gettempdir(), "validation_engine")
-    os.makedirs(temp_dir, exist_ok=True)
-    filename = f"{uuid.uuid4()}_{original_name}"
-    return os.path.join(temp_dir, filename)
+# Ranged parts of large downloads
+_range_executor = ThreadPoolExecutor(max_workers=S3_TRANSFER_CONCURRENCY, thread_name_prefix="s3-range")
 
 
-def download_from_s3_to_temp(file_key_or_url: str) -> str:
+def _resolve_source(file_key_or_url: str) -> Tuple[str, str, Optional[str], str]:
     """
-    Unified downloader:
-
-    - If file_key_or_url starts with http/https -> parse S3 bucket and key from URL, download via boto3.
-    - Otherwise -> treat as S3 key in AWS_S3_BUCKET and download via boto3.
+    Work out where an object lives.
 
-    Returns local file path. Caller is responsible for deleting it (using safe_remove).
+    Returns (kind, location, key, original_name):
+    - ("http", url, None, name) for presigned or non-S3 URLs, fetched over HTTP
+    - ("s3", bucket, key, name) for S3 URLs and plain keys, fetched via boto3
     """
 
     # Case 1: full URL (S3 URL)
     if file_key_or_url.startswith("http://") or file_key_or_url.startswith("https://"):
         parsed = urlparse(file_key_or_url.split("?")[0])  # strip query
         original_name = os.path.basename(parsed.path) or "file"
-        local_path = _make_temp_path(original_name)
 
         # Check if it's a presigned URL (has query parameters with AWS signature)
-        if "?" in file_key_or_url and ("X-Amz-" in file_key_or_url or "AWSAccessKeyId" in file_key_or_url):
+        if _is_presigned(file_key_or_url):
             # This is a presigned URL, use direct HTTP download
-            resp = requests.get(file_key_or_url, stream=True, timeout=20)
-            resp.raise_for_status()
-            with open(local_path, "wb") as f:
-                for chunk in resp.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
-        else:
-            # This is a direct S3 URL, extract bucket and key and use boto3
-            if "s3.amazonaws.com" in parsed.netloc or "s3." in parsed.netloc:
-                # Extract bucket and key from URL
-                if parsed.netloc.endswith(".s3.amazonaws.com") or parsed.netloc.endswith(".s3.ap-south-1.amazonaws.com"):
-                    # Virtual-hosted-style URL: https://bucket.s3.region.amazonaws.com/key
-                    bucket_name = parsed.netloc.split('.')[0]
-                    key = parsed.path.lstrip('/')
-                else:
-                    # Path-style URL: https://s3.region.amazonaws.com/bucket/key
-                    path_parts = parsed.path.strip('/').split('/', 1)
-                    if len(path_parts) < 2:
-                        raise ValueError(f"Invalid S3 URL format: {file_key_or_url}")
-                    bucket_name = path_parts[0]
-                    key = path_parts[1]
-                
-                # Use boto3 to download with credentials
-                s3_client.download_file(bucket_name, key, local_path)
-            else:
-                # Not an S3 URL, try direct HTTP download
-                resp = requests.get(file_key_or_url, stream=True, timeout=20)
-                resp.raise_for_status()
-                with open(local_path, "wb") as f:
-                    for chunk in resp.iter_content(chunk_size=8192):
-                        if chunk:
-                            f.write(chunk)
-
-        return local_path
+            return "http", file_key_or_url, None, original_name
+
+        # This is a direct S3 URL, extract bucket and key and use boto3
+        if _is_s3_host(parsed.netloc):
+            bucket_name, key = _s3_bucket_and_key(parsed)
+            if not key:
+                raise ValueError(f"Invalid S3 URL format: {file_key_or_url}")
+            return "s3", bucket_name, key, original_name
+
+        # Not an S3 URL, try direct HTTP download
+        return "http", file_key_or_url, None, original_name
 
     # Case 2: plain S3 key (old behavior)
     if not AWS_S3_BUCKET:
@@ -89,12 +81,232 @@ def download_from_s3_to_temp(file_key_or_url: str) -> str:
         )
 
     original_name = os.path.basename(file_key_or_url).replace("/", "_") or "file"
-    local_path = _make_temp_path(original_name)
+    return "s3", AWS_S3_BUCKET, file_key_or_url, original_name
+
+
+def _is_s3_host(netloc: str) -> bool:
+    return "s3.amazonaws.com" in netloc or "s3." in netloc
+
+
+def _is_presigned(url: str) -> bool:
+    return "?" in url and ("X-Amz-" in url or "AWSAccessKeyId" in url)
+
+
+def _s3_bucket_and_key(parsed) -> Tuple[str, str]:
+    """
+    (bucket, key) of a parsed S3 URL; key is "" when the path has none.
+    """
+    if parsed.netloc.endswith(".s3.amazonaws.com") or parsed.netloc.endswith(".s3.ap-south-1.amazonaws.com"):
+        # Virtual-hosted-style URL: https://bucket.s3.region.amazonaws.com/key
+        return parsed.netloc.split('.')[0], parsed.path.lstrip('/')
+    # Path-style URL: https://s3.region.amazonaws.com/bucket/key
+    path_parts = parsed.path.strip('/').split('/', 1)
+    return path_parts[0], path_parts[1] if len(path_parts) > 1 else ""
+
+
+def download_media(file_key_or_url: str,
+                   memory_limit: int) -> Tuple[Optional[Union[bytes, memoryview]], Optional[str]]:
+    """
+    Download an object into memory when it is at most memory_limit bytes,
+    otherwise into the managed spill directory.
+
+    Returns (data, None) or (None, local_path); data is bytes, or a
+    read-only memoryview over the assembled buffer (never copied, so the
+    object is held once). The object is read with
+    ranged GETs of S3_MULTIPART_CHUNK_MB: the first part reports the total
+    size, the rest are fetched concurrently straight into the target buffer
+    or file, so small objects cost a single request. An HTTP server that
+    ignores Range is read once, streamed past memory_limit into the file.
+    """
+    kind, location, key, original_name = _resolve_source(file_key_or_url)
+    part_size = S3_MULTIPART_CHUNK_MB * 1024 * 1024
 
     try:
-        print(f"[DEBUG] Attempting to download from S3: bucket={AWS_S3_BUCKET}, key={file_key_or_url}")
-        s3_client.download_file(AWS_S3_BUCKET, file_key_or_url, local_path)
-        return local_path
+        first, total = _read_range(kind, location, key, 0, part_size - 1)
+
+        if total is None:
+            # Range was ignored and the object is larger than one part
+            return _download_unranged(location, memory_limit, original_name)
+
+        # The first response already held the whole object
+        if len(first) >= total:
+            if len(first) <= memory_limit:
+                return first, None
+            local_path = make_temp_path(original_name)
+            with open(local_path, "wb") as f:
+                f.write(first)
+            return None, local_path
+
+        ranges = [(start, min(start + part_size, total) - 1) for start in range(len(first), total, part_size)]
+
+        if total <= memory_limit:
+            buffer = bytearray(total)
+            view = memoryview(buffer)
+            view[:len(first)] = first
+
+            def fill(start, end):
+                data, _ = _read_range(kind, location, key, start, end)
+                _check_part(data, start, end)
+                view[start:end + 1] = data
+
+            _run_parts(fill, ranges)
+            return view.toreadonly(), None
+
+        local_path = make_temp_path(original_name)
+        try:
+            with open(local_path, "wb") as f:
+                f.write(first)
+                f.truncate(total)
+
+            def fill(start, end):
+                data, _ = _read_range(kind, location, key, start, end)
+                _check_part(data, start, end)
+                with open(local_path, "r+b") as f:
+                    f.seek(start)
+                    f.write(data)
+
+            _run_parts(fill, ranges)
+        except Exception:
+            safe_remove(local_path)
+            raise
+        return None, local_path
+
     except Exception as e:
-        print(f"[ERROR] Failed to download from S3: bucket={AWS_S3_BUCKET}, key={file_key_or_url}, error={str(e)}")
+        print(f"[ERROR] Failed to download {kind}: location={location}, key={key}, error={str(e)}")
         raise
+
+
+def _read_range(kind: str, location: str, key: Optional[str],
+                start: int, end: int) -> Tuple[bytes, Optional[int]]:
+    """
+    Bytes start..end (inclusive) and the object's total size. A zero-byte
+    object has no satisfiable range and comes back as (b"", 0). When an HTTP
+    server ignores Range on the first part, at most end + 1 bytes are read
+    from the body: if it ended there that is the whole object, otherwise
+    total is None and the caller must fetch it without Range.
+    """
+    byte_range = f"bytes={start}-{end}"
+
+    if kind == "http":
+        with _http.get(location, headers={"Range": byte_range}, stream=True, timeout=20) as resp:
+            if resp.status_code == 416 and start == 0:
+                return b"", 0
+            resp.raise_for_status()
+            if resp.status_code == 206:
+                return resp.content, _total_from_content_range(resp.headers.get("Content-Range"))
+            if start:
+                raise IOError(f"Server ignored Range {byte_range}")
+            data, ended = _read_at_most(resp, end + 1)
+            return data, len(data) if ended else None
+
+    try:
+        resp = s3_client.get_object(Bucket=location, Key=key, Range=byte_range)
+    except ClientError as e:
+        if start == 0 and e.response.get("Error", {}).get("Code") == "InvalidRange":
+            return b"", 0
+        raise
+    return resp["Body"].read(), _total_from_content_range(resp.get("ContentRange"))
+
+
+def _read_at_most(resp, limit: int) -> Tuple[bytes, bool]:
+    """
+    Up to limit bytes of a streaming response body, and whether it ended.
+    """
+    buffer = bytearray()
+    for chunk in resp.iter_content(chunk_size=64 * 1024):
+        buffer += chunk
+        if len(buffer) > limit:
+            return bytes(buffer[:limit]), False
+    return bytes(buffer), True
+
+
+def _download_unranged(url: str, memory_limit: int,
+                       original_name: str) -> Tuple[Optional[bytes], Optional[str]]:
+    """
+    GET a whole object from a server that ignores Range, holding at most
+    memory_limit bytes before moving everything to a spill file.
+    """
+    chunks: List[bytes] = []
+    size = 0
+    spill = None
+    local_path = None
+    try:
+        with _http.get(url, stream=True, timeout=20) as resp:
+            resp.raise_for_status()
+            for chunk in resp.iter_content(chunk_size=1024 * 1024):
+                size += len(chunk)
+                if spill is None and size > memory_limit:
+                    local_path = make_temp_path(original_name)
+                    spill = open(local_path, "wb")
+                    spill.writelines(chunks)
+                    chunks = []
+                if spill is None:
+                    chunks.append(chunk)
+                else:
+                    spill.write(chunk)
+    except Exception:
+        if spill is not None:
+            spill.close()
+            safe_remove(local_path)
+        raise
+
+    if spill is None:
+        return b"".join(chunks), None
+    spill.close()
+    return None, local_path
+
+
+def _check_part(data: bytes, start: int, end: int):
+    if len(data) != end - start + 1:
+        raise IOError(f"Range {start}-{end} returned {len(data)} bytes")
+
+
+def _run_parts(fill, ranges):
+    futures = [_range_executor.submit(fill, start, end) for start, end in ranges]
+    for future in futures:
+        future.result()
+
+
+def _total_from_content_range(content_range: Optional[str]) -> Optional[int]:
+    # "bytes 0-131071/4839210"
+    if not content_range or "/" not in content_range:
+        return None
+    total = content_range.rsplit("/", 1)[1].strip()
+    return int(total) if total.isdigit() else None
+
+
+def fetch_range(file_key_or_url: str, length: int) -> Tuple[bytes, Optional[int]]:
+    """
+    Fetch only the first `length` bytes of an object with a ranged GET.
+
+    Returns (data, total_size); total_size is None when it is unknown (a
+    server that ignores Range for an object longer than `length`).
+    """
+    kind, location, key, _ = _resolve_source(file_key_or_url)
+    return _read_range(kind, location, key, 0, max(0, length - 1))
+
+
+def fetch_etag(file_key_or_url: str) -> Optional[Tuple[str, str]]:
+    """
+    (origin, ETag) of an S3 object without downloading it, or None for
+    non-S3 URLs (their ETags are not content hashes) and when S3 does not
+    provide one. origin is the bucket, or the host for a presigned URL on a
+    non-AWS endpoint, so equal ETags from different stores never compare
+    equal. Presigned URLs are only signed for GET, so they are asked for a
+    single byte instead of sending HEAD.
+    """
+    kind, location, key, _ = _resolve_source(file_key_or_url)
+
+    if kind == "s3":
+        origin = location
+        etag = s3_client.head_object(Bucket=location, Key=key).get("ETag")
+    elif _is_presigned(location):
+        parsed = urlparse(location.split("?")[0])
+        origin = _s3_bucket_and_key(parsed)[0] if _is_s3_host(parsed.netloc) else parsed.netloc
+        resp = _http.get(location, headers={"Range": "bytes=0-0"}, timeout=20)
+        resp.raise_for_status()
+        etag = resp.headers.get("ETag")
+    else:
+        return None
+
+    return (origin, etag.strip('"')) if etag else None
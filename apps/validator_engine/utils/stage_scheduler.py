@@ -0,0 +1,80 @@
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Sequence
+
+STAGE_WORKERS = int(os.getenv("STAGE_WORKERS", "8"))
+
+# Shared across requests. Stage callables never block on this pool themselves,
+# so a saturated pool only queues work instead of deadlocking.
+_stage_executor = ThreadPoolExecutor(max_workers=STAGE_WORKERS, thread_name_prefix="stage")
+
+
+class Stage:
+    """
+    One validation step.
+
+    name      ledger step name, also the key in run_stages() results
+    run       zero-argument callable returning the stage result dict
+    requires  names of stages whose results must exist before this one starts
+    enabled   disabled stages are skipped and count as satisfied dependencies
+    """
+
+    def __init__(self, name: str, run: Callable[[], Any],
+                 requires: Sequence[str] = (), enabled: bool = True):
+        self.name = name
+        self.run = run
+        self.requires = tuple(requires)
+        self.enabled = enabled
+
+
+def run_stages(stages: List[Stage]) -> Dict[str, Any]:
+    """
+    Run enabled stages concurrently, starting each one as soon as its
+    requirements have finished. Returns {stage name: result}; callers merge
+    results in list order so output does not depend on completion order.
+
+    The first failing stage (in list order) re-raises once all started
+    stages have settled.
+    """
+    known = {s.name for s in stages}
+    enabled = [s for s in stages if s.enabled]
+    names = {s.name for s in enabled}
+    for s in enabled:
+        missing = [r for r in s.requires if r not in known]
+        if missing:
+            raise ValueError(f"Stage {s.name} requires unknown stage(s): {missing}")
+
+    results: Dict[str, Any] = {}
+    errors: Dict[str, BaseException] = {}
+    pending = list(enabled)
+    running = {}
+
+    def _ready(stage: Stage) -> bool:
+        return all(r in results or r not in names for r in stage.requires)
+
+    while pending or running:
+        if not errors:
+            for stage in [s for s in pending if _ready(s)]:
+                pending.remove(stage)
+                running[_stage_executor.submit(stage.run)] = stage
+        else:
+            pending.clear()
+
+        if not running:
+            if pending:
+                raise ValueError(f"Stage dependency cycle: {[s.name for s in pending]}")
+            break
+
+        done, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in done:
+            stage = running.pop(future)
+            try:
+                results[stage.name] = future.result()
+            except BaseException as e:
+                errors[stage.name] = e
+
+    for stage in enabled:
+        if stage.name in errors:
+            raise errors[stage.name]
+
+    return results
@@ -1,4 +1,19 @@
 import os
+import tempfile
+import time
+import uuid
+
+# Managed spill area for media too large to keep in memory
+MEDIA_SPILL_DIR = os.getenv("MEDIA_SPILL_DIR") or os.path.join(tempfile.gettempdir(), "validation_engine")
+# Files older than this at startup belong to a dead process
+MEDIA_SPILL_MAX_AGE = int(os.getenv("MEDIA_SPILL_MAX_AGE", "3600"))
+
+
+def make_temp_path(original_name: str) -> str:
+    os.makedirs(MEDIA_SPILL_DIR, exist_ok=True)
+    filename = f"{uuid.uuid4()}_{original_name}"
+    return os.path.join(MEDIA_SPILL_DIR, filename)
+
 
 def safe_remove(path: str):
     try:
@@ -6,3 +21,24 @@ def safe_remove(path: str):
             os.remove(path)
     except Exception:
         pass
+
+
+def sweep_orphaned_files(max_age_seconds: int = MEDIA_SPILL_MAX_AGE) -> int:
+    """
+    Delete spill files left behind by crashed or killed workers. Only files
+    older than max_age_seconds are touched, so live workers sharing the
+    directory keep theirs. Returns the number of files removed.
+    """
+    if not os.path.isdir(MEDIA_SPILL_DIR):
+        return 0
+
+    cutoff = time.time() - max_age_seconds
+    removed = 0
+    for entry in os.scandir(MEDIA_SPILL_DIR):
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                removed += 1
+        except OSError:
+            pass
+    return removed
@@ -0,0 +1,55 @@
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Iterable, List, Optional, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# Global cap on concurrent per-image work across all requests
+MEDIA_WORKERS = int(os.getenv("MEDIA_WORKERS", "8"))
+# Cap on how many images a single service call processes at once
+MEDIA_WORKERS_PER_REQUEST = int(os.getenv("MEDIA_WORKERS_PER_REQUEST", "4"))
+
+_media_executor = ThreadPoolExecutor(max_workers=MEDIA_WORKERS, thread_name_prefix="media")
+
+
+def map_media(fn: Callable[[T], R], items: Iterable[T], max_workers: Optional[int] = None) -> List[R]:
+    """
+    Apply fn to every item on the shared media pool with at most max_workers
+    (default MEDIA_WORKERS_PER_REQUEST) in flight, returning results in input
+    order so aggregates match the serial loop exactly.
+
+    If any call raises, the first failure in input order is re-raised after
+    the in-flight calls finish.
+    """
+    items = list(items)
+    limit = max(1, max_workers or MEDIA_WORKERS_PER_REQUEST)
+
+    if limit == 1 or len(items) <= 1:
+        return [fn(item) for item in items]
+
+    results: List = [None] * len(items)
+    errors = {}
+    running = {}
+    next_index = 0
+
+    while next_index < len(items) or running:
+        while not errors and next_index < len(items) and len(running) < limit:
+            running[_media_executor.submit(fn, items[next_index])] = next_index
+            next_index += 1
+
+        if not running:
+            break
+
+        done, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in done:
+            index = running.pop(future)
+            try:
+                results[index] = future.result()
+            except BaseException as e:
+                errors[index] = e
+
+    if errors:
+        raise errors[min(errors)]
+
+    return results
@@ -1,8 +1,9 @@
+from typing import Optional, Tuple
 from models.request_models import SubmissionPayload
 from services.exif_service import run_exif_checks
 from services.exif_extraction_service import extract_exif_data
 from services.gps_service import run_gps_checks
-from services.forensics_service import run_forensics_checks
+from services.forensics_service import run_forensics_checks, blur_check_enabled
 from services.duplicate_service import run_duplicate_checks
 from services.ela_service import run_ela_checks
 from services.classifier_service import run_classifier
@@ -17,9 +18,43 @@ from services.ledger_service import (
     get_ledger_entries
 )
 from services.callback_service import send_validation_callback_sync
+from utils.media_cache import MEDIA_PREFETCH, MediaCache
+from utils.stage_scheduler import Stage, run_stages
 
 
-def validate_submission_engine(payload: SubmissionPayload) -> dict:
+def media_needs(rules: dict) -> Tuple[bool, bool]:
+    """
+    (images, documents): whether any enabled stage decodes image pixels or
+    needs whole images, and whether any reads the documents.
+    """
+    img_quality_rules = rules.get("image_quality_rules")
+    fraud_rules = rules.get("fraud_detection_rules", {})
+    images = bool(
+        (img_quality_rules and blur_check_enabled(img_quality_rules))
+        or fraud_rules.get("duplicate_detection")
+        or fraud_rules.get("ela_tampering_check")
+        or rules.get("asset_rules", {}).get("classifier_required")
+    )
+    documents = bool(rules.get("document_rules", {}).get("require_invoice"))
+    return images, documents
+
+
+def needs_pixel_data(rules: dict) -> bool:
+    """
+    Whether any enabled stage decodes pixels or needs the whole object.
+    Metadata-only rulesets (EXIF, resolution, screenshot heuristics) are
+    answered from ranged header probes instead.
+    """
+    return any(media_needs(rules))
+
+
+def validate_submission_engine(payload: SubmissionPayload,
+                               media_cache: Optional[MediaCache] = None) -> dict:
+    """
+    Run every enabled stage for one submission. Pass media_cache to share
+    downloads across submissions (batch validation); the caller then owns
+    its lifetime, otherwise a submission-scoped cache is created and closed.
+    """
     submission_id = payload.submissionId
     rules = payload.rullset.get("rules", {})
     flags: list[str] = []
@@ -28,87 +63,111 @@ def validate_submission_engine(payload: SubmissionPayload) -> dict:
     # Log validation start
     log_validation_start(submission_id, payload.dict())
 
-    exif_extraction = extract_exif_data(payload.media)
-    features["exif_details"] = exif_extraction["exif_data"]
-    flags += exif_extraction["flags"]
-    log_validation_step(submission_id, "EXIF_EXTRACTION", exif_extraction)
-
-    
-    exif_result = run_exif_checks(payload.media, rules)
-    flags += exif_result["flags"]
-    features.update(exif_result["features"])
-    log_validation_step(submission_id, "EXIF_CHECKS", exif_result)
-
-  
     gps_rules = rules.get("gps_rules", {})
-    gps_result = run_gps_checks(
-        device_gps=payload.gps,
-        gps_rules=gps_rules,
-        media=payload.media
-    )
-    flags += gps_result["flags"]
-    features.update(gps_result["features"])
-    log_validation_step(submission_id, "GPS_VALIDATION", gps_result)
-
-    # 4 Time validation
     time_rules = rules.get("time_rules", {})
     sanction_date = payload.loanDetails.sanctionDate or payload.sanctionDate
-    if time_rules and sanction_date:
-        time_result = run_time_checks(payload.media, time_rules, sanction_date)
-        flags += time_result["flags"]
-        features.update(time_result["features"])
-        log_validation_step(submission_id, "TIME_CHECKS", time_result)
-
-    # 5 Image quality & forensic checks
     img_quality_rules = rules.get("image_quality_rules")
-    if img_quality_rules:
-        forensics_result = run_forensics_checks(payload.media, img_quality_rules)
-        flags += forensics_result["flags"]
-        features.update(forensics_result["features"])
-        log_validation_step(submission_id, "FORENSICS", forensics_result)
-    # 6 Duplicate detection
+    # Working resolution for pixel-level metrics (None -> ANALYSIS_MAX_SIDE env)
+    analysis_max_side = (img_quality_rules or {}).get("analysis_max_side")
     fraud_rules = rules.get("fraud_detection_rules", {})
-    if fraud_rules.get("duplicate_detection"):
-        dup_result = run_duplicate_checks(
-            media=payload.media,
-            max_hash_distance=fraud_rules.get("max_hash_distance", 8)
-        )
-        flags += dup_result["flags"]
-        features.update(dup_result["features"])
-        log_validation_step(submission_id, "DUPLICATE_CHECK", dup_result)
-
-    # 7 ELA tampering
-    if fraud_rules.get("ela_tampering_check"):
-        ela_result = run_ela_checks(payload.media)
-        flags += ela_result["flags"]
-        features.update(ela_result["features"])
-        log_validation_step(submission_id, "ELA_TAMPERING", ela_result)
-    # 8 Asset classifier (dynamic)
     asset_rules = rules.get("asset_rules", {})
-    if asset_rules.get("classifier_required"):
-        allowed_assets = asset_rules.get("allowed_asset_types", [])
-        confidence_threshold = asset_rules.get("confidence_threshold", 0.8)
-        class_result = run_classifier(
-            media=payload.media,
-            allowed_assets=allowed_assets,
-            confidence_threshold=confidence_threshold
-        )
-        flags += class_result["flags"]
-        features.update(class_result["features"])
-        log_validation_step(submission_id, "ASSET_CLASSIFIER", class_result)
-
-    # 9 OCR / Invoice rules
     doc_rules = rules.get("document_rules", {})
-    if doc_rules.get("require_invoice"):
-        expected_amount = payload.loanDetails.sanctionAmount or payload.expectedInvoiceAmount
-        ocr_result = run_ocr_checks(
+    expected_amount = payload.loanDetails.sanctionAmount or payload.expectedInvoiceAmount
+
+    forensics_enabled = bool(img_quality_rules)
+    duplicate_enabled = bool(fraud_rules.get("duplicate_detection"))
+    ela_enabled = bool(fraud_rules.get("ela_tampering_check"))
+    classifier_enabled = bool(asset_rules.get("classifier_required"))
+    ocr_enabled = bool(doc_rules.get("require_invoice"))
+
+    # Every stage reads media through one submission-scoped cache so each
+    # fileKey is downloaded once per run. Once any stage needs pixels the
+    # whole object is fetched anyway, so header probing is switched off.
+    owns_cache = media_cache is None
+    if owns_cache:
+        media_cache = MediaCache(probe=not needs_pixel_data(rules))
+
+    # Download everything the enabled stages will read up front, in parallel,
+    # instead of each stage fetching on first touch
+    images_needed, documents_needed = media_needs(rules)
+    prefetch_keys = [
+        m.fileKey for m in payload.media
+        if (m.type == "IMAGE" and images_needed) or (m.type == "DOCUMENT" and documents_needed)
+    ]
+    if MEDIA_PREFETCH:
+        media_cache.prefetch(prefetch_keys)
+
+    # Stages only read payload, rules and the media cache, so they run
+    # concurrently; results are merged below in this declared order.
+    stages = [
+        Stage("EXIF_EXTRACTION", lambda: extract_exif_data(payload.media, media_cache=media_cache)),
+        Stage("EXIF_CHECKS", lambda: run_exif_checks(payload.media, rules)),
+        Stage("GPS_VALIDATION", lambda: run_gps_checks(
+            device_gps=payload.gps,
+            gps_rules=gps_rules,
+            media=payload.media
+        )),
+        # 4 Time validation
+        Stage("TIME_CHECKS",
+              lambda: run_time_checks(payload.media, time_rules, sanction_date),
+              enabled=bool(time_rules and sanction_date)),
+        # 5 Image quality & forensic checks
+        Stage("FORENSICS",
+              lambda: run_forensics_checks(payload.media, img_quality_rules, media_cache=media_cache,
+                                           analysis_max_side=analysis_max_side),
+              enabled=forensics_enabled),
+        # 6 Duplicate detection
+        Stage("DUPLICATE_CHECK", lambda: run_duplicate_checks(
+            media=payload.media,
+            max_hash_distance=fraud_rules.get("max_hash_distance", 8),
+            tenant_id=payload.tenantId,
+            submission_id=submission_id,
+            loan_id=payload.loanId,
+            media_cache=media_cache,
+            analysis_max_side=analysis_max_side
+        ), enabled=duplicate_enabled),
+        # 7 ELA tampering
+        Stage("ELA_TAMPERING", lambda: run_ela_checks(
+            payload.media,
+            media_cache=media_cache,
+            jpeg_quality=fraud_rules.get("ela_jpeg_quality", 90),
+            score_threshold=fraud_rules.get("ela_score_threshold", 6.0),
+            analysis_max_side=analysis_max_side
+        ), enabled=ela_enabled),
+        # 8 Asset classifier (dynamic)
+        Stage("ASSET_CLASSIFIER", lambda: run_classifier(
+            media=payload.media,
+            allowed_assets=asset_rules.get("allowed_asset_types", []),
+            confidence_threshold=asset_rules.get("confidence_threshold", 0.8),
+            media_cache=media_cache,
+            max_images=asset_rules.get("classifier_max_images")
+        ), enabled=classifier_enabled),
+        # 9 OCR / Invoice rules
+        Stage("OCR_INVOICE", lambda: run_ocr_checks(
             media=payload.media,
             document_rules=doc_rules,
-            expected_amount=expected_amount
-        )
-        flags += ocr_result["flags"]
-        features.update(ocr_result["features"])
-        log_validation_step(submission_id, "OCR_INVOICE", ocr_result)
+            expected_amount=expected_amount,
+            media_cache=media_cache,
+            sanction_date=sanction_date
+        ), enabled=ocr_enabled),
+    ]
+
+    try:
+        stage_results = run_stages(stages)
+    finally:
+        if owns_cache:
+            media_cache.close()
+
+    for stage in stages:
+        if not stage.enabled:
+            continue
+        stage_result = stage_results[stage.name]
+        if stage.name == "EXIF_EXTRACTION":
+            features["exif_details"] = stage_result["exif_data"]
+        else:
+            features.update(stage_result["features"])
+        flags += stage_result["flags"]
+        log_validation_step(submission_id, stage.name, stage_result)
 
     # 10) Media requirements (min photos, min video seconds)
     media_rules = rules.get("media_requirements", {})